@@ -1 +1 @@
-from bot.database.main import Database
+from bot.database.main import Database, session_scope, open_session_scope, close_session_scope, run_sync, upsert
@@ -0,0 +1,150 @@
+"""Process-wide snapshot of the shop catalog used for navigation.
+
+The snapshot holds the category tree, category flags, item lists and stock
+state. Methods that change any of those call :func:`mark_catalog_changed` on
+their session; once that session commits, the catalog version is bumped and
+the next reader rebuilds the snapshot. Browsing therefore costs no queries
+until something changes.
+"""
+import threading
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from bot.database.main import Database
+from bot.database.models import Categories, Goods, StockSummary
+
+_DIRTY_KEY = 'catalog_changed'
+
+_LOCK = threading.Lock()
+_VERSION_LOCK = threading.Lock()
+_VERSION = 0
+_SNAPSHOT: Optional['CatalogSnapshot'] = None
+
+
+class CategoryNode:
+    __slots__ = ('name', 'title', 'parent', 'allow_discounts', 'allow_referral_rewards',
+                 'requires_password', 'children', 'items')
+
+    def __init__(self, name: str, title: str | None, parent: str | None, allow_discounts: bool,
+                 allow_referral_rewards: bool, requires_password: bool):
+        self.name = name
+        self.title = title or name
+        self.parent = parent
+        self.allow_discounts = bool(allow_discounts)
+        self.allow_referral_rewards = bool(allow_referral_rewards)
+        self.requires_password = bool(requires_password)
+        self.children: list[str] = []
+        self.items: list[str] = []
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one version."""
+
+    def __init__(self, version: int, categories: dict[str, CategoryNode], item_category: dict[str, str],
+                 in_stock: set[str]):
+        self.version = version
+        self.categories = categories
+        self.item_category = item_category
+        self.in_stock = in_stock
+        self.roots = [node.name for node in categories.values() if node.parent is None]
+        self.__has_stock: dict[str, bool] = {}
+        self.__has_missing: dict[str, bool] = {}
+        for name in self.roots:
+            self.__walk(name)
+
+    def __walk(self, name: str) -> None:
+        node = self.categories[name]
+        for child in node.children:
+            self.__walk(child)
+        self.__has_stock[name] = bool(self.stocked_items(name)) or any(
+            self.__has_stock[child] for child in node.children)
+        self.__has_missing[name] = bool(self.missing_items(name)) or any(
+            self.__has_missing[child] for child in node.children)
+
+    def stocked_items(self, category_name: str) -> list[str]:
+        node = self.categories.get(category_name)
+        return [item for item in node.items if item in self.in_stock] if node else []
+
+    def missing_items(self, category_name: str) -> list[str]:
+        node = self.categories.get(category_name)
+        return [item for item in node.items if item not in self.in_stock] if node else []
+
+    def has_stock(self, category_name: str) -> bool:
+        return self.__has_stock.get(category_name, False)
+
+    def has_missing(self, category_name: str) -> bool:
+        return self.__has_missing.get(category_name, False)
+
+    def root_of(self, category_name: str) -> CategoryNode | None:
+        node = self.categories.get(category_name)
+        while node is not None and node.parent is not None:
+            parent = self.categories.get(node.parent)
+            if parent is None:
+                break
+            node = parent
+        return node
+
+
+def _load(version: int) -> CatalogSnapshot:
+    # A fresh connection rather than the caller's session, whose transaction
+    # may predate the commit that bumped the version.
+    with Database().engine.connect() as connection:
+        category_rows = connection.execute(
+            select(Categories.name, Categories.title, Categories.parent_name, Categories.allow_discounts,
+                   Categories.allow_referral_rewards, Categories.requires_password)
+            .order_by(Categories.title)
+        ).all()
+        item_rows = connection.execute(
+            select(Goods.name, Goods.category_name, StockSummary.in_stock().label('in_stock'))
+            .outerjoin(StockSummary, StockSummary.item_name == Goods.name)
+        ).all()
+    categories = {row[0]: CategoryNode(*row) for row in category_rows}
+    for node in categories.values():
+        if node.parent in categories:
+            categories[node.parent].children.append(node.name)
+    item_category = {}
+    in_stock = set()
+    for name, category_name, stocked in item_rows:
+        item_category[name] = category_name
+        if stocked:
+            in_stock.add(name)
+        if category_name in categories:
+            categories[category_name].items.append(name)
+    return CatalogSnapshot(version, categories, item_category, in_stock)
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Return the current snapshot, rebuilding it if the catalog changed."""
+    global _SNAPSHOT
+    snapshot = _SNAPSHOT
+    if snapshot is not None and snapshot.version == _VERSION:
+        return snapshot
+    with _LOCK:
+        version = _VERSION
+        if _SNAPSHOT is None or _SNAPSHOT.version != version:
+            _SNAPSHOT = _load(version)
+        return _SNAPSHOT
+
+
+def bump_catalog_version() -> None:
+    global _VERSION
+    with _VERSION_LOCK:
+        _VERSION += 1
+
+
+def mark_catalog_changed(session: Session) -> None:
+    """Invalidate the snapshot once ``session`` commits its current changes."""
+    session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        bump_catalog_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -1,23 +1,210 @@
-from typing import Final
-from sqlalchemy import create_engine
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Final, Iterator, Optional, Sequence, TypeVar
+
+from sqlalchemy import create_engine, event, insert, or_, text, update
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from bot.misc import EnvKeys, SingletonMeta
+
+
+T = TypeVar('T')
+
+
+class SessionScope:
+    """Marker identifying one unit of work (an update, an IPN request, a job)."""
+
+    __slots__ = ('closed',)
+
+    def __init__(self):
+        self.closed = False
+
 
-from bot.misc import SingletonMeta
+_CURRENT_SCOPE: ContextVar[Optional[SessionScope]] = ContextVar('db_session_scope', default=None)
+
+
+def _scope_key():
+    scope = _CURRENT_SCOPE.get()
+    if scope is None or scope.closed:
+        # Code running outside of an explicit unit of work (startup hooks,
+        # background loops, the IPN thread) gets one session per thread.
+        return threading.get_ident()
+    return scope
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply the SQLite tuning profile from ``EnvKeys`` to a new connection.
+
+    Foreign keys are always enforced, so renames and deletes cascade as they
+    do on the other backends.
+    """
+    pragmas = (
+        ('foreign_keys', 'ON'),
+        ('busy_timeout', int(EnvKeys.SQLITE_BUSY_TIMEOUT)),
+        ('journal_mode', EnvKeys.SQLITE_JOURNAL_MODE),
+        ('synchronous', EnvKeys.SQLITE_SYNCHRONOUS),
+        ('mmap_size', int(EnvKeys.SQLITE_MMAP_SIZE)),
+        ('cache_size', int(EnvKeys.SQLITE_CACHE_SIZE)),
+        ('temp_store', EnvKeys.SQLITE_TEMP_STORE),
+    )
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
 
 
 class Database(metaclass=SingletonMeta):
     BASE: Final = declarative_base()
 
+    URL: Final = make_url(EnvKeys.DATABASE_URL)
+    POOL_SIZE: Final = int(EnvKeys.DB_POOL_SIZE)
+    MAX_OVERFLOW: Final = int(EnvKeys.DB_MAX_OVERFLOW)
+    POOL_TIMEOUT: Final = int(EnvKeys.DB_POOL_TIMEOUT)
+    POOL_RECYCLE: Final = int(EnvKeys.DB_POOL_RECYCLE)
+
     def __init__(self):
-        self.__engine = create_engine(f'sqlite:///database.db')
-        session = sessionmaker(bind=self.__engine)
-        self.__session = session()
+        connect_args = {}
+        if self.is_sqlite:
+            connect_args['check_same_thread'] = False
+        self.__engine = create_engine(
+            self.URL,
+            poolclass=QueuePool,
+            pool_size=self.POOL_SIZE,
+            max_overflow=self.MAX_OVERFLOW,
+            pool_timeout=self.POOL_TIMEOUT,
+            pool_recycle=self.POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args=connect_args,
+        )
+        if self.is_sqlite:
+            event.listen(self.__engine, 'connect', _apply_sqlite_pragmas)
+        self.__factory = sessionmaker(bind=self.__engine)
+        self.__registry = scoped_session(self.__factory, scopefunc=_scope_key)
 
     @property
-    def session(self):
-        return self.__session
+    def session(self) -> Session:
+        return self.__registry()
 
     @property
     def engine(self):
         return self.__engine
+
+    @property
+    def dialect(self) -> str:
+        return self.URL.get_backend_name()
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.dialect == 'sqlite'
+
+    def remove_session(self) -> None:
+        """Close the session bound to the current scope and release its connection."""
+        self.__registry.remove()
+
+    def maintain(self) -> None:
+        """Checkpoint the WAL without blocking writers and refresh planner stats."""
+        if not self.is_sqlite:
+            return
+        with self.__engine.connect() as connection:
+            connection.execute(text('PRAGMA wal_checkpoint(PASSIVE)'))
+            connection.execute(text('PRAGMA optimize'))
+
+
+def open_session_scope() -> tuple[SessionScope, object]:
+    """Start a new unit of work in the current context."""
+    scope = SessionScope()
+    return scope, _CURRENT_SCOPE.set(scope)
+
+
+def close_session_scope(scope: SessionScope, token: object) -> None:
+    """Dispose of the session opened by :func:`open_session_scope`."""
+    try:
+        Database().remove_session()
+    finally:
+        # Tasks spawned during the update inherit the scope; once it is closed
+        # they fall back to the per-thread session instead of leaking a new one.
+        scope.closed = True
+        with contextlib.suppress(ValueError):
+            _CURRENT_SCOPE.reset(token)
+
+
+@contextlib.contextmanager
+def session_scope() -> Iterator[Session]:
+    """Provide a session for a block of work, closing it afterwards.
+
+    Nested calls reuse the outer session.
+    """
+    current = _CURRENT_SCOPE.get()
+    if current is not None and not current.closed:
+        yield Database().session
+        return
+    scope, token = open_session_scope()
+    try:
+        yield Database().session
+    except Exception:
+        Database().session.rollback()
+        raise
+    finally:
+        close_session_scope(scope, token)
+
+
+def upsert(session: Session, model, values: dict, conflict: Sequence[str],
+           update_fields: Sequence[str] = ()) -> bool:
+    """Insert ``values`` into ``model`` or update ``update_fields`` on conflict.
+
+    Uses ``INSERT ... ON CONFLICT`` on PostgreSQL and SQLite and falls back to
+    UPDATE-then-INSERT elsewhere. Nothing is committed. Returns whether a row
+    was written; without ``update_fields`` that means a new row was inserted.
+    """
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(**values)
+        if update_fields:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(conflict),
+                set_={name: stmt.excluded[name] for name in update_fields},
+                # skip the write entirely when nothing changed
+                where=or_(*(table.c[name].is_distinct_from(stmt.excluded[name]) for name in update_fields)),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict))
+        return session.execute(stmt).rowcount > 0
+
+    key = [table.c[name] == values[name] for name in conflict]
+    if session.execute(table.select().where(*key)).first() is None:
+        session.execute(insert(table).values(**values))
+        return True
+    if update_fields:
+        return session.execute(
+            update(table).where(*key).values({name: values[name] for name in update_fields})).rowcount > 0
+    return False
+
+
+_EXECUTOR: Final = ThreadPoolExecutor(max_workers=Database.POOL_SIZE, thread_name_prefix='db')
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database code on the DB thread pool and await the result.
+
+    The caller's context is copied so the call uses the session of the
+    current update. Calls sharing a scope must be awaited one at a time.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_EXECUTOR, call)
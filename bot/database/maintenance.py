@@ -0,0 +1,32 @@
+import asyncio
+
+from bot.database.main import Database, run_sync
+from bot.database.methods.update import rebuild_daily_stats
+from bot.logger_mesh import logger
+from bot.misc import EnvKeys
+
+
+async def maintenance_loop(interval: float | None = None) -> None:
+    """Periodically checkpoint the SQLite WAL and run ``PRAGMA optimize``."""
+    interval = interval or float(EnvKeys.SQLITE_MAINTENANCE_INTERVAL)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_sync(Database().maintain)
+        except Exception as e:
+            logger.error(f"Database maintenance failed: {e}")
+
+
+async def daily_stats_loop(interval: float | None = None) -> None:
+    """Rebuild the daily statistics rollups from the raw tables now and then periodically."""
+    interval = interval or float(EnvKeys.DAILY_STATS_RECONCILE_INTERVAL)
+    while True:
+        try:
+            await run_sync(rebuild_daily_stats)
+        except Exception as e:
+            logger.error(f"Daily statistics reconciliation failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_maintenance() -> list[asyncio.Task]:
+    return [asyncio.create_task(maintenance_loop()), asyncio.create_task(daily_stats_loop())]
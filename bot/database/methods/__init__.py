@@ -2,3 +2,4 @@ from bot.database.methods.create import *
 from bot.database.methods.read import *
 from bot.database.methods.update import *
 from bot.database.methods.delete import *
+from bot.database.methods.purchase import *
@@ -0,0 +1,31 @@
+"""Awaitable counterparts of the functions in ``bot.database.methods``.
+
+Every public function from the create/read/update/delete and purchase
+modules is exposed here under the same name, executed on the database
+thread pool::
+
+    from bot.database.methods import aio
+
+    info = await aio.get_item_info(item_name, user_id)
+"""
+import functools
+import inspect
+
+from bot.database.main import run_sync
+from bot.database.methods import create, read, update, delete, purchase
+
+
+def _awaitable(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_sync(func, *args, **kwargs)
+    return wrapper
+
+
+__all__ = []
+for _module in (create, read, update, delete, purchase):
+    for _name, _func in inspect.getmembers(_module, inspect.isfunction):
+        if _name.startswith('_') or _func.__module__ != _module.__name__:
+            continue
+        globals()[_name] = _awaitable(_func)
+        __all__.append(_name)
@@ -1,16 +1,16 @@
 import datetime
 import json
-import random
 from typing import Sequence
 
-import sqlalchemy.exc
+from sqlalchemy import func
 
+from bot.database.catalog import mark_catalog_changed
+from bot.database.user_context import forget_user_context
 from bot.database.models import (
     User,
     ItemValues,
     Goods,
     Categories,
-    BoughtGoods,
     Operations,
     UnfinishedOperations,
     PromoCode,
@@ -20,29 +20,45 @@ from bot.database.models import (
     ResellerPrice,
     CartItem,
     CategoryPassword,
+    StockSummary,
+    BroadcastJob,
+    ScheduledTask,
 )
-from bot.database import Database
+from bot.database import Database, upsert
+from bot.database.methods.read import invalidate_purchase_count, invalidate_role_cache
+from bot.database.methods.daily_stats import bump_daily_stats
+from bot.database.methods.dates import as_datetime
+from bot.database.methods.referrals import add_referral, add_referral_topup
+from bot.database.methods.sales import record_sale
+from bot.database.methods.stock import adjust_stock
 
 
 def create_user(telegram_id: int, registration_date, referral_id, role: int = 1,
                 language: str | None = None, username: str | None = None) -> None:
     session = Database().session
-    try:
-        user = session.query(User).filter(User.telegram_id == telegram_id).one()
-        if user.username != username:
-            user.username = username
-            session.commit()
-    except sqlalchemy.exc.NoResultFound:
-        if referral_id != '':
-            session.add(
-                User(telegram_id=telegram_id, role_id=role, registration_date=registration_date,
-                     referral_id=referral_id, language=language, username=username))
-            session.commit()
-        else:
-            session.add(
-                User(telegram_id=telegram_id, role_id=role, registration_date=registration_date,
-                     referral_id=None, language=language, username=username))
-            session.commit()
+    registration_date = as_datetime(registration_date)
+    inserted = upsert(
+        session,
+        User,
+        {
+            'telegram_id': telegram_id,
+            'role_id': role,
+            'registration_date': registration_date,
+            'referral_id': referral_id if referral_id != '' else None,
+            'language': language,
+            'username': username,
+        },
+        conflict=('telegram_id',),
+    )
+    if inserted:
+        # only a new user changes the referral and registration counters
+        if referral_id not in (None, ''):
+            add_referral(session, referral_id)
+        bump_daily_stats(session, registration_date, new_users=1)
+    else:
+        session.query(User).filter(User.telegram_id == telegram_id, User.username.is_distinct_from(username)).update(
+            {User.username: username}, synchronize_session=False)
+    session.commit()
 
 
 def create_item(item_name: str, item_description: str, item_price: int, category_name: str,
@@ -51,6 +67,8 @@ def create_item(item_name: str, item_description: str, item_price: int, category
     session.add(
         Goods(name=item_name, description=item_description, price=item_price,
               category_name=category_name, delivery_description=delivery_description))
+    session.add(StockSummary(item_name=item_name))
+    mark_catalog_changed(session)
     session.commit()
 
 
@@ -62,7 +80,23 @@ def add_values_to_item(item_name: str, value: str, is_infinity: bool) -> None:
     else:
         session.add(
             ItemValues(name=item_name, value=value, is_infinity=True))
+    adjust_stock(session, item_name, available=1, infinite=True if is_infinity else None)
+    session.commit()
+
+
+BULK_CHUNK_SIZE = 500
+
+
+def add_values_bulk(item_name: str, values: Sequence[str], is_infinity: bool = False) -> int:
+    """Insert ``values`` for an item in chunks with one commit; returns how many were added."""
+    session = Database().session
+    rows = [{'item_name': item_name, 'value': value, 'is_infinity': is_infinity} for value in values]
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        session.execute(ItemValues.__table__.insert(), rows[start:start + BULK_CHUNK_SIZE])
+    if rows:
+        adjust_stock(session, item_name, available=len(rows), infinite=True if is_infinity else None)
     session.commit()
+    return len(rows)
 
 
 def create_category(
@@ -82,31 +116,38 @@ def create_category(
             allow_referral_rewards=allow_referral_rewards,
         )
     )
+    mark_catalog_changed(session)
     session.commit()
 
 
-def create_operation(user_id: int, value: int, operation_time: str) -> None:
+def create_operation(user_id: int, value: int, operation_time: datetime.datetime | str) -> None:
     session = Database().session
+    operation_time = as_datetime(operation_time)
     session.add(
         Operations(user_id=user_id, operation_value=value, operation_time=operation_time))
+    add_referral_topup(session, user_id, value)
+    bump_daily_stats(session, operation_time, topups=value)
     session.commit()
 
 
-def start_operation(user_id: int, value: int, operation_id: str, message_id: int | None = None) -> None:
+def start_operation(user_id: int, value: int, operation_id: str, message_id: int | None = None,
+                    provider: str | None = None, expires_at: datetime.datetime | None = None,
+                    payload: dict | None = None) -> None:
     session = Database().session
     session.add(
-        UnfinishedOperations(user_id=user_id, operation_value=value, operation_id=operation_id, message_id=message_id))
+        UnfinishedOperations(user_id=user_id, operation_value=value, operation_id=operation_id, message_id=message_id,
+                             provider=provider, expires_at=expires_at,
+                             payload=json.dumps(payload, default=str) if payload is not None else None))
     session.commit()
 
 
 def add_bought_item(item_name: str, value: str, price: int, buyer_id: int,
-                    bought_time: str) -> int:
+                    bought_time: datetime.datetime | str) -> int:
     session = Database().session
-    unique_id = random.randint(1000000000, 9999999999)
-    session.add(
-        BoughtGoods(name=item_name, value=value, price=price, buyer_id=buyer_id, bought_datetime=bought_time,
-                    unique_id=str(unique_id)))
+    unique_id = record_sale(session, item_name, value, price, buyer_id, as_datetime(bought_time))
     session.commit()
+    forget_user_context(buyer_id)
+    invalidate_purchase_count(buyer_id)
     return unique_id
 
 
@@ -142,6 +183,7 @@ def create_reseller(user_id: int) -> None:
     session = Database().session
     session.add(Reseller(user_id=user_id))
     session.commit()
+    invalidate_role_cache(user_id)
 
 
 def add_item_to_cart(user_id: int, item_name: str, quantity: int = 1) -> None:
@@ -170,3 +212,21 @@ def create_category_passwords(passwords: Sequence[str]) -> list[CategoryPassword
         entries.append(entry)
     session.commit()
     return entries
+
+
+def create_broadcast_job(admin_id: int, text: str, status_message_id: int | None = None) -> int:
+    session = Database().session
+    total = session.query(func.count(User.telegram_id)).scalar()
+    job = BroadcastJob(admin_id=admin_id, text=text, total=total, created_at=datetime.datetime.now(),
+                       status_message_id=status_message_id)
+    session.add(job)
+    session.commit()
+    return job.id
+
+
+def create_scheduled_task(kind: str, run_at: datetime.datetime, payload: dict) -> int:
+    session = Database().session
+    task = ScheduledTask(kind=kind, run_at=run_at, payload=json.dumps(payload))
+    session.add(task)
+    session.commit()
+    return task.id
@@ -0,0 +1,33 @@
+"""Helpers keeping ``daily_stats`` in step with users, purchases and top-ups.
+
+Each event adds its delta to its day's row as part of the caller's
+transaction. ``rebuild_daily_stats`` in the update methods recomputes all
+rows from the raw tables when the rollups need reconciling.
+"""
+import datetime
+
+from sqlalchemy.orm import Session
+
+from bot.database import upsert
+from bot.database.models import DailyStats
+
+
+def _ensure_day(session: Session, day: datetime.date) -> None:
+    upsert(session, DailyStats, {'day': day, 'new_users': 0, 'orders': 0, 'sales': 0, 'topups': 0},
+           conflict=('day',))
+
+
+def bump_daily_stats(session: Session, moment: datetime.datetime, *, new_users: int = 0, orders: int = 0,
+                     sales: int = 0, topups: int = 0) -> None:
+    """Add registration, purchase or top-up deltas to the row for ``moment``'s day."""
+    day = moment.date()
+    _ensure_day(session, day)
+    session.query(DailyStats).filter(DailyStats.day == day).update(
+        {
+            DailyStats.new_users: DailyStats.new_users + new_users,
+            DailyStats.orders: DailyStats.orders + orders,
+            DailyStats.sales: DailyStats.sales + sales,
+            DailyStats.topups: DailyStats.topups + topups,
+        },
+        synchronize_session=False,
+    )
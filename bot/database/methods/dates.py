@@ -0,0 +1,9 @@
+"""Parsing of the timestamps handlers pass to the database methods."""
+import datetime
+
+
+def as_datetime(value: datetime.datetime | str) -> datetime.datetime:
+    """Accept the 'YYYY-MM-DD HH:MM:SS' strings handlers pass around."""
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(value)
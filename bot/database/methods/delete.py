@@ -1,6 +1,7 @@
 import os
 
 from bot.utils.files import sanitize_name
+from bot.database.catalog import mark_catalog_changed
 from bot.database.models import (
     Database,
     Goods,
@@ -13,7 +14,10 @@ from bot.database.models import (
     CartItem,
     UserCategoryPassword,
     CategoryPassword,
+    ScheduledTask,
 )
+from bot.database.methods.read import invalidate_role_cache
+from bot.database.methods.stock import adjust_stock, claim_unit, recount_stock
 
 
 def delete_item(item_name: str) -> None:
@@ -21,8 +25,9 @@ def delete_item(item_name: str) -> None:
     for val in values:
         if os.path.isfile(val[0]):
             os.remove(val[0])
+    # the item's stock, summary, cart entries and prices go with it through ON DELETE CASCADE
     Database().session.query(Goods).filter(Goods.name == item_name).delete()
-    Database().session.query(ItemValues).filter(ItemValues.item_name == item_name).delete()
+    mark_catalog_changed(Database().session)
     Database().session.commit()
     folder = os.path.join('assets', 'uploads', sanitize_name(item_name))
     if os.path.isdir(folder) and not os.listdir(folder):
@@ -35,6 +40,9 @@ def delete_only_items(item_name: str) -> None:
         if os.path.isfile(val[0]):
             os.remove(val[0])
     Database().session.query(ItemValues).filter(ItemValues.item_name == item_name).delete()
+    recount_stock(Database().session, item_name)
+    mark_catalog_changed(Database().session)
+    Database().session.commit()
     folder = os.path.join('assets', 'uploads', sanitize_name(item_name))
     if os.path.isdir(folder) and not os.listdir(folder):
         os.rmdir(folder)
@@ -51,12 +59,12 @@ def delete_category(category_name: str) -> None:
         for val in values:
             if os.path.isfile(val[0]):
                 os.remove(val[0])
-        Database().session.query(ItemValues).filter(ItemValues.item_name == item.name).delete()
         folder = os.path.join('assets', 'uploads', sanitize_name(item.name))
         if os.path.isdir(folder) and not os.listdir(folder):
             os.rmdir(folder)
     Database().session.query(Goods).filter(Goods.category_name == category_name).delete()
     Database().session.query(Categories).filter(Categories.name == category_name).delete()
+    mark_catalog_changed(Database().session)
     Database().session.commit()
 
 
@@ -91,13 +99,31 @@ def finish_operation(operation_id: str) -> None:
     Database().session.commit()
 
 
+def claim_item_value(item_name: str) -> dict | None:
+    """Take one stock unit of ``item_name``; see :func:`claim_unit`."""
+    session = Database().session
+    value = claim_unit(session, item_name)
+    session.commit()
+    return value
+
+
 def buy_item(item_id: str, infinity: bool = False) -> None:
     """Remove an item's value record after purchase.
 
     File cleanup is handled separately by the caller."""
     if not infinity:
         session = Database().session
-        session.query(ItemValues).filter(ItemValues.id == item_id).delete()
+        row = (
+            session.query(ItemValues.item_name, ItemValues.is_infinity)
+            .filter(ItemValues.id == item_id)
+            .first()
+        )
+        deleted = session.query(ItemValues).filter(ItemValues.id == item_id).delete()
+        if row and deleted:
+            if row.is_infinity:
+                recount_stock(session, row.item_name)
+            else:
+                adjust_stock(session, row.item_name, available=-1)
         session.commit()
     # Nothing to do for infinite items
 
@@ -113,6 +139,7 @@ def delete_reseller(user_id: int) -> None:
     session.query(ResellerPrice).filter(ResellerPrice.reseller_id == user_id).delete()
     session.query(Reseller).filter(Reseller.user_id == user_id).delete()
     session.commit()
+    invalidate_role_cache(user_id)
 
 
 def remove_cart_item(user_id: int, item_name: str) -> None:
@@ -125,3 +152,8 @@ def clear_cart(user_id: int) -> None:
     session = Database().session
     session.query(CartItem).filter(CartItem.user_id == user_id).delete()
     session.commit()
+
+
+def delete_scheduled_task(task_id: int) -> None:
+    Database().session.query(ScheduledTask).filter(ScheduledTask.id == task_id).delete()
+    Database().session.commit()
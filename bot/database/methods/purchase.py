@@ -0,0 +1,109 @@
+"""Purchases settled as a single unit of work.
+
+Claiming the stock unit, debiting the buyer, recording the sale, crediting
+the referrer, lottery tickets, the streak and achievements are staged on one
+session and committed once, so a failure part way leaves nothing behind.
+"""
+import datetime
+
+from bot.database import Database
+from bot.database.models import User
+from bot.database.user_context import forget_user_context
+from bot.database.methods.dates import as_datetime
+from bot.database.methods.read import can_get_referral_reward, invalidate_purchase_count
+from bot.database.methods.sales import advance_purchase_streak, grant_missing_achievements, record_sale
+from bot.database.methods.stock import claim_unit
+
+
+def _debit(session, user_id: int, amount, require_funds: bool) -> bool:
+    query = session.query(User).filter(User.telegram_id == user_id)
+    if require_funds:
+        query = query.filter(User.balance >= amount)
+    return bool(query.update({User.balance: User.balance - amount}, synchronize_session=False))
+
+
+def _credit_referral(session, referral_id: int | None, percent, item_name: str, price) -> float | None:
+    if not (referral_id and percent and can_get_referral_reward(item_name)):
+        return None
+    reward = round(price * percent / 100, 2)
+    session.query(User).filter(User.telegram_id == referral_id).update(
+        {User.balance: User.balance + reward}, synchronize_session=False)
+    return reward
+
+
+def _finish(session, user_id: int, tickets: int, bought_time: datetime.datetime, achievements) -> tuple:
+    session.query(User).filter(User.telegram_id == user_id).update(
+        {User.lottery_tickets: User.lottery_tickets + tickets}, synchronize_session=False)
+    granted = []
+    if tickets:
+        advance_purchase_streak(session, user_id)
+        granted = grant_missing_achievements(session, user_id, achievements,
+                                             bought_time.strftime('%Y-%m-%d %H:%M:%S'))
+    balance = session.query(User.balance).filter(User.telegram_id == user_id).scalar()
+    return balance, granted
+
+
+def purchase_with_balance(user_id: int, item_name: str, price, bought_time: datetime.datetime | str,
+                          gift_to: int | None = None, gift_name: str | None = None,
+                          referral_id: int | None = None, referral_percent=0) -> dict | None:
+    """Buy one unit of ``item_name`` from the user's balance.
+
+    Returns None, with nothing changed, when the item is out of stock or the
+    balance no longer covers ``price``. Otherwise returns the claimed value,
+    the new balance, the referral reward (or None) and the achievements granted.
+    """
+    session = Database().session
+    bought_time = as_datetime(bought_time)
+    value = claim_unit(session, item_name)
+    if value is None or not _debit(session, user_id, price, require_funds=True):
+        session.rollback()
+        return None
+    if gift_to:
+        record_sale(session, value['item_name'], value['value'], price, gift_to, bought_time)
+        record_sale(session, value['item_name'], f'Gifted to @{gift_name}', price, user_id, bought_time)
+    else:
+        record_sale(session, value['item_name'], value['value'], price, user_id, bought_time)
+    reward = _credit_referral(session, referral_id, referral_percent, value['item_name'], price)
+    achievements = ('gift_sent', 'first_purchase') if gift_to else ('first_purchase',)
+    balance, granted = _finish(session, user_id, 1, bought_time, achievements)
+    session.commit()
+    for telegram_id in (user_id, gift_to, referral_id):
+        if telegram_id:
+            forget_user_context(telegram_id)
+    for buyer_id in (user_id, gift_to):
+        if buyer_id:
+            invalidate_purchase_count(buyer_id)
+    return {'value': value, 'balance': balance, 'referral_reward': reward, 'achievements': granted}
+
+
+def settle_cart_purchase(user_id: int, units: list[dict], bought_time: datetime.datetime | str,
+                         referral_id: int | None = None, referral_percent=0) -> dict:
+    """Record a paid cart whose units were already claimed at checkout.
+
+    ``units`` are ``{'value': claimed value, 'amount': price}`` entries. Every
+    unit is charged to the balance, which the payment has just topped up.
+    Returns the new balance, the ``(item_name, reward)`` referral credits and
+    the achievements granted.
+    """
+    session = Database().session
+    bought_time = as_datetime(bought_time)
+    rewards = []
+    sold = 0
+    for unit in units:
+        value = unit.get('value')
+        if not value:
+            continue
+        price = float(unit.get('amount', 0))
+        _debit(session, user_id, price, require_funds=False)
+        record_sale(session, value['item_name'], value['value'], price, user_id, bought_time)
+        reward = _credit_referral(session, referral_id, referral_percent, value['item_name'], price)
+        if reward is not None:
+            rewards.append((value['item_name'], reward))
+        sold += 1
+    balance, granted = _finish(session, user_id, sold, bought_time, ('first_purchase',))
+    session.commit()
+    forget_user_context(user_id)
+    invalidate_purchase_count(user_id)
+    if referral_id:
+        forget_user_context(referral_id)
+    return {'balance': balance, 'referral_rewards': rewards, 'achievements': granted}
@@ -1,12 +1,18 @@
 import datetime
 
 import json
+import threading
+import time
+from collections import OrderedDict
 
-from typing import Sequence
+from typing import Iterable, Sequence
 
 import sqlalchemy
 from sqlalchemy import exc, func
 
+from bot.database.catalog import CategoryNode, get_catalog
+from bot.database.user_context import UserContext, current_user_context, forget_user_context, load_user_context
+from bot.misc import EnvKeys
 from bot.database.models import (
     Database,
     User,
@@ -26,8 +32,12 @@ from bot.database.models import (
     CartItem,
     CategoryPassword,
     UserCategoryPassword,
+    StockSummary,
+    ReferralStats,
+    DailyStats,
+    BroadcastJob,
+    ScheduledTask,
 )
-from bot.utils.reservations import has_active_reservation
 
 
 def check_user(telegram_id: int) -> User | None:
@@ -37,6 +47,11 @@ def check_user(telegram_id: int) -> User | None:
         return None
 
 
+def get_user_context(telegram_id: int) -> UserContext | None:
+    """Return the user's context for this update, loading it if needed."""
+    return current_user_context(telegram_id) or load_user_context(telegram_id)
+
+
 def check_user_by_username(username: str) -> User | None:
     try:
         return Database().session.query(User).filter(User.username == username).one()
@@ -44,9 +59,86 @@ def check_user_by_username(username: str) -> User | None:
         return None
 
 
-def check_role(telegram_id: int) -> User | None:
-    role_id = Database().session.query(User.role_id).filter(User.telegram_id == telegram_id).one()[0]
-    return Database().session.query(Role.permissions).filter(Role.id == role_id).one()[0]
+class _UserCache:
+    """Least recently used values per user, each trusted for at most ``ttl`` seconds.
+
+    Shared by the DB worker threads, hence the lock.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._values: OrderedDict[int, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: int):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._values[key]
+                return None
+            self._values.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: int, value) -> None:
+        with self._lock:
+            self._values[key] = (time.monotonic(), value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def pop(self, key: int) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+_CACHE_SIZE = int(EnvKeys.USER_CACHE_SIZE)
+_CACHE_TTL = float(EnvKeys.USER_CACHE_TTL)
+# telegram_id -> permissions / reseller flag; dropped by invalidate_role_cache()
+_PERMISSIONS = _UserCache(_CACHE_SIZE, _CACHE_TTL)
+_RESELLERS = _UserCache(_CACHE_SIZE, _CACHE_TTL)
+# buyer_id -> number of purchases; dropped by invalidate_purchase_count()
+_PURCHASE_COUNTS = _UserCache(_CACHE_SIZE, _CACHE_TTL)
+
+BOUGHT_ITEMS_PAGE_SIZE = 10
+PURCHASE_DATES_PAGE_SIZE = 20
+PURCHASES_PAGE_SIZE = 20
+
+
+def invalidate_role_cache(telegram_id: int | str | None = None) -> None:
+    """Forget cached roles for one user, or for everyone when no id is given."""
+    forget_user_context(telegram_id)
+    if telegram_id is None:
+        _PERMISSIONS.clear()
+        _RESELLERS.clear()
+        return
+    _PERMISSIONS.pop(int(telegram_id))
+    _RESELLERS.pop(int(telegram_id))
+
+
+def check_role(telegram_id: int) -> int:
+    context = current_user_context(telegram_id)
+    if context is not None and context.permissions is not None:
+        return context.permissions
+    permissions = _PERMISSIONS.get(int(telegram_id))
+    if permissions is None:
+        permissions = (
+            Database().session.query(Role.permissions)
+            .join(User, User.role_id == Role.id)
+            .filter(User.telegram_id == telegram_id)
+            .one()[0]
+        )
+        _PERMISSIONS.set(int(telegram_id), permissions)
+    return permissions
 
 
 def check_role_name_by_id(role_id: int):
@@ -61,16 +153,19 @@ def get_role_id_by_name(role_name: str) -> int | None:
         return None
 
 
+def _day_range(date: str) -> tuple[datetime.datetime, datetime.datetime]:
+    """Return the half-open [start, end) datetime range covering ``date``."""
+    start = datetime.datetime.strptime(date, "%Y-%m-%d")
+    return start, start + datetime.timedelta(days=1)
+
+
 def select_today_users(date: str) -> int | None:
     try:
-        date_obj = datetime.datetime.strptime(date, "%Y-%m-%d").date()
-        start_of_day = datetime.datetime.combine(date_obj, datetime.time.min)
-        end_of_day = datetime.datetime.combine(date_obj, datetime.time.max)
-
-        return Database().session.query(User).filter(
-            User.registration_date >= str(start_of_day),
-            User.registration_date <= str(end_of_day)
-        ).count()
+        start, end = _day_range(date)
+        return Database().session.query(func.count(User.telegram_id)).filter(
+            User.registration_date >= start,
+            User.registration_date < end,
+        ).scalar()
     except exc.NoResultFound:
         return None
 
@@ -90,6 +185,34 @@ def get_all_users() -> list[tuple[int]]:
     return Database().session.query(User.telegram_id).all()
 
 
+def get_broadcast_recipients(after_id: int | None = None, limit: int = 500) -> list[int]:
+    """Return up to ``limit`` user ids greater than ``after_id``, in id order."""
+    query = Database().session.query(User.telegram_id)
+    if after_id is not None:
+        query = query.filter(User.telegram_id > after_id)
+    return [row[0] for row in query.order_by(User.telegram_id).limit(limit)]
+
+
+def get_running_broadcast_jobs() -> list[int]:
+    return [row[0] for row in Database().session.query(BroadcastJob.id).filter(BroadcastJob.status == 'running')]
+
+
+def get_broadcast_job(job_id: int) -> dict | None:
+    result = Database().session.query(BroadcastJob).filter(BroadcastJob.id == job_id).first()
+    return dict(result.__dict__) if result else None
+
+
+def get_scheduled_tasks_before(until: datetime.datetime) -> list[tuple[int, str, datetime.datetime, dict]]:
+    """Return ``(id, kind, run_at, payload)`` for every task due before ``until``, earliest first."""
+    rows = (
+        Database().session.query(ScheduledTask.id, ScheduledTask.kind, ScheduledTask.run_at, ScheduledTask.payload)
+        .filter(ScheduledTask.run_at < until)
+        .order_by(ScheduledTask.run_at)
+        .all()
+    )
+    return [(task_id, kind, run_at, json.loads(payload)) for task_id, kind, run_at, payload in rows]
+
+
 def get_resellers() -> list[tuple[int, str | None]]:
     session = Database().session
     return session.query(User.telegram_id, User.username).join(
@@ -98,125 +221,71 @@ def get_resellers() -> list[tuple[int, str | None]]:
 
 
 def is_reseller(user_id: int) -> bool:
-    return Database().session.query(Reseller).filter(Reseller.user_id == user_id).first() is not None
+    context = current_user_context(user_id)
+    if context is not None:
+        return context.reseller
+    result = _RESELLERS.get(int(user_id))
+    if result is None:
+        result = Database().session.query(Reseller).filter(Reseller.user_id == user_id).first() is not None
+        _RESELLERS.set(int(user_id), result)
+    return result
 
 
 def item_in_stock(item_name: str) -> bool:
-    """Return True if item has unlimited quantity or remaining stock."""
-    if check_value(item_name):
-        return True
-    if select_item_values_amount(item_name) > 0:
-        return True
-    return has_active_reservation(item_name)
+    """Return True if item has unlimited quantity, remaining or reserved stock."""
+    return item_name in get_catalog().in_stock
 
 
 def get_all_categories() -> list[str]:
     """Return categories that contain at least one item in stock."""
-    session = Database().session
-    categories = [
-        c[0]
-        for c in session.query(Categories.name)
-        .filter(Categories.parent_name.is_(None))
-        .order_by(Categories.title)
-        .all()
-    ]
-    result = []
-    for name in categories:
-        if get_all_items(name) or get_subcategories(name):
-            result.append(name)
-    return result
+    catalog = get_catalog()
+    return [name for name in catalog.roots if catalog.has_stock(name)]
 
 
 def get_all_category_names() -> list[str]:
     """Return all top-level categories regardless of contents."""
-    session = Database().session
-    return [
-        c[0]
-        for c in session.query(Categories.name)
-        .filter(Categories.parent_name.is_(None))
-        .order_by(Categories.title)
-        .all()
-    ]
+    return list(get_catalog().roots)
 
 
 def get_categories_with_lock_status() -> list[tuple[str, str, bool]]:
     """Return main categories with their lock status."""
-    session = Database().session
-    rows = (
-        session.query(
-            Categories.name,
-            Categories.title,
-            Categories.requires_password,
-        )
-        .filter(Categories.parent_name.is_(None))
-        .order_by(Categories.title)
-        .all()
-    )
+    catalog = get_catalog()
     return [
-        (name, title or name, bool(locked)) for name, title, locked in rows
+        (name, catalog.categories[name].title, catalog.categories[name].requires_password)
+        for name in catalog.roots
     ]
 
 
 def get_all_subcategories(parent_name: str) -> list[str]:
     """Return all subcategories of a given category."""
-    session = Database().session
-    return [
-        c[0]
-        for c in session.query(Categories.name)
-        .filter(Categories.parent_name == parent_name)
-        .order_by(Categories.title)
-        .all()
-    ]
+    node = get_catalog().categories.get(parent_name)
+    return list(node.children) if node else []
 
 
 def get_subcategories(parent_name: str) -> list[str]:
-    subs = [c[0] for c in Database().session.query(Categories.name)
-            .filter(Categories.parent_name == parent_name).all()]
-    result = []
-    for sub in subs:
-        if get_all_items(sub) or get_subcategories(sub):
-            result.append(sub)
-    return result
+    catalog = get_catalog()
+    node = catalog.categories.get(parent_name)
+    return [sub for sub in node.children if catalog.has_stock(sub)] if node else []
 
 
 def get_category_parent(category_name: str) -> str | None:
-    result = (Database().session.query(Categories.parent_name)
-              .filter(Categories.name == category_name).first())
-    return result[0] if result else None
+    node = get_catalog().categories.get(category_name)
+    return node.parent if node else None
 
 
 def is_category_locked(category_name: str) -> bool:
-    result = (
-        Database()
-        .session.query(Categories.requires_password)
-        .filter(Categories.name == category_name)
-        .first()
-    )
-    return bool(result[0]) if result else False
+    node = get_catalog().categories.get(category_name)
+    return node.requires_password if node else False
 
 
 def get_category_title(name: str) -> str:
-    result = (
-        Database()
-        .session.query(Categories.title)
-        .filter(Categories.name == name)
-        .first()
-    )
-    if not result:
-        return name
-    return result[0] or name
+    node = get_catalog().categories.get(name)
+    return node.title if node else name
 
 
 def get_category_titles(names: Sequence[str]) -> dict[str, str]:
-    if not names:
-        return {}
-    session = Database().session
-    rows = (
-        session.query(Categories.name, Categories.title)
-        .filter(Categories.name.in_(list(names)))
-        .all()
-    )
-    return {name: title or name for name, title in rows}
+    categories = get_catalog().categories
+    return {name: categories[name].title for name in names if name in categories}
 
 
 def get_user_category_password(user_id: int, category_name: str) -> UserCategoryPassword | None:
@@ -283,48 +352,30 @@ def get_user_category_passwords(user_id: int) -> list[UserCategoryPassword]:
 
 
 def get_all_items(category_name: str) -> list[str]:
-    items = [item[0] for item in
-             Database().session.query(Goods.name)
-             .filter(Goods.category_name == category_name).all()]
-    return [name for name in items if item_in_stock(name)]
+    return get_catalog().stocked_items(category_name)
 
 
 def get_all_item_names(category_name: str) -> list[str]:
     """Return all items for a category regardless of stock."""
-    return [item[0] for item in
-            Database().session.query(Goods.name)
-            .filter(Goods.category_name == category_name).all()]
+    node = get_catalog().categories.get(category_name)
+    return list(node.items) if node else []
 
 
 def get_out_of_stock_items(category_name: str) -> list[str]:
     """Return items in a category that currently have no stock."""
-    items = get_all_item_names(category_name)
-    result = []
-    for name in items:
-        if not item_in_stock(name):
-            result.append(name)
-    return result
+    return get_catalog().missing_items(category_name)
 
 
 def get_out_of_stock_categories() -> list[str]:
     """Return root categories containing any out-of-stock items."""
-    categories = [c[0] for c in Database().session.query(Categories.name)
-                  .filter(Categories.parent_name.is_(None)).all()]
-    result = []
-    for name in categories:
-        if get_out_of_stock_items(name) or get_out_of_stock_subcategories(name):
-            result.append(name)
-    return result
+    catalog = get_catalog()
+    return [name for name in catalog.roots if catalog.has_missing(name)]
 
 
 def get_out_of_stock_subcategories(parent_name: str) -> list[str]:
-    subs = [c[0] for c in Database().session.query(Categories.name)
-            .filter(Categories.parent_name == parent_name).all()]
-    result = []
-    for sub in subs:
-        if get_out_of_stock_items(sub) or get_out_of_stock_subcategories(sub):
-            result.append(sub)
-    return result
+    catalog = get_catalog()
+    node = catalog.categories.get(parent_name)
+    return [sub for sub in node.children if catalog.has_missing(sub)] if node else []
 
 
 def get_bought_item_info(item_id: str) -> dict | None:
@@ -347,12 +398,35 @@ def get_item_info(item_name: str, user_id: int | None = None) -> dict | None:
     return data
 
 
+def get_items_info(item_names: Iterable[str], user_id: int | None = None) -> dict[str, dict]:
+    """Bulk variant of :func:`get_item_info`; unknown items are left out."""
+    names = list(dict.fromkeys(item_names))
+    if not names:
+        return {}
+    session = Database().session
+    result = {row.name: row.__dict__.copy()
+              for row in session.query(Goods).filter(Goods.name.in_(names))}
+    if result and user_id is not None and is_reseller(user_id):
+        prices = session.query(ResellerPrice.item_name, ResellerPrice.price).filter(
+            ResellerPrice.reseller_id.is_(None), ResellerPrice.item_name.in_(list(result))
+        )
+        for item_name, price in prices:
+            result[item_name]['price'] = price
+    return result
+
+
 def get_user_balance(telegram_id: int) -> float | None:
+    context = current_user_context(telegram_id)
+    if context is not None:
+        return context.balance
     result = Database().session.query(User.balance).filter(User.telegram_id == telegram_id).first()
     return result[0] if result else None
 
 
 def get_user_language(telegram_id: int) -> str | None:
+    context = current_user_context(telegram_id)
+    if context is not None:
+        return context.language
     result = Database().session.query(User.language).filter(User.telegram_id == telegram_id).first()
     return result[0] if result else None
 
@@ -384,6 +458,9 @@ def get_cart_total(user_id: int) -> float:
 
 
 def get_user_tickets(telegram_id: int) -> int:
+    context = current_user_context(telegram_id)
+    if context is not None:
+        return context.lottery_tickets
     result = (Database().session.query(User.lottery_tickets)
               .filter(User.telegram_id == telegram_id).first())
     return result[0] if result else 0
@@ -409,7 +486,8 @@ def get_achievement_users(code: str) -> int:
 
 
 def get_all_admins() -> list[int]:
-    return [admin[0] for admin in Database().session.query(User.telegram_id).filter(User.role_id == 'ADMIN').all()]
+    return [admin[0] for admin in Database().session.query(User.telegram_id).join(Role, User.role_id == Role.id)
+            .filter(Role.name == 'ADMIN').all()]
 
 
 def check_item(item_name: str) -> dict | None:
@@ -422,39 +500,23 @@ def check_category(category_name: str) -> dict | None:
     return result.__dict__ if result else None
 
 
+def _item_root_category(item_name: str) -> CategoryNode | None:
+    catalog = get_catalog()
+    category_name = catalog.item_category.get(item_name)
+    root = catalog.root_of(category_name) if category_name else None
+    return root if root is not None and root.parent is None else None
+
+
 def can_use_discount(item_name: str) -> bool:
     """Return True if item's main category allows discounts."""
-    session = Database().session
-    category_name = session.query(Goods.category_name).filter(Goods.name == item_name).scalar()
-    if not category_name:
-        return True
-    while True:
-        category = session.query(Categories.parent_name, Categories.allow_discounts) \
-            .filter(Categories.name == category_name).first()
-        if not category:
-            return True
-        parent, allow = category
-        if parent is None:
-            return bool(allow)
-        category_name = parent
+    root = _item_root_category(item_name)
+    return root.allow_discounts if root else True
 
 
 def can_get_referral_reward(item_name: str) -> bool:
     """Return True if item's main category allows referral rewards."""
-    session = Database().session
-    category_name = session.query(Goods.category_name).filter(Goods.name == item_name).scalar()
-    if not category_name:
-        return True
-    while True:
-        category = session.query(Categories.parent_name, Categories.allow_referral_rewards) \
-            .filter(Categories.name == category_name).first()
-        if not category:
-            return True
-        parent, allow = category
-        if parent is None:
-            return bool(allow)
-        category_name = parent
-
+    root = _item_root_category(item_name)
+    return root.allow_referral_rewards if root else True
 
 
 def get_item_value(item_name: str) -> dict | None:
@@ -475,17 +537,36 @@ def select_item_values_amount(item_name: str) -> int:
     return Database().session.query(func.count()).filter(ItemValues.item_name == item_name).scalar()
 
 
-def check_value(item_name: str) -> bool | None:
-    try:
-        result = False
-        values = select_item_values_amount(item_name)
-        for i in range(values):
-            is_inf = Database().session.query(ItemValues).filter(ItemValues.item_name == item_name).first()
-            if is_inf and is_inf.is_infinity:
-                result = True
-    except exc.NoResultFound:
-        return False
-    return result
+def check_value(item_name: str) -> bool:
+    """Return True if the item has unlimited stock."""
+    return Database().session.query(
+        Database().session.query(StockSummary)
+        .filter(StockSummary.item_name == item_name, StockSummary.infinite.is_(True))
+        .exists()
+    ).scalar()
+
+
+def get_stock_levels(item_names: Iterable[str]) -> dict[str, tuple[int, bool, int]]:
+    """Return ``{name: (available, infinite, reserved)}`` for several items at once.
+
+    Unknown items are reported as ``(0, False, 0)``.
+    """
+    names = list(dict.fromkeys(item_names))
+    levels = {name: (0, False, 0) for name in names}
+    if not names:
+        return levels
+    rows = Database().session.query(
+        StockSummary.item_name, StockSummary.available, StockSummary.infinite, StockSummary.reserved
+    ).filter(StockSummary.item_name.in_(names))
+    for name, available, infinite, reserved in rows:
+        levels[name] = (available, bool(infinite), reserved)
+    return levels
+
+
+def is_stock_empty(item_name: str) -> bool:
+    """Return True if the item has neither stock rows nor unlimited quantity."""
+    available, infinite, _ = get_stock_levels([item_name])[item_name]
+    return available == 0 and not infinite
 
 
 def has_stock_notification(user_id: int, item_name: str) -> bool:
@@ -499,12 +580,39 @@ def get_item_subscribers(item_name: str) -> list[int]:
             .filter(StockNotification.item_name == item_name).all()]
 
 
-def select_user_items(buyer_id: int) -> int:
-    return Database().session.query(func.count()).filter(BoughtGoods.buyer_id == buyer_id).scalar()
+def invalidate_purchase_count(buyer_id: int | str) -> None:
+    """Forget the cached purchase count of ``buyer_id`` after a sale was committed."""
+    _PURCHASE_COUNTS.pop(int(buyer_id))
 
 
-def select_bought_items(buyer_id: int) -> list[str]:
-    return Database().session.query(BoughtGoods).filter(BoughtGoods.buyer_id == buyer_id).all()
+def select_user_items(buyer_id: int) -> int:
+    context = current_user_context(buyer_id)
+    if context is not None:
+        return context.purchases
+    count = _PURCHASE_COUNTS.get(int(buyer_id))
+    if count is None:
+        count = Database().session.query(func.count()).filter(BoughtGoods.buyer_id == buyer_id).scalar()
+        _PURCHASE_COUNTS.set(int(buyer_id), count)
+    return count
+
+
+def get_bought_items_page(buyer_id: int, after_id: int | None = None, before_id: int | None = None,
+                          offset: int = 0, limit: int = BOUGHT_ITEMS_PAGE_SIZE) -> list:
+    """Return one page of ``(id, item_name)`` purchases, oldest first.
+
+    Pages are addressed by the last id of the previous page (``after_id``) or
+    the first id of the next one (``before_id``), so every flip is an index
+    range scan on (buyer_id, id) however long the history is. ``offset`` is
+    only used for page buttons that carry no cursor.
+    """
+    query = Database().session.query(BoughtGoods.id, BoughtGoods.item_name).filter(
+        BoughtGoods.buyer_id == buyer_id)
+    if before_id is not None:
+        rows = query.filter(BoughtGoods.id < before_id).order_by(BoughtGoods.id.desc()).limit(limit).all()
+        return rows[::-1]
+    if after_id is not None:
+        query = query.filter(BoughtGoods.id > after_id)
+    return query.order_by(BoughtGoods.id).offset(offset).limit(limit).all()
 
 
 def select_bought_item(unique_id: int) -> dict | None:
@@ -512,39 +620,48 @@ def select_bought_item(unique_id: int) -> dict | None:
     return result.__dict__ if result else None
 
 
-def bought_items_list(buyer_id: int) -> list[str]:
-    return [
-        item[0] for item in
-        Database().session.query(BoughtGoods.item_name).filter(BoughtGoods.buyer_id == buyer_id).all()]
-
+def get_purchase_dates(page: int = 0, per_page: int = PURCHASE_DATES_PAGE_SIZE) -> tuple[list[str], int]:
+    """Return one page of days with sales, newest first, and the number of such days.
 
-def get_purchase_dates() -> list[str]:
-    return [d[0] for d in Database().session.query(func.date(BoughtGoods.bought_datetime)).distinct().all()]
+    Read from the ``daily_stats`` rollup rather than scanning purchases.
+    """
+    query = Database().session.query(DailyStats.day).filter(DailyStats.orders > 0)
+    total = query.count()
+    days = query.order_by(DailyStats.day.desc()).offset(page * per_page).limit(per_page).all()
+    return [str(day) for day, in days], total
 
 
-def get_purchases_by_date(date: str) -> list[dict]:
+def get_purchases_by_date(date: str, page: int = 0,
+                          per_page: int = PURCHASES_PAGE_SIZE) -> tuple[list[dict], int]:
+    """Return one page of a day's purchases as ``unique_id``/``item_name`` dicts and the day's total."""
+    start, end = _day_range(date)
+    session = Database().session
     rows = (
-        Database().session.query(BoughtGoods)
-        .filter(func.date(BoughtGoods.bought_datetime) == date)
+        session.query(BoughtGoods.unique_id, BoughtGoods.item_name)
+        .filter(BoughtGoods.bought_datetime >= start, BoughtGoods.bought_datetime < end)
+        .order_by(BoughtGoods.bought_datetime, BoughtGoods.id)
+        .offset(page * per_page)
+        .limit(per_page)
         .all()
     )
-    return [r.__dict__ for r in rows]
+    total = session.query(DailyStats.orders).filter(DailyStats.day == start.date()).scalar() or 0
+    return [dict(row._mapping) for row in rows], total
 
 
 def select_all_users() -> int:
-    return Database().session.query(func.count()).filter(User).scalar()
+    return Database().session.query(func.count(User.telegram_id)).scalar()
 
 
 def select_count_items() -> int:
-    return Database().session.query(ItemValues).count()
+    return Database().session.query(func.coalesce(func.sum(StockSummary.available), 0)).scalar()
 
 
 def select_count_goods() -> int:
-    return Database().session.query(Goods).count()
+    return len(get_catalog().item_category)
 
 
 def select_count_categories() -> int:
-    return Database().session.query(Categories).count()
+    return len(get_catalog().categories)
 
 
 def select_count_bought_items() -> int:
@@ -553,15 +670,12 @@ def select_count_bought_items() -> int:
 
 def select_today_orders(date: str) -> int | None:
     try:
-        date_obj = datetime.datetime.strptime(date, "%Y-%m-%d").date()
-        start_of_day = datetime.datetime.combine(date_obj, datetime.time.min)
-        end_of_day = datetime.datetime.combine(date_obj, datetime.time.max)
-
+        start, end = _day_range(date)
         return (
                 Database().session.query(func.sum(BoughtGoods.price))
                 .filter(
-                    func.date(BoughtGoods.bought_datetime) >= start_of_day.date(),
-                    func.date(BoughtGoods.bought_datetime) <= end_of_day.date()
+                    BoughtGoods.bought_datetime >= start,
+                    BoughtGoods.bought_datetime < end,
                 )
                 .scalar() or 0
         )
@@ -575,15 +689,12 @@ def select_all_orders() -> float:
 
 def select_today_operations(date: str) -> int | None:
     try:
-        date_obj = datetime.datetime.strptime(date, "%Y-%m-%d").date()
-        start_of_day = datetime.datetime.combine(date_obj, datetime.time.min)
-        end_of_day = datetime.datetime.combine(date_obj, datetime.time.max)
-
+        start, end = _day_range(date)
         return (
                 Database().session.query(func.sum(Operations.operation_value))
                 .filter(
-                    func.date(Operations.operation_time) >= start_of_day.date(),
-                    func.date(Operations.operation_time) <= end_of_day.date()
+                    Operations.operation_time >= start,
+                    Operations.operation_time < end,
                 )
                 .scalar() or 0
         )
@@ -595,6 +706,32 @@ def select_all_operations() -> float:
     return Database().session.query(func.sum(Operations.operation_value)).scalar() or 0
 
 
+def get_daily_stats(date: str, days: int | None = None) -> dict[str, dict[str, int]]:
+    """Return rollup totals for ``date``, the ``days`` ending on it and all time.
+
+    Each entry maps ``new_users``, ``orders``, ``sales`` and ``topups`` to sums.
+    """
+    day = datetime.date.fromisoformat(date)
+    since = day - datetime.timedelta(days=(days or 1) - 1)
+    columns = ('new_users', 'orders', 'sales', 'topups')
+    windows = {
+        'today': DailyStats.day == day,
+        'period': (DailyStats.day >= since) & (DailyStats.day <= day),
+        'total': None,
+    }
+    selected = []
+    for condition in windows.values():
+        for name in columns:
+            column = getattr(DailyStats, name)
+            value = column if condition is None else sqlalchemy.case((condition, column), else_=0)
+            selected.append(func.coalesce(func.sum(value), 0))
+    row = Database().session.query(*selected).one()
+    return {
+        window: dict(zip(columns, row[i * len(columns):(i + 1) * len(columns)]))
+        for i, window in enumerate(windows)
+    }
+
+
 def select_users_balance() -> float:
     return Database().session.query(func.sum(User.balance)).scalar()
 
@@ -641,6 +778,36 @@ def get_user_unfinished_operation(user_id: int) -> tuple[str, int | None] | None
     return (result.operation_id, result.message_id) if result else None
 
 
+def get_expired_operations(now: datetime.datetime, limit: int) -> list[dict]:
+    """Return up to ``limit`` unfinished operations whose invoice expired by ``now``, oldest first."""
+    rows = (
+        Database()
+        .session.query(
+            UnfinishedOperations.operation_id,
+            UnfinishedOperations.user_id,
+            UnfinishedOperations.operation_value,
+            UnfinishedOperations.message_id,
+            UnfinishedOperations.provider,
+            UnfinishedOperations.payload,
+        )
+        .filter(UnfinishedOperations.expires_at <= now)
+        .order_by(UnfinishedOperations.expires_at)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            'operation_id': row.operation_id,
+            'user_id': row.user_id,
+            'value': row.operation_value,
+            'message_id': row.message_id,
+            'provider': row.provider,
+            'payload': json.loads(row.payload) if row.payload else None,
+        }
+        for row in rows
+    ]
+
+
 def check_user_referrals(user_id: int) -> list[int]:
     return Database().session.query(User).filter(User.referral_id == user_id).count()
 
@@ -652,17 +819,22 @@ def get_user_referral(user_id: int) -> int | None:
 
 def sum_referral_operations(user_id: int) -> int:
     """Return total top-up amount from users referred by given user."""
-    session = Database().session
-    refs = session.query(User.telegram_id).filter(User.referral_id == user_id).all()
-    total = 0
-    for (ref_id,) in refs:
-        ops_sum = (
-            session.query(func.sum(Operations.operation_value))
-            .filter(Operations.user_id == ref_id)
-            .scalar()
-        )
-        total += ops_sum or 0
-    return total
+    return (
+        Database().session.query(func.coalesce(func.sum(Operations.operation_value), 0))
+        .join(User, User.telegram_id == Operations.user_id)
+        .filter(User.referral_id == user_id)
+        .scalar()
+    )
+
+
+def get_referral_stats(user_id: int) -> tuple[int, int]:
+    """Return ``(referrals, total top-ups)`` for a referrer from the summary table."""
+    result = (
+        Database().session.query(ReferralStats.referrals, ReferralStats.topped_up)
+        .filter(ReferralStats.referrer_id == user_id)
+        .first()
+    )
+    return (result[0], result[1]) if result else (0, 0)
 
 
 def get_promocode(code: str) -> dict | None:
@@ -0,0 +1,57 @@
+"""Helpers keeping ``referral_stats`` in step with users and top-ups.
+
+A referrer's totals are adjusted by one UPDATE in the transaction that
+registers the referred user or books their top-up; a referrer without a
+summary row yet is recounted from the users and operations tables.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from bot.database import upsert
+from bot.database.models import Operations, ReferralStats, User
+
+
+def recount_referral_stats(session: Session, referrer_id: int) -> None:
+    """Recompute a referrer's totals with one join over their referrals."""
+    referrals, topped_up = (
+        session.query(
+            func.count(func.distinct(User.telegram_id)),
+            func.coalesce(func.sum(Operations.operation_value), 0),
+        )
+        .select_from(User)
+        .outerjoin(Operations, Operations.user_id == User.telegram_id)
+        .filter(User.referral_id == referrer_id)
+        .one()
+    )
+    upsert(
+        session,
+        ReferralStats,
+        {'referrer_id': referrer_id, 'referrals': referrals, 'topped_up': topped_up},
+        conflict=('referrer_id',),
+        update_fields=('referrals', 'topped_up'),
+    )
+
+
+def add_referral(session: Session, referrer_id: int) -> None:
+    """Count one newly registered user towards ``referrer_id``'s totals."""
+    updated = (
+        session.query(ReferralStats)
+        .filter(ReferralStats.referrer_id == referrer_id)
+        .update({ReferralStats.referrals: ReferralStats.referrals + 1}, synchronize_session=False)
+    )
+    if not updated:
+        recount_referral_stats(session, referrer_id)
+
+
+def add_referral_topup(session: Session, user_id: int, value: int) -> None:
+    """Credit a top-up by ``user_id`` to the totals of whoever referred them."""
+    referrer_id = session.query(User.referral_id).filter(User.telegram_id == user_id).scalar()
+    if referrer_id is None:
+        return
+    updated = (
+        session.query(ReferralStats)
+        .filter(ReferralStats.referrer_id == referrer_id)
+        .update({ReferralStats.topped_up: ReferralStats.topped_up + value}, synchronize_session=False)
+    )
+    if not updated:
+        recount_referral_stats(session, referrer_id)
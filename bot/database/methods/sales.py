@@ -0,0 +1,62 @@
+"""Helpers recording a sale and its side effects on the buyer.
+
+The purchase methods call them inside the transaction that claims the unit
+and debits the balance, so the history row, the streak and any new
+achievements are committed or rolled back together with the sale.
+"""
+import datetime
+import random
+
+from sqlalchemy.orm import Session
+
+from bot.database.models import BoughtGoods, User, UserAchievement
+from bot.database.methods.daily_stats import bump_daily_stats
+
+
+def record_sale(session: Session, item_name: str, value: str, price: int, buyer_id: int,
+                bought_time: datetime.datetime) -> int:
+    """Add a purchase to the buyer's history and the daily rollup; returns its unique id."""
+    unique_id = random.randint(1000000000, 9999999999)
+    session.add(
+        BoughtGoods(name=item_name, value=value, price=price, buyer_id=buyer_id, bought_datetime=bought_time,
+                    unique_id=str(unique_id)))
+    bump_daily_stats(session, bought_time, orders=1, sales=price)
+    return unique_id
+
+
+def advance_purchase_streak(session: Session, telegram_id: int) -> None:
+    """Update streak data after a successful purchase."""
+    user = session.query(User).filter(User.telegram_id == telegram_id).one()
+    today = datetime.date.today()
+
+    if user.streak_discount:
+        user.streak_discount = False
+        user.purchase_streak = 0
+
+    if user.last_purchase_date:
+        last_date = datetime.date.fromisoformat(user.last_purchase_date)
+        diff = (today - last_date).days
+        if diff == 1:
+            user.purchase_streak += 1
+        elif diff > 1:
+            user.purchase_streak = 1
+    else:
+        user.purchase_streak = 1
+
+    user.last_purchase_date = today.isoformat()
+
+    if user.purchase_streak >= 3:
+        user.purchase_streak = 0
+        user.streak_discount = True
+
+
+def grant_missing_achievements(session: Session, user_id: int, codes, achieved_at: str) -> list[str]:
+    """Grant the ``codes`` the user does not have yet and return them."""
+    owned = {
+        code for code, in session.query(UserAchievement.achievement_code)
+        .filter(UserAchievement.user_id == user_id, UserAchievement.achievement_code.in_(codes))
+    }
+    granted = [code for code in codes if code not in owned]
+    for code in granted:
+        session.add(UserAchievement(user_id=user_id, achievement_code=code, achieved_at=achieved_at))
+    return granted
@@ -0,0 +1,104 @@
+"""Helpers keeping ``stock_summary`` in step with ``item_values``.
+
+They only stage changes on the given session; the calling method commits
+them together with its own stock mutation.
+"""
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import Session
+
+from bot.database import upsert
+from bot.database.catalog import mark_catalog_changed
+from bot.database.models import ItemValues, StockSummary
+
+
+def _in_stock(session: Session, item_name: str) -> bool:
+    return bool(session.query(StockSummary.in_stock()).filter(StockSummary.item_name == item_name).scalar())
+
+
+def _mark_if_flipped(session: Session, item_name: str, was_in_stock: bool) -> None:
+    # Only a change of in_stock is visible in the catalog snapshot; counter
+    # churn such as reserving and releasing units leaves it valid.
+    if _in_stock(session, item_name) != was_in_stock:
+        mark_catalog_changed(session)
+
+
+def recount_stock(session: Session, item_name: str) -> None:
+    """Recompute available/infinite for ``item_name`` from its stock rows."""
+    available, infinite = (
+        session.query(
+            func.count(ItemValues.id),
+            func.max(case((ItemValues.is_infinity.is_(True), 1), else_=0)),
+        )
+        .filter(ItemValues.item_name == item_name)
+        .one()
+    )
+    was_in_stock = _in_stock(session, item_name)
+    upsert(
+        session,
+        StockSummary,
+        {'item_name': item_name, 'available': available, 'infinite': bool(infinite), 'reserved': 0},
+        conflict=('item_name',),
+        update_fields=('available', 'infinite'),
+    )
+    _mark_if_flipped(session, item_name, was_in_stock)
+
+
+def adjust_stock(session: Session, item_name: str, *, available: int = 0, reserved: int = 0,
+                 infinite: bool | None = None) -> None:
+    """Apply counter deltas to an item's summary row."""
+    values = {}
+    if available:
+        values[StockSummary.available] = StockSummary.available + available
+    if reserved:
+        values[StockSummary.reserved] = case(
+            (StockSummary.reserved + reserved < 0, 0), else_=StockSummary.reserved + reserved
+        )
+    if infinite is not None:
+        values[StockSummary.infinite] = infinite
+    if not values:
+        return
+    was_in_stock = _in_stock(session, item_name)
+    updated = (
+        session.query(StockSummary)
+        .filter(StockSummary.item_name == item_name)
+        .update(values, synchronize_session=False)
+    )
+    if not updated:
+        recount_stock(session, item_name)
+        if reserved > 0:
+            adjust_stock(session, item_name, reserved=reserved)
+        return
+    _mark_if_flipped(session, item_name, was_in_stock)
+
+
+def claim_unit(session: Session, item_name: str) -> dict | None:
+    """Take one stock unit of ``item_name`` for exactly one buyer.
+
+    Finite units are removed with a conditional DELETE, so concurrent buyers
+    can never receive the same row; unlimited values are returned without
+    being consumed. A buyer who loses the race for a row moves on to the
+    next one, so None is returned only once the item is out of stock.
+    """
+    columns = (ItemValues.id, ItemValues.item_name, ItemValues.value, ItemValues.is_infinity)
+    first = select(*columns).where(ItemValues.item_name == item_name).order_by(ItemValues.id).limit(1)
+    returning = session.get_bind().dialect.delete_returning
+    while True:
+        if returning:
+            row = session.execute(
+                delete(ItemValues)
+                .where(ItemValues.id == first.with_only_columns(ItemValues.id).scalar_subquery(),
+                       ItemValues.is_infinity.is_(False))
+                .returning(*columns)
+            ).first()
+        else:
+            row = session.execute(first.with_for_update(skip_locked=True)).first()
+            if row is not None and (row.is_infinity or not session.execute(
+                    delete(ItemValues).where(ItemValues.id == row.id)).rowcount):
+                row = None
+        if row is not None:
+            adjust_stock(session, item_name, available=-1)
+            return dict(row._mapping)
+        current = session.execute(first).first()
+        if current is None or current.is_infinity:
+            return dict(current._mapping) if current else None
+        # another buyer took the unit between our lookup and delete; try the next one
@@ -1,7 +1,10 @@
 import datetime
 import json
-import datetime
 
+from sqlalchemy import case, func, literal, select, union_all
+
+from bot.database.catalog import mark_catalog_changed
+from bot.database.user_context import forget_user_context
 from bot.database.models import (
     User,
     ItemValues,
@@ -13,8 +16,16 @@ from bot.database.models import (
     CartItem,
     CategoryPassword,
     UserCategoryPassword,
+    StockSummary,
+    BoughtGoods,
+    Operations,
+    DailyStats,
+    BroadcastJob,
+    UnfinishedOperations,
 )
-from bot.database import Database
+from bot.database import Database, upsert
+from bot.database.methods.read import invalidate_role_cache
+from bot.database.methods.sales import advance_purchase_streak
 
 
 _MISSING = object()
@@ -24,6 +35,7 @@ def set_role(telegram_id: str, role: int) -> None:
     Database().session.query(User).filter(User.telegram_id == telegram_id).update(
         values={User.role_id: role})
     Database().session.commit()
+    invalidate_role_cache(telegram_id)
 
 
 def update_balance(telegram_id: int | str, summ: int) -> None:
@@ -32,23 +44,27 @@ def update_balance(telegram_id: int | str, summ: int) -> None:
     Database().session.query(User).filter(User.telegram_id == telegram_id).update(
         values={User.balance: new_balance})
     Database().session.commit()
+    forget_user_context(telegram_id)
 
 
 def update_user_language(telegram_id: int, language: str) -> None:
     Database().session.query(User).filter(User.telegram_id == telegram_id).update(
         values={User.language: language})
     Database().session.commit()
+    forget_user_context(telegram_id)
 
 
 def update_lottery_tickets(telegram_id: int, delta: int) -> None:
     Database().session.query(User).filter(User.telegram_id == telegram_id).update(
         values={User.lottery_tickets: User.lottery_tickets + delta}, synchronize_session=False)
     Database().session.commit()
+    forget_user_context(telegram_id)
 
 
 def reset_lottery_tickets() -> None:
     Database().session.query(User).update({User.lottery_tickets: 0})
     Database().session.commit()
+    forget_user_context()
 
 
 def buy_item_for_balance(telegram_id: str, summ: int) -> int:
@@ -57,14 +73,12 @@ def buy_item_for_balance(telegram_id: str, summ: int) -> int:
     Database().session.query(User).filter(User.telegram_id == telegram_id).update(
         values={User.balance: new_balance})
     Database().session.commit()
+    forget_user_context(telegram_id)
     return Database().session.query(User.balance).filter(User.telegram_id == telegram_id).one()[0]
 
 
 def update_item(item_name: str, new_name: str, new_description: str, new_price: int,
                 new_category_name: str, new_delivery_description: str | None) -> None:
-    Database().session.query(ItemValues).filter(ItemValues.item_name == item_name).update(
-        values={ItemValues.item_name: new_name}
-    )
     Database().session.query(Goods).filter(Goods.name == item_name).update(
         values={Goods.name: new_name,
                 Goods.description: new_description,
@@ -72,13 +86,63 @@ def update_item(item_name: str, new_name: str, new_description: str, new_price:
                 Goods.category_name: new_category_name,
                 Goods.delivery_description: new_delivery_description}
     )
+    # stock, carts, prices and notifications follow the rename through ON UPDATE CASCADE
+    mark_catalog_changed(Database().session)
     Database().session.commit()
 
 
+def rebuild_stock_summary() -> None:
+    """Recount every item's stock and drop reservations lost on restart."""
+    session = Database().session
+    session.query(StockSummary).delete(synchronize_session=False)
+    session.execute(
+        StockSummary.__table__.insert().from_select(
+            ['item_name', 'available', 'infinite', 'reserved'],
+            select(
+                Goods.name,
+                func.count(ItemValues.id),
+                func.coalesce(func.max(case((ItemValues.is_infinity.is_(True), 1), else_=0)), 0) > 0,
+                literal(0),
+            )
+            .select_from(Goods)
+            .outerjoin(ItemValues, ItemValues.item_name == Goods.name)
+            .group_by(Goods.name),
+        )
+    )
+    mark_catalog_changed(session)
+    session.commit()
+
+
+def rebuild_daily_stats() -> None:
+    """Recompute every ``daily_stats`` row from users, purchases and top-ups."""
+    events = union_all(
+        select(func.date(User.registration_date).label('day'), literal(1).label('new_users'),
+               literal(0).label('orders'), literal(0).label('sales'), literal(0).label('topups')),
+        select(func.date(BoughtGoods.bought_datetime), literal(0), literal(1), BoughtGoods.price, literal(0)),
+        select(func.date(Operations.operation_time), literal(0), literal(0), literal(0), Operations.operation_value),
+    ).subquery()
+    session = Database().session
+    session.query(DailyStats).delete(synchronize_session=False)
+    session.execute(
+        DailyStats.__table__.insert().from_select(
+            ['day', 'new_users', 'orders', 'sales', 'topups'],
+            select(
+                events.c.day,
+                func.sum(events.c.new_users),
+                func.sum(events.c.orders),
+                func.sum(events.c.sales),
+                func.sum(events.c.topups),
+            ).group_by(events.c.day),
+        )
+    )
+    session.commit()
+
+
 def update_category(category_name: str, new_name: str) -> None:
     Database().session.query(Categories).filter(Categories.name == category_name).update(
         values={Categories.title: new_name}
     )
+    mark_catalog_changed(Database().session)
     Database().session.commit()
 
 
@@ -93,6 +157,7 @@ def set_category_options(category_name: str,
     if not values:
         return
     Database().session.query(Categories).filter(Categories.name == category_name).update(values=values)
+    mark_catalog_changed(Database().session)
     Database().session.commit()
 
 
@@ -159,6 +224,7 @@ def set_category_requires_password(category_name: str, requires_password: bool)
     session.query(Categories).filter(Categories.name == category_name).update(
         {Categories.requires_password: requires_password}
     )
+    mark_catalog_changed(session)
     session.commit()
 
 
@@ -171,34 +237,34 @@ def upsert_user_category_password(
     acknowledged: bool | None = None,
 ) -> UserCategoryPassword:
     session = Database().session
-    entry = (
+    now = datetime.datetime.utcnow().isoformat()
+    values = {
+        'user_id': user_id,
+        'category_name': category_name,
+        'password': password,
+        'generated_password_id': generated_password_id,
+        'updated_at': now,
+        'acknowledged': acknowledged if acknowledged is not None else False,
+    }
+    update_fields = ['password', 'generated_password_id', 'updated_at']
+    if acknowledged is not None:
+        update_fields.append('acknowledged')
+    upsert(
+        session,
+        UserCategoryPassword,
+        values,
+        conflict=('user_id', 'category_name'),
+        update_fields=update_fields,
+    )
+    session.commit()
+    return (
         session.query(UserCategoryPassword)
         .filter(
             UserCategoryPassword.user_id == user_id,
             UserCategoryPassword.category_name == category_name,
         )
-        .first()
+        .one()
     )
-    now = datetime.datetime.utcnow().isoformat()
-    if entry:
-        entry.password = password
-        entry.generated_password_id = generated_password_id
-        entry.updated_at = now
-        if acknowledged is not None:
-            entry.acknowledged = acknowledged
-    else:
-        ack_value = acknowledged if acknowledged is not None else False
-        entry = UserCategoryPassword(
-            user_id=user_id,
-            category_name=category_name,
-            password=password,
-            updated_at=now,
-            generated_password_id=generated_password_id,
-            acknowledged=ack_value,
-        )
-        session.add(entry)
-    session.commit()
-    return entry
 
 
 def set_user_category_password_ack(
@@ -244,27 +310,29 @@ def clear_generated_password_usage(password_id: int) -> None:
 def process_purchase_streak(telegram_id: int) -> None:
     """Update streak data after a successful purchase."""
     session = Database().session
-    user = session.query(User).filter(User.telegram_id == telegram_id).one()
-    today = datetime.date.today()
-
-    if user.streak_discount:
-        user.streak_discount = False
-        user.purchase_streak = 0
-
-    if user.last_purchase_date:
-        last_date = datetime.date.fromisoformat(user.last_purchase_date)
-        diff = (today - last_date).days
-        if diff == 1:
-            user.purchase_streak += 1
-        elif diff > 1:
-            user.purchase_streak = 1
-    else:
-        user.purchase_streak = 1
+    advance_purchase_streak(session, telegram_id)
+    session.commit()
+    forget_user_context(telegram_id)
+
 
-    user.last_purchase_date = today.isoformat()
+def save_broadcast_progress(job_id: int, last_user_id: int, sent: int, blocked: int, failed: int) -> None:
+    """Store a broadcast's cursor and counters after a batch has been delivered."""
+    Database().session.query(BroadcastJob).filter(BroadcastJob.id == job_id).update(
+        values={BroadcastJob.last_user_id: last_user_id,
+                BroadcastJob.sent: sent,
+                BroadcastJob.blocked: blocked,
+                BroadcastJob.failed: failed})
+    Database().session.commit()
 
-    if user.purchase_streak >= 3:
-        user.purchase_streak = 0
-        user.streak_discount = True
 
-    session.commit()
+def finish_broadcast_job(job_id: int, status: str = 'finished') -> None:
+    Database().session.query(BroadcastJob).filter(BroadcastJob.id == job_id).update(
+        values={BroadcastJob.status: status, BroadcastJob.finished_at: datetime.datetime.now()})
+    Database().session.commit()
+
+
+def set_operation_expiry(operation_id: str, expires_at: datetime.datetime | None) -> None:
+    """Move an invoice's expiry; None keeps the sweeper away from it."""
+    Database().session.query(UnfinishedOperations).filter(UnfinishedOperations.operation_id == operation_id).update(
+        values={UnfinishedOperations.expires_at: expires_at})
+    Database().session.commit()
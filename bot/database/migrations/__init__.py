@@ -0,0 +1 @@
+from .main import upgrade_database, get_alembic_config
@@ -0,0 +1,50 @@
+from alembic import context
+
+from bot.database.main import Database
+import bot.database.models  # noqa: F401  (populates the metadata)
+
+config = context.config
+target_metadata = Database.BASE.metadata
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        render_as_batch=Database().is_sqlite,
+        compare_type=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    _configure(
+        url=config.get_main_option('sqlalchemy.url'),
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with Database().engine.connect() as connection:
+        sqlite = Database().is_sqlite
+        if sqlite:
+            # Batch migrations copy and drop tables; with foreign keys enforced
+            # dropping goods or categories would cascade into their rows.
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+        _configure(connection=connection)
+        try:
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if sqlite:
+                connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+                connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
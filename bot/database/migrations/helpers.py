@@ -0,0 +1,40 @@
+from typing import Any
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def backfill(table: str, values: dict[str, Any], where: str | None = None,
+             pk: str = 'id', batch_size: int = 5000) -> int:
+    """Update ``table`` in primary-key ordered batches, committing after each one.
+
+    ``values`` maps column names to SQL expressions (``sa.text`` or literals).
+    Batches are walked by key, so a backfill that does not change the rows
+    matched by ``where`` still terminates. Returns the number of updated rows.
+    """
+    bind = op.get_bind()
+    tbl = sa.table(table, sa.column(pk), *(sa.column(name) for name in values))
+    key = tbl.c[pk]
+    condition = sa.text(where) if where else sa.true()
+    total = 0
+    last = None
+    with op.get_context().autocommit_block():
+        while True:
+            query = sa.select(key).where(condition).order_by(key).limit(batch_size)
+            if last is not None:
+                query = query.where(key > last)
+            keys = [row[0] for row in bind.execute(query)]
+            if not keys:
+                break
+            result = bind.execute(sa.update(tbl).where(key.in_(keys)).values(values))
+            total += result.rowcount or 0
+            last = keys[-1]
+    return total
+
+
+def table_names() -> set[str]:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def column_names(table: str) -> set[str]:
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
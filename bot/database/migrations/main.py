@@ -0,0 +1,34 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from bot.database.main import Database
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_alembic_config() -> Config:
+    config = Config()
+    config.set_main_option('script_location', MIGRATIONS_DIR)
+    # ConfigParser interpolation treats '%' specially (URL-encoded passwords)
+    config.set_main_option('sqlalchemy.url', str(Database.URL).replace('%', '%%'))
+    return config
+
+
+def upgrade_database(revision: str = 'head') -> bool:
+    """Bring the schema up to ``revision``.
+
+    Reads the stored version once; migrations only run when it differs from
+    the latest revision. Returns True when anything was applied.
+    """
+    config = get_alembic_config()
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    with Database().engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if revision == 'head' and current == heads:
+        return False
+    command.upgrade(config, revision)
+    return True
@@ -0,0 +1,211 @@
+"""Baseline schema
+
+Creates the schema on an empty database and upgrades databases created by
+the old register_models()/fix_db.py code in place: missing columns are
+added, legacy data is backfilled in batches and reseller_prices.reseller_id
+is relaxed to NULL without dropping the table.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from bot.database.migrations.helpers import backfill, column_names, table_names
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ACHIEVEMENTS = (
+    'start', 'first_purchase', 'first_topup', 'first_blackjack', 'first_coinflip',
+    'gift_sent', 'first_referral', 'five_purchases', 'streak_three', 'ten_referrals',
+)
+
+GOODS_FK = dict(onupdate='CASCADE', ondelete='CASCADE')
+
+
+def _tables() -> list[tuple[str, list]]:
+    return [
+        ('roles', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.String(64), unique=True),
+            sa.Column('default', sa.Boolean, index=True),
+            sa.Column('permissions', sa.Integer),
+        ]),
+        ('users', [
+            sa.Column('telegram_id', sa.BigInteger, primary_key=True, autoincrement=False),
+            sa.Column('username', sa.String(64), nullable=True),
+            sa.Column('role_id', sa.Integer, sa.ForeignKey('roles.id')),
+            sa.Column('balance', sa.BigInteger, nullable=False),
+            sa.Column('lottery_tickets', sa.Integer, nullable=False),
+            sa.Column('purchase_streak', sa.Integer, nullable=False),
+            sa.Column('last_purchase_date', sa.VARCHAR, nullable=True),
+            sa.Column('streak_discount', sa.Boolean, nullable=False),
+            sa.Column('language', sa.String(5), nullable=True),
+            sa.Column('referral_id', sa.BigInteger, nullable=True),
+            sa.Column('registration_date', sa.VARCHAR, nullable=False),
+        ]),
+        ('categories', [
+            sa.Column('name', sa.String(100), primary_key=True),
+            sa.Column('title', sa.String(100), nullable=False),
+            sa.Column('parent_name', sa.String(100), nullable=True),
+            sa.Column('allow_discounts', sa.Boolean, nullable=False),
+            sa.Column('allow_referral_rewards', sa.Boolean, nullable=False),
+            sa.Column('requires_password', sa.Boolean, nullable=False),
+        ]),
+        ('goods', [
+            sa.Column('name', sa.String(100), primary_key=True),
+            sa.Column('price', sa.BigInteger, nullable=False),
+            sa.Column('description', sa.Text, nullable=False),
+            sa.Column('delivery_description', sa.Text, nullable=True),
+            sa.Column('category_name', sa.String(100),
+                      sa.ForeignKey('categories.name', onupdate='CASCADE'), nullable=False),
+        ]),
+        ('item_values', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('item_name', sa.String(100), sa.ForeignKey('goods.name', **GOODS_FK), nullable=False),
+            sa.Column('value', sa.Text, nullable=True),
+            sa.Column('is_infinity', sa.Boolean, nullable=False),
+        ]),
+        ('bought_goods', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('item_name', sa.String(100), nullable=False),
+            sa.Column('value', sa.Text, nullable=False),
+            sa.Column('price', sa.BigInteger, nullable=False),
+            sa.Column('buyer_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=False),
+            sa.Column('bought_datetime', sa.VARCHAR, nullable=False),
+            sa.Column('unique_id', sa.BigInteger, nullable=False, unique=True),
+        ]),
+        ('operations', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=False),
+            sa.Column('operation_value', sa.BigInteger, nullable=False),
+            sa.Column('operation_time', sa.VARCHAR, nullable=False),
+        ]),
+        ('unfinished_operations', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=False),
+            sa.Column('operation_value', sa.BigInteger, nullable=False),
+            sa.Column('operation_id', sa.String(500), nullable=False),
+            sa.Column('message_id', sa.BigInteger, nullable=True),
+        ]),
+        ('achievements', [
+            sa.Column('code', sa.String(50), primary_key=True),
+        ]),
+        ('user_achievements', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=False),
+            sa.Column('achievement_code', sa.String(50), sa.ForeignKey('achievements.code'), nullable=False),
+            sa.Column('achieved_at', sa.VARCHAR, nullable=False),
+        ]),
+        ('promo_codes', [
+            sa.Column('code', sa.String(50), primary_key=True),
+            sa.Column('discount', sa.Integer, nullable=False),
+            sa.Column('expires_at', sa.VARCHAR, nullable=True),
+            sa.Column('active', sa.Boolean),
+            sa.Column('applicable_items', sa.Text, nullable=True),
+        ]),
+        ('resellers', [
+            sa.Column('user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'),
+                      primary_key=True, autoincrement=False),
+        ]),
+        ('reseller_prices', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('reseller_id', sa.BigInteger, sa.ForeignKey('resellers.user_id'), nullable=True),
+            sa.Column('item_name', sa.String(100), sa.ForeignKey('goods.name', **GOODS_FK), nullable=False),
+            sa.Column('price', sa.BigInteger, nullable=False),
+        ]),
+        ('stock_notifications', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=False),
+            sa.Column('item_name', sa.String(100), sa.ForeignKey('goods.name', **GOODS_FK), nullable=False),
+        ]),
+        ('cart_items', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=False),
+            sa.Column('item_name', sa.String(100), sa.ForeignKey('goods.name', **GOODS_FK), nullable=False),
+            sa.Column('quantity', sa.Integer, nullable=False),
+        ]),
+        ('category_passwords', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('password', sa.String(64), nullable=False, unique=True),
+            sa.Column('created_at', sa.VARCHAR, nullable=False),
+            sa.Column('used_by_user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=True),
+            sa.Column('used_for_category', sa.String(100),
+                      sa.ForeignKey('categories.name', ondelete='SET NULL'), nullable=True),
+        ]),
+        ('user_category_passwords', [
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('user_id', sa.BigInteger, sa.ForeignKey('users.telegram_id'), nullable=False),
+            sa.Column('category_name', sa.String(100),
+                      sa.ForeignKey('categories.name', ondelete='CASCADE'), nullable=False),
+            sa.Column('password', sa.String(64), nullable=False),
+            sa.Column('generated_password_id', sa.Integer, sa.ForeignKey('category_passwords.id'), nullable=True),
+            sa.Column('updated_at', sa.VARCHAR, nullable=False),
+            sa.Column('acknowledged', sa.Boolean, nullable=False, server_default=sa.false()),
+            sa.UniqueConstraint('user_id', 'category_name', name='uq_user_category_password'),
+        ]),
+    ]
+
+
+# Columns that older databases may be missing, with defaults for existing rows.
+LEGACY_COLUMNS = {
+    'users': [
+        sa.Column('lottery_tickets', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('purchase_streak', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('last_purchase_date', sa.VARCHAR, nullable=True),
+        sa.Column('streak_discount', sa.Boolean, nullable=False, server_default=sa.false()),
+    ],
+    'categories': [
+        sa.Column('title', sa.String(100), nullable=True),
+        sa.Column('requires_password', sa.Boolean, nullable=False, server_default=sa.false()),
+    ],
+    'unfinished_operations': [
+        sa.Column('message_id', sa.BigInteger, nullable=True),
+    ],
+    'promo_codes': [
+        sa.Column('applicable_items', sa.Text, nullable=True),
+    ],
+    'user_category_passwords': [
+        sa.Column('acknowledged', sa.Boolean, nullable=False, server_default=sa.false()),
+    ],
+}
+
+
+def _upgrade_legacy_table(name: str) -> None:
+    existing = column_names(name)
+    for column in LEGACY_COLUMNS.get(name, []):
+        if column.name not in existing:
+            op.add_column(name, column)
+    if name == 'categories':
+        backfill('categories', {'title': sa.literal_column('name')},
+                 where="title IS NULL OR title = ''", pk='name')
+    if name == 'reseller_prices':
+        nullable = {c['name']: c['nullable'] for c in sa.inspect(op.get_bind()).get_columns(name)}
+        if not nullable.get('reseller_id', True):
+            with op.batch_alter_table(name) as batch:
+                batch.alter_column('reseller_id', existing_type=sa.BigInteger, nullable=True)
+
+
+def upgrade() -> None:
+    existing = table_names()
+    for name, columns in _tables():
+        if name in existing:
+            _upgrade_legacy_table(name)
+        else:
+            op.create_table(name, *columns)
+
+    bind = op.get_bind()
+    achievements = sa.table('achievements', sa.column('code'))
+    present = {row[0] for row in bind.execute(sa.select(achievements.c.code))}
+    missing = [{'code': code} for code in ACHIEVEMENTS if code not in present]
+    if missing:
+        op.bulk_insert(achievements, missing)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(_tables()):
+        op.drop_table(name)
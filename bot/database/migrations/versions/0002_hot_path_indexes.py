@@ -0,0 +1,36 @@
+"""Secondary indexes for hot lookup columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-27
+"""
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_goods_category_name', 'goods', ['category_name']),
+    ('ix_categories_parent_name', 'categories', ['parent_name']),
+    ('ix_item_values_item_name', 'item_values', ['item_name']),
+    ('ix_bought_goods_buyer_id', 'bought_goods', ['buyer_id']),
+    ('ix_operations_user_id', 'operations', ['user_id']),
+    ('ix_users_referral_id', 'users', ['referral_id']),
+    ('ix_users_username', 'users', ['username']),
+    ('ix_unfinished_operations_operation_id', 'unfinished_operations', ['operation_id']),
+    ('ix_unfinished_operations_user_id', 'unfinished_operations', ['user_id']),
+    ('ix_stock_notifications_item_name', 'stock_notifications', ['item_name']),
+    ('ix_cart_items_user_id_item_name', 'cart_items', ['user_id', 'item_name']),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
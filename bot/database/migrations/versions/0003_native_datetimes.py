@@ -0,0 +1,68 @@
+"""Store purchase, operation and registration times as timestamps
+
+Existing values are 'YYYY-MM-DD HH:MM:SS' strings (a few older rows use an
+ISO 'T' separator). They are normalised in batches and the columns are
+converted to DateTime and indexed, so date filters become range scans.
+
+SQLite has no timestamp storage class and a batch table copy would CAST the
+text to a number, so there the declared type is left alone; normalising the
+text to SQLAlchemy's storage format is what makes it behave as a DateTime.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-02-03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from bot.database.migrations.helpers import backfill
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ('bought_goods', 'bought_datetime', 'id'),
+    ('operations', 'operation_time', 'id'),
+    ('users', 'registration_date', 'telegram_id'),
+)
+
+
+def _normalise(table: str, column: str, pk: str, sqlite: bool) -> None:
+    col = sa.column(column, sa.String)
+    backfill(table, {column: sa.func.replace(col, 'T', ' ')}, where=f"{column} LIKE '%T%'", pk=pk)
+    if sqlite:
+        # SQLAlchemy stores SQLite timestamps with microseconds; pad legacy
+        # values so text comparisons against bound datetimes stay correct.
+        backfill(table, {column: col.concat('.000000')}, where=f"length({column}) = 19", pk=pk)
+
+
+def upgrade() -> None:
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table, column, pk in COLUMNS:
+        _normalise(table, column, pk, sqlite)
+        if not sqlite:
+            op.alter_column(
+                table,
+                column,
+                existing_type=sa.VARCHAR,
+                type_=sa.DateTime,
+                existing_nullable=False,
+                postgresql_using=f'{column}::timestamp',
+            )
+        op.create_index(f'ix_{table}_{column}', table, [column], if_not_exists=True)
+
+
+def downgrade() -> None:
+    for table, column, _ in reversed(COLUMNS):
+        op.drop_index(f'ix_{table}_{column}', table_name=table, if_exists=True)
+        if op.get_bind().dialect.name != 'sqlite':
+            op.alter_column(
+                table,
+                column,
+                existing_type=sa.DateTime,
+                type_=sa.VARCHAR,
+                existing_nullable=False,
+                postgresql_using=f'{column}::varchar',
+            )
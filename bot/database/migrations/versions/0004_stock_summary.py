@@ -0,0 +1,40 @@
+"""Materialised per-item stock counters
+
+Adds stock_summary, one row per goods entry holding the number of stock
+rows, whether any of them is unlimited and how many units are reserved by
+pending checkouts. It is populated from item_values here and kept in step
+by the stock mutations afterwards.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-02-10
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_summary',
+        sa.Column('item_name', sa.String(100),
+                  sa.ForeignKey('goods.name', onupdate='CASCADE', ondelete='CASCADE'), primary_key=True),
+        sa.Column('available', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('infinite', sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column('reserved', sa.Integer, nullable=False, server_default='0'),
+    )
+    op.execute(
+        "INSERT INTO stock_summary (item_name, available, infinite, reserved) "
+        "SELECT goods.name, COUNT(item_values.id), "
+        "COALESCE(MAX(CASE WHEN item_values.is_infinity THEN 1 ELSE 0 END), 0) > 0, 0 "
+        "FROM goods LEFT JOIN item_values ON item_values.item_name = goods.name "
+        "GROUP BY goods.name"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('stock_summary')
@@ -0,0 +1,38 @@
+"""Materialised referral totals
+
+Adds referral_stats, one row per referrer with the number of referred users
+and the sum of their top-ups, populated here from users and operations and
+kept in step by create_user/create_operation afterwards.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-02-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'referral_stats',
+        sa.Column('referrer_id', sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column('referrals', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('topped_up', sa.BigInteger, nullable=False, server_default='0'),
+    )
+    op.execute(
+        "INSERT INTO referral_stats (referrer_id, referrals, topped_up) "
+        "SELECT users.referral_id, COUNT(DISTINCT users.telegram_id), "
+        "COALESCE(SUM(operations.operation_value), 0) "
+        "FROM users LEFT JOIN operations ON operations.user_id = users.telegram_id "
+        "WHERE users.referral_id IS NOT NULL "
+        "GROUP BY users.referral_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('referral_stats')
@@ -0,0 +1,40 @@
+"""Daily statistics rollups
+
+Adds daily_stats, one row per day with registrations, purchases, sales and
+top-ups, filled here from the raw tables and kept up to date incrementally
+by create_user, add_bought_item and create_operation afterwards.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-02-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_stats',
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('new_users', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('orders', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('sales', sa.BigInteger, nullable=False, server_default='0'),
+        sa.Column('topups', sa.BigInteger, nullable=False, server_default='0'),
+    )
+    op.execute(
+        "INSERT INTO daily_stats (day, new_users, orders, sales, topups) "
+        "SELECT day, SUM(new_users), SUM(orders), SUM(sales), SUM(topups) FROM ("
+        "SELECT DATE(registration_date) AS day, 1 AS new_users, 0 AS orders, 0 AS sales, 0 AS topups FROM users "
+        "UNION ALL SELECT DATE(bought_datetime), 0, 1, price, 0 FROM bought_goods "
+        "UNION ALL SELECT DATE(operation_time), 0, 0, 0, operation_value FROM operations"
+        ") AS events GROUP BY day"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_stats')
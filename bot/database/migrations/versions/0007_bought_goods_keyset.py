@@ -0,0 +1,25 @@
+"""Index purchase history for keyset pagination
+
+Replaces the single-column buyer index on bought_goods with (buyer_id, id),
+which serves both the buyer lookups and page flips that seek past an id.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-02-24
+"""
+from alembic import op
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_bought_goods_buyer_id_id', 'bought_goods', ['buyer_id', 'id'], if_not_exists=True)
+    op.drop_index('ix_bought_goods_buyer_id', table_name='bought_goods', if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index('ix_bought_goods_buyer_id', 'bought_goods', ['buyer_id'], if_not_exists=True)
+    op.drop_index('ix_bought_goods_buyer_id_id', table_name='bought_goods', if_exists=True)
@@ -0,0 +1,41 @@
+"""Background broadcast jobs
+
+Adds broadcast_jobs, which records each broadcast's text, delivery counters
+and the last recipient reached, so a broadcast interrupted by a restart
+continues where it stopped.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-03-03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'broadcast_jobs',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('admin_id', sa.BigInteger, nullable=False),
+        sa.Column('status_message_id', sa.BigInteger, nullable=True),
+        sa.Column('text', sa.Text, nullable=False),
+        sa.Column('status', sa.String(16), nullable=False, server_default='running'),
+        sa.Column('total', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('last_user_id', sa.BigInteger, nullable=True),
+        sa.Column('sent', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('blocked', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('failed', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+        sa.Column('finished_at', sa.DateTime, nullable=True),
+    )
+    op.create_index('ix_broadcast_jobs_status', 'broadcast_jobs', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_broadcast_jobs_status', table_name='broadcast_jobs')
+    op.drop_table('broadcast_jobs')
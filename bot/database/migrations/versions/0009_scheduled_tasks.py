@@ -0,0 +1,32 @@
+"""Durable scheduled tasks
+
+Adds scheduled_tasks, holding delayed jobs such as feedback requests and
+message deletions so they survive a restart.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-03-07
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scheduled_tasks',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('kind', sa.String(32), nullable=False),
+        sa.Column('run_at', sa.DateTime, nullable=False),
+        sa.Column('payload', sa.Text, nullable=False),
+    )
+    op.create_index('ix_scheduled_tasks_run_at', 'scheduled_tasks', ['run_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduled_tasks_run_at', table_name='scheduled_tasks')
+    op.drop_table('scheduled_tasks')
@@ -0,0 +1,32 @@
+"""Expiry columns on unfinished operations
+
+Stores when each pending invoice expires, its payment provider and the
+purchase it reserves stock for, so one sweeper can expire invoices and
+restore their units, including after a restart.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-03-10
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('unfinished_operations', sa.Column('provider', sa.String(16), nullable=True))
+    op.add_column('unfinished_operations', sa.Column('expires_at', sa.DateTime, nullable=True))
+    op.add_column('unfinished_operations', sa.Column('payload', sa.Text, nullable=True))
+    op.create_index('ix_unfinished_operations_expires_at', 'unfinished_operations', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_unfinished_operations_expires_at', table_name='unfinished_operations')
+    with op.batch_alter_table('unfinished_operations') as batch:
+        batch.drop_column('payload')
+        batch.drop_column('expires_at')
+        batch.drop_column('provider')
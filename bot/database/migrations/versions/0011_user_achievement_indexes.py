@@ -0,0 +1,30 @@
+"""Index achievement lookups
+
+Serves the per-user achievement check and the per-achievement user count,
+which scanned user_achievements.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-03-12
+"""
+from alembic import op
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_user_achievements_user_id_achievement_code', 'user_achievements', ['user_id', 'achievement_code']),
+    ('ix_user_achievements_achievement_code', 'user_achievements', ['achievement_code']),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,61 @@
+"""Give goods and category references their cascade actions on SQLite
+
+Databases created by the old register_models() code reference goods.name
+and categories.name without ON UPDATE / ON DELETE actions; the baseline
+kept those tables as they were. SQLite connections now enforce foreign
+keys, so renaming or deleting an item there would fail instead of
+cascading. Such tables are rebuilt with the actions the models declare.
+Other backends and databases created by the baseline already have them.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2025-03-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+GOODS_FK = dict(onupdate='CASCADE', ondelete='CASCADE')
+FOREIGN_KEYS = (
+    ('goods', 'category_name', 'categories', 'name', dict(onupdate='CASCADE')),
+    ('item_values', 'item_name', 'goods', 'name', GOODS_FK),
+    ('reseller_prices', 'item_name', 'goods', 'name', GOODS_FK),
+    ('stock_notifications', 'item_name', 'goods', 'name', GOODS_FK),
+    ('cart_items', 'item_name', 'goods', 'name', GOODS_FK),
+    ('category_passwords', 'used_for_category', 'categories', 'name', dict(ondelete='SET NULL')),
+    ('user_category_passwords', 'category_name', 'categories', 'name', dict(ondelete='CASCADE')),
+)
+# names the unnamed reflected constraints so the batch copy can replace them
+NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _actions(options: dict) -> dict:
+    return {key: options[key].upper() for key in ('onupdate', 'ondelete') if options.get(key)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    for table, column, referred, referred_column, actions in FOREIGN_KEYS:
+        if table not in tables:
+            continue
+        current = [fk for fk in inspector.get_foreign_keys(table) if fk['constrained_columns'] == [column]]
+        if current and _actions(current[0]['options']) == actions:
+            continue
+        name = NAMING['fk'] % {'table_name': table, 'column_0_name': column, 'referred_table_name': referred}
+        with op.batch_alter_table(table, recreate='always', naming_convention=NAMING) as batch_op:
+            if current:
+                batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], [referred_column], **actions)
+
+
+def downgrade() -> None:
+    # The actions match what the models declare; keeping them is harmless.
+    pass
@@ -1,16 +1,19 @@
 import datetime
 from sqlalchemy import (
     Column,
+    Date,
+    DateTime,
     Integer,
     String,
     BigInteger,
     ForeignKey,
+    Index,
     Text,
     Boolean,
     VARCHAR,
     UniqueConstraint,
-    inspect,
-    text,
+    false,
+    or_,
 )
 from bot.database.main import Database
 from sqlalchemy.orm import relationship
@@ -66,6 +69,9 @@ class Role(Database.BASE):
             role.default = (role.name == default_role)
             Database().session.add(role)
         Database().session.commit()
+        from bot.database.methods.read import invalidate_role_cache
+
+        invalidate_role_cache()
 
     def add_permission(self, perm):
         if not self.has_permission(perm):
@@ -87,8 +93,8 @@ class Role(Database.BASE):
 
 class User(Database.BASE):
     __tablename__ = 'users'
-    telegram_id = Column(BigInteger, nullable=False, unique=True, primary_key=True)
-    username = Column(String(64), nullable=True)
+    telegram_id = Column(BigInteger, nullable=False, unique=True, primary_key=True, autoincrement=False)
+    username = Column(String(64), nullable=True, index=True)
     role_id = Column(Integer, ForeignKey('roles.id'), default=1)
     balance = Column(BigInteger, nullable=False, default=0)
     lottery_tickets = Column(Integer, nullable=False, default=0)
@@ -96,8 +102,8 @@ class User(Database.BASE):
     last_purchase_date = Column(VARCHAR, nullable=True)
     streak_discount = Column(Boolean, nullable=False, default=False)
     language = Column(String(5), nullable=True)
-    referral_id = Column(BigInteger, nullable=True)
-    registration_date = Column(VARCHAR, nullable=False)
+    referral_id = Column(BigInteger, nullable=True, index=True)
+    registration_date = Column(DateTime, nullable=False, index=True)
     user_operations = relationship("Operations", back_populates="user_telegram_id")
     user_unfinished_operations = relationship("UnfinishedOperations", back_populates="user_telegram_id")
     user_goods = relationship("BoughtGoods", back_populates="user_telegram_id")
@@ -122,7 +128,7 @@ class Categories(Database.BASE):
     __tablename__ = 'categories'
     name = Column(String(100), primary_key=True, unique=True, nullable=False)
     title = Column(String(100), nullable=False, default='')
-    parent_name = Column(String(100), nullable=True)
+    parent_name = Column(String(100), nullable=True, index=True)
     allow_discounts = Column(Boolean, nullable=False, default=True)
     allow_referral_rewards = Column(Boolean, nullable=False, default=True)
     requires_password = Column(Boolean, nullable=False, default=False)
@@ -151,7 +157,8 @@ class Goods(Database.BASE):
     price = Column(BigInteger, nullable=False)
     description = Column(Text, nullable=False)
     delivery_description = Column(Text, nullable=True)
-    category_name = Column(String(100), ForeignKey('categories.name'), nullable=False)
+    category_name = Column(String(100), ForeignKey('categories.name', onupdate='CASCADE'), nullable=False,
+                           index=True)
     category = relationship("Categories", back_populates="item")
     values = relationship("ItemValues", back_populates="item")
 
@@ -167,7 +174,8 @@ class Goods(Database.BASE):
 class ItemValues(Database.BASE):
     __tablename__ = 'item_values'
     id = Column(Integer, nullable=False, primary_key=True)
-    item_name = Column(String(100), ForeignKey('goods.name'), nullable=False)
+    item_name = Column(String(100), ForeignKey('goods.name', onupdate='CASCADE', ondelete='CASCADE'), nullable=False,
+                       index=True)
     value = Column(Text, nullable=True)
     is_infinity = Column(Boolean, nullable=False)
     item = relationship("Goods", back_populates="values")
@@ -178,18 +186,42 @@ class ItemValues(Database.BASE):
         self.is_infinity = is_infinity
 
 
+class StockSummary(Database.BASE):
+    """Per-item stock counters kept in step with ``item_values``."""
+    __tablename__ = 'stock_summary'
+    item_name = Column(String(100), ForeignKey('goods.name', onupdate='CASCADE', ondelete='CASCADE'),
+                       primary_key=True)
+    available = Column(Integer, nullable=False, default=0)
+    infinite = Column(Boolean, nullable=False, default=False)
+    reserved = Column(Integer, nullable=False, default=0)
+
+    def __init__(self, item_name: str, available: int = 0, infinite: bool = False, reserved: int = 0):
+        self.item_name = item_name
+        self.available = available
+        self.infinite = infinite
+        self.reserved = reserved
+
+    @classmethod
+    def in_stock(cls):
+        """SQL condition matching items a customer can currently see."""
+        return or_(cls.infinite.is_(True), cls.available > 0, cls.reserved > 0)
+
+
 class BoughtGoods(Database.BASE):
     __tablename__ = 'bought_goods'
+    __table_args__ = (
+        Index('ix_bought_goods_buyer_id_id', 'buyer_id', 'id'),
+    )
     id = Column(Integer, nullable=False, primary_key=True)
     item_name = Column(String(100), nullable=False)
     value = Column(Text, nullable=False)
     price = Column(BigInteger, nullable=False)
     buyer_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False)
-    bought_datetime = Column(VARCHAR, nullable=False)
+    bought_datetime = Column(DateTime, nullable=False, index=True)
     unique_id = Column(BigInteger, nullable=False, unique=True)
     user_telegram_id = relationship("User", back_populates="user_goods")
 
-    def __init__(self, name: str, value: str, price: int, bought_datetime: str, unique_id,
+    def __init__(self, name: str, value: str, price: int, bought_datetime: datetime.datetime, unique_id,
                  buyer_id: int = 0):
         self.item_name = name
         self.value = value
@@ -202,12 +234,12 @@ class BoughtGoods(Database.BASE):
 class Operations(Database.BASE):
     __tablename__ = 'operations'
     id = Column(Integer, nullable=False, primary_key=True)
-    user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False)
+    user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False, index=True)
     operation_value = Column(BigInteger, nullable=False)
-    operation_time = Column(VARCHAR, nullable=False)
+    operation_time = Column(DateTime, nullable=False, index=True)
     user_telegram_id = relationship("User", back_populates="user_operations")
 
-    def __init__(self, user_id: int, operation_value: int, operation_time: str):
+    def __init__(self, user_id: int, operation_value: int, operation_time: datetime.datetime):
         self.user_id = user_id
         self.operation_value = operation_value
         self.operation_time = operation_time
@@ -216,17 +248,55 @@ class Operations(Database.BASE):
 class UnfinishedOperations(Database.BASE):
     __tablename__ = 'unfinished_operations'
     id = Column(Integer, nullable=False, primary_key=True)
-    user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False)
+    user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False, index=True)
     operation_value = Column(BigInteger, nullable=False)
-    operation_id = Column(String(500), nullable=False)
+    operation_id = Column(String(500), nullable=False, index=True)
     message_id = Column(BigInteger, nullable=True)
+    provider = Column(String(16), nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    payload = Column(Text, nullable=True)  # JSON purchase data restored on expiry
     user_telegram_id = relationship("User", back_populates="user_unfinished_operations")
 
-    def __init__(self, user_id: int, operation_value: int, operation_id: str, message_id: int | None = None):
+    def __init__(self, user_id: int, operation_value: int, operation_id: str, message_id: int | None = None,
+                 provider: str | None = None, expires_at: datetime.datetime | None = None,
+                 payload: str | None = None):
         self.user_id = user_id
         self.operation_value = operation_value
         self.operation_id = operation_id
         self.message_id = message_id
+        self.provider = provider
+        self.expires_at = expires_at
+        self.payload = payload
+
+
+class ReferralStats(Database.BASE):
+    """Per-referrer totals kept in step with ``users`` and ``operations``."""
+    __tablename__ = 'referral_stats'
+    referrer_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    referrals = Column(Integer, nullable=False, default=0)
+    topped_up = Column(BigInteger, nullable=False, default=0)
+
+    def __init__(self, referrer_id: int, referrals: int = 0, topped_up: int = 0):
+        self.referrer_id = referrer_id
+        self.referrals = referrals
+        self.topped_up = topped_up
+
+
+class DailyStats(Database.BASE):
+    """Per-day registration, sales and top-up totals for the statistics screen."""
+    __tablename__ = 'daily_stats'
+    day = Column(Date, primary_key=True)
+    new_users = Column(Integer, nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
+    sales = Column(BigInteger, nullable=False, default=0)
+    topups = Column(BigInteger, nullable=False, default=0)
+
+    def __init__(self, day: datetime.date, new_users: int = 0, orders: int = 0, sales: int = 0, topups: int = 0):
+        self.day = day
+        self.new_users = new_users
+        self.orders = orders
+        self.sales = sales
+        self.topups = topups
 
 
 class Achievement(Database.BASE):
@@ -239,9 +309,12 @@ class Achievement(Database.BASE):
 
 class UserAchievement(Database.BASE):
     __tablename__ = 'user_achievements'
+    __table_args__ = (
+        Index('ix_user_achievements_user_id_achievement_code', 'user_id', 'achievement_code'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False)
-    achievement_code = Column(String(50), ForeignKey('achievements.code'), nullable=False)
+    achievement_code = Column(String(50), ForeignKey('achievements.code'), nullable=False, index=True)
     achieved_at = Column(VARCHAR, nullable=False)
 
     def __init__(self, user_id: int, achievement_code: str, achieved_at: str):
@@ -269,7 +342,7 @@ class PromoCode(Database.BASE):
 
 class Reseller(Database.BASE):
     __tablename__ = 'resellers'
-    user_id = Column(BigInteger, ForeignKey('users.telegram_id'), primary_key=True, unique=True)
+    user_id = Column(BigInteger, ForeignKey('users.telegram_id'), primary_key=True, unique=True, autoincrement=False)
 
     def __init__(self, user_id: int):
         self.user_id = user_id
@@ -279,7 +352,7 @@ class ResellerPrice(Database.BASE):
     __tablename__ = 'reseller_prices'
     id = Column(Integer, primary_key=True)
     reseller_id = Column(BigInteger, ForeignKey('resellers.user_id'), nullable=True)
-    item_name = Column(String(100), ForeignKey('goods.name'), nullable=False)
+    item_name = Column(String(100), ForeignKey('goods.name', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
     price = Column(BigInteger, nullable=False)
 
     def __init__(self, reseller_id: int | None, item_name: str, price: int):
@@ -292,7 +365,8 @@ class StockNotification(Database.BASE):
     __tablename__ = 'stock_notifications'
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False)
-    item_name = Column(String(100), ForeignKey('goods.name'), nullable=False)
+    item_name = Column(String(100), ForeignKey('goods.name', onupdate='CASCADE', ondelete='CASCADE'), nullable=False,
+                       index=True)
 
     def __init__(self, user_id: int, item_name: str):
         self.user_id = user_id
@@ -301,9 +375,12 @@ class StockNotification(Database.BASE):
 
 class CartItem(Database.BASE):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        Index('ix_cart_items_user_id_item_name', 'user_id', 'item_name'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False)
-    item_name = Column(String(100), ForeignKey('goods.name'), nullable=False)
+    item_name = Column(String(100), ForeignKey('goods.name', onupdate='CASCADE', ondelete='CASCADE'), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
 
     def __init__(self, user_id: int, item_name: str, quantity: int = 1):
@@ -318,7 +395,7 @@ class CategoryPassword(Database.BASE):
     password = Column(String(64), nullable=False, unique=True)
     created_at = Column(VARCHAR, nullable=False)
     used_by_user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=True)
-    used_for_category = Column(String(100), ForeignKey('categories.name'), nullable=True)
+    used_for_category = Column(String(100), ForeignKey('categories.name', ondelete='SET NULL'), nullable=True)
 
     user = relationship('User', backref='category_passwords', lazy='joined')
     category = relationship('Categories', lazy='joined')
@@ -336,11 +413,11 @@ class UserCategoryPassword(Database.BASE):
 
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, ForeignKey('users.telegram_id'), nullable=False)
-    category_name = Column(String(100), ForeignKey('categories.name'), nullable=False)
+    category_name = Column(String(100), ForeignKey('categories.name', ondelete='CASCADE'), nullable=False)
     password = Column(String(64), nullable=False)
     generated_password_id = Column(Integer, ForeignKey('category_passwords.id'), nullable=True)
     updated_at = Column(VARCHAR, nullable=False)
-    acknowledged = Column(Boolean, nullable=False, server_default=text('0'))
+    acknowledged = Column(Boolean, nullable=False, server_default=false())
 
     user = relationship('User', backref='category_password_entries', lazy='joined')
     category = relationship('Categories', lazy='joined')
@@ -357,54 +434,51 @@ class UserCategoryPassword(Database.BASE):
         self.acknowledged = acknowledged
 
 
+class BroadcastJob(Database.BASE):
+    """A broadcast being delivered in the background; ``last_user_id`` is the resume cursor."""
+    __tablename__ = 'broadcast_jobs'
+    id = Column(Integer, primary_key=True)
+    admin_id = Column(BigInteger, nullable=False)
+    status_message_id = Column(BigInteger, nullable=True)
+    text = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default='running', index=True)
+    total = Column(Integer, nullable=False, default=0)
+    last_user_id = Column(BigInteger, nullable=True)
+    sent = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __init__(self, admin_id: int, text: str, total: int, created_at: datetime.datetime,
+                 status_message_id: int | None = None):
+        self.admin_id = admin_id
+        self.text = text
+        self.total = total
+        self.created_at = created_at
+        self.status_message_id = status_message_id
+        self.status = 'running'
+        self.sent = 0
+        self.blocked = 0
+        self.failed = 0
+
+
+class ScheduledTask(Database.BASE):
+    """A delayed job of ``kind`` to run at ``run_at``; ``payload`` holds its JSON arguments."""
+    __tablename__ = 'scheduled_tasks'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)
+    run_at = Column(DateTime, nullable=False, index=True)
+    payload = Column(Text, nullable=False)
+
+    def __init__(self, kind: str, run_at: datetime.datetime, payload: str):
+        self.kind = kind
+        self.run_at = run_at
+        self.payload = payload
+
+
 def register_models():
-    engine = Database().engine
-    inspector = inspect(engine)
-    if 'categories' in inspector.get_table_names():
-        columns = {column['name'] for column in inspector.get_columns('categories')}
-        if 'title' not in columns:
-            with engine.begin() as connection:
-                connection.execute(
-                    text("ALTER TABLE categories ADD COLUMN title VARCHAR(100)")
-                )
-                connection.execute(
-                    text("UPDATE categories SET title = name WHERE title IS NULL OR title = ''")
-                )
-        if 'requires_password' not in columns:
-            with engine.begin() as connection:
-                connection.execute(
-                    text(
-                        "ALTER TABLE categories ADD COLUMN requires_password BOOLEAN DEFAULT 0"
-                    )
-                )
-                connection.execute(
-                    text("UPDATE categories SET requires_password = 0 WHERE requires_password IS NULL")
-                )
-    if 'user_category_passwords' in inspector.get_table_names():
-        columns = {column['name'] for column in inspector.get_columns('user_category_passwords')}
-        if 'acknowledged' not in columns:
-            with engine.begin() as connection:
-                connection.execute(
-                    text(
-                        "ALTER TABLE user_category_passwords ADD COLUMN acknowledged BOOLEAN DEFAULT 0"
-                    )
-                )
-                connection.execute(
-                    text(
-                        "UPDATE user_category_passwords SET acknowledged = 0 WHERE acknowledged IS NULL"
-                    )
-                )
-    if 'promo_codes' in inspector.get_table_names():
-        promo_columns = {column['name'] for column in inspector.get_columns('promo_codes')}
-        if 'applicable_items' not in promo_columns:
-            with engine.begin() as connection:
-                connection.execute(
-                    text("ALTER TABLE promo_codes ADD COLUMN applicable_items TEXT")
-                )
-    if 'reseller_prices' in inspector.get_table_names():
-        for column in inspector.get_columns('reseller_prices'):
-            if column['name'] == 'reseller_id' and not column['nullable']:
-                ResellerPrice.__table__.drop(engine)
-                break
-    Database.BASE.metadata.create_all(engine)
+    from bot.database.migrations import upgrade_database
+
+    upgrade_database()
     Role.insert_roles()
@@ -0,0 +1,87 @@
+"""Per-update snapshot of the user who sent the update.
+
+The user context middleware loads it once per update; the read methods
+answer language, balance, role and reseller lookups for that user from it.
+Methods that change the user row call :func:`forget_user_context` so later
+reads in the same update go back to the database. Tasks started while an
+update is handled inherit the variable, so :func:`reset_user_context` marks
+the context stale before unbinding it; such tasks then read the database.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import exists, func, select
+
+from bot.database.main import Database
+from bot.database.models import BoughtGoods, Reseller, Role, User
+
+
+class UserContext:
+    __slots__ = ('telegram_id', 'role_id', 'permissions', 'language', 'balance', 'purchase_streak',
+                 'lottery_tickets', 'reseller', 'purchases', 'stale')
+
+    def __init__(self, telegram_id: int, role_id: int, permissions: int | None, language: str | None,
+                 balance: int, purchase_streak: int, lottery_tickets: int, reseller: bool, purchases: int):
+        self.telegram_id = telegram_id
+        self.role_id = role_id
+        self.permissions = permissions
+        self.language = language
+        self.balance = balance
+        self.purchase_streak = purchase_streak
+        self.lottery_tickets = lottery_tickets
+        self.reseller = bool(reseller)
+        self.purchases = purchases
+        self.stale = False
+
+
+_CURRENT_USER: ContextVar[Optional[UserContext]] = ContextVar('user_context', default=None)
+
+
+def load_user_context(telegram_id: int) -> UserContext | None:
+    """Load everything the menus need about a user in one query."""
+    row = Database().session.execute(
+        select(
+            User.telegram_id,
+            User.role_id,
+            Role.permissions,
+            User.language,
+            User.balance,
+            User.purchase_streak,
+            User.lottery_tickets,
+            exists().where(Reseller.user_id == User.telegram_id),
+            select(func.count(BoughtGoods.id))
+            .where(BoughtGoods.buyer_id == User.telegram_id)
+            .scalar_subquery(),
+        )
+        .outerjoin(Role, Role.id == User.role_id)
+        .where(User.telegram_id == telegram_id)
+    ).first()
+    return UserContext(*row) if row else None
+
+
+def bind_user_context(context: UserContext | None) -> object:
+    return _CURRENT_USER.set(context)
+
+
+def reset_user_context(token: object) -> None:
+    context = _CURRENT_USER.get()
+    if context is not None:
+        context.stale = True
+    _CURRENT_USER.reset(token)
+
+
+def current_user_context(telegram_id: int | str | None = None) -> UserContext | None:
+    """Return the loaded context if it is still fresh and, when given, belongs to ``telegram_id``."""
+    context = _CURRENT_USER.get()
+    if context is None or context.stale:
+        return None
+    if telegram_id is not None and context.telegram_id != int(telegram_id):
+        return None
+    return context
+
+
+def forget_user_context(telegram_id: int | str | None = None) -> None:
+    """Mark the current context stale after ``telegram_id`` (or any user) changed."""
+    context = _CURRENT_USER.get()
+    if context is not None and (telegram_id is None or context.telegram_id == int(telegram_id)):
+        context.stale = True
@@ -1,20 +1,17 @@
 from aiogram import Dispatcher
 from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
 
-from bot.database.methods import check_role, check_user_by_username, set_role
+from bot.database.methods import check_user_by_username, set_role
 from bot.database.models import Permission
 from bot.keyboards import back
 from bot.misc import TgConfig
-from bot.handlers.other import get_bot_user_ids
+from bot.handlers.other import get_bot_user_ids, permission_required
 
 ASSISTANT_ROLE_ID = 4
 
+@permission_required(Permission.OWN)
 async def assistant_management_callback(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.OWN):
-        await call.answer('Nepakanka teisių')
-        return
     TgConfig.STATE[user_id] = None
     markup = InlineKeyboardMarkup()
     markup.add(InlineKeyboardButton('➕ Pridėti asistentą', callback_data='assistant_add'))
@@ -1,14 +1,13 @@
-import asyncio
 from aiogram import Dispatcher
 from aiogram.types import Message, CallbackQuery
-from aiogram.utils.exceptions import BotBlocked
 
-from bot.keyboards import back, close
-from bot.database.methods import check_role, get_all_users
+from bot.keyboards import back
+from bot.database.methods import check_role, create_broadcast_job
 from bot.database.models import Permission
 from bot.misc import TgConfig
 from bot.logger_mesh import logger
 from bot.handlers.other import get_bot_user_ids
+from bot.utils.broadcast import start_broadcast
 
 
 async def send_message_callback_handler(call: CallbackQuery):
@@ -33,24 +32,13 @@ async def broadcast_messages(message: Message):
     TgConfig.STATE[user_id] = None
     await bot.delete_message(chat_id=message.chat.id,
                              message_id=message.message_id)
-    users = get_all_users()
-    max_users = 0
-    for user_row in users:
-        max_users += 1
-        user_id = user_row[0]
-        await asyncio.sleep(0.1)
-        try:
-            await bot.send_message(chat_id=int(user_id),
-                                   text=msg,
-                                   reply_markup=close())
-        except BotBlocked:
-            pass
+    job_id = create_broadcast_job(user_id, msg, message_id)
     await bot.edit_message_text(chat_id=message.chat.id,
                                 message_id=message_id,
-                                text='Transliacija baigta',
+                                text='Transliacija pradėta',
                                 reply_markup=back("console"))
-    logger.info(f"User {user_info.id} ({user_info.first_name})"
-                f" performed a broadcast. Message was sent to {max_users} users.")
+    start_broadcast(bot, job_id)
+    logger.info(f"User {user_info.id} ({user_info.first_name}) started broadcast #{job_id}")
 
 
 def register_mailing(dp: Dispatcher) -> None:
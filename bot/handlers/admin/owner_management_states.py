@@ -1,19 +1,16 @@
 from aiogram import Dispatcher
 from aiogram.types import CallbackQuery, Message
 
-from bot.database.methods import check_role, check_user_by_username, set_role, get_role_id_by_name
+from bot.database.methods import check_user_by_username, set_role, get_role_id_by_name
 from bot.database.models import Permission
-from bot.handlers.other import get_bot_user_ids
+from bot.handlers.other import get_bot_user_ids, permission_required
 from bot.keyboards import back
 from bot.misc import TgConfig
 
 
+@permission_required(Permission.OWN)
 async def owner_management_callback(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.OWN):
-        await call.answer('Nepakanka teisių')
-        return
     TgConfig.STATE[user_id] = 'owner_assign_username'
     TgConfig.STATE[f'{user_id}_message_id'] = call.message.message_id
     await bot.edit_message_text(
@@ -25,32 +25,35 @@ from bot.utils.media import load_media_bundle
 async def pirkimai_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    dates = get_purchase_dates()
+    page = int(call.data[len('pirkimai_'):] or 0)
+    dates, total = get_purchase_dates(page)
     await bot.edit_message_text(
         '📅 Pasirinkite datą',
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
-        reply_markup=purchases_dates_list(dates),
+        reply_markup=purchases_dates_list(dates, page, total),
     )
 
 
 async def purchases_date_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    date = call.data[len('purchases_date_'):]
-    purchases = get_purchases_by_date(date)
+    date, _, page = call.data[len('purchases_date_'):].partition('_')
+    page = int(page or 0)
+    purchases, total = get_purchases_by_date(date, page)
     await bot.edit_message_text(
-        f'📦 Pirkimai {date}',
+        f'📦 Pirkimai {date} ({total})',
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
-        reply_markup=purchases_list(purchases, date),
+        reply_markup=purchases_list(purchases, date, page, total),
     )
 
 
 async def purchase_info_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    _, purchase_id, date = call.data.split('_', 2)
+    _, purchase_id, rest = call.data.split('_', 2)
+    date, _, page = rest.partition('_')
     purchase_id_int = int(purchase_id)
     purchase = select_bought_item(purchase_id_int)
     if not purchase:
@@ -76,7 +79,7 @@ async def purchase_info_callback_handler(call: CallbackQuery):
         text,
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
-        reply_markup=purchase_info_menu(purchase_id_int, date),
+        reply_markup=purchase_info_menu(purchase_id_int, date, int(page or 0)),
     )
 
 
@@ -115,7 +118,8 @@ async def view_purchase_handler(call: CallbackQuery):
 
 
 def register_purchases(dp: Dispatcher) -> None:
-    dp.register_callback_query_handler(pirkimai_callback_handler, lambda c: c.data == 'pirkimai', state='*')
+    dp.register_callback_query_handler(pirkimai_callback_handler,
+                                       lambda c: c.data == 'pirkimai' or c.data.startswith('pirkimai_'), state='*')
     dp.register_callback_query_handler(purchases_date_callback_handler, lambda c: c.data.startswith('purchases_date_'), state='*')
     dp.register_callback_query_handler(purchase_info_callback_handler, lambda c: c.data.startswith('purchase_'), state='*')
     dp.register_callback_query_handler(view_purchase_handler, lambda c: c.data.startswith('view_purchase_'), state='*')
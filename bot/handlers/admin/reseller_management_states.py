@@ -2,7 +2,7 @@ from aiogram import Dispatcher
 from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 from bot.database.methods import (
-    check_role, check_user_by_username, create_reseller, delete_reseller,
+    check_user_by_username, create_reseller, delete_reseller,
     get_resellers, set_reseller_price, get_all_category_names,
     get_all_subcategories, get_all_item_names, get_category_parent,
     check_user, is_reseller
@@ -10,16 +10,13 @@ from bot.database.methods import (
 from bot.database.models import Permission
 from bot.keyboards import back, resellers_management, resellers_list
 from bot.misc import TgConfig
-from bot.handlers.other import get_bot_user_ids
+from bot.handlers.other import get_bot_user_ids, permission_required
 from bot.utils import display_name
 
 
+@permission_required(Permission.SHOP_MANAGE)
 async def resellers_management_callback(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE):
-        await call.answer('Nepakanka teisių')
-        return
     TgConfig.STATE[user_id] = None
     await bot.edit_message_text('🤝 Resellerių meniu',
                                 chat_id=call.message.chat.id,
@@ -1,6 +1,7 @@
 import datetime
 import os
 import shutil
+import time
 
 import secrets
 from collections import Counter
@@ -13,11 +14,12 @@ from aiogram.utils.exceptions import ChatNotFound
 from bot.localization import t
 from bot.database.methods import (
     add_values_to_item,
+    add_values_bulk,
     check_category,
     check_item,
     check_role,
     check_value,
-    select_item_values_amount,
+    is_stock_empty,
     create_category,
     create_item,
     delete_category,
@@ -32,19 +34,13 @@ from bot.database.methods import (
     get_category_title,
     get_category_titles,
     get_item_info,
-    get_user_count,
+    get_daily_stats,
     get_user_language,
     select_admins,
-    select_all_operations,
-    select_all_orders,
     select_bought_item,
-    select_count_bought_items,
     select_count_categories,
     select_count_goods,
     select_count_items,
-    select_today_operations,
-    select_today_orders,
-    select_today_users,
     select_users_balance,
     update_category,
     update_item,
@@ -64,7 +60,7 @@ from bot.utils.media import write_media_meta
 
 from bot.utils.files import cleanup_item_file, create_stock_folder, get_next_file_path
 from bot.database.models import Permission
-from bot.handlers.other import get_bot_user_ids
+from bot.handlers.other import get_bot_user_ids, permission_required
 from bot.keyboards import (
     shop_management,
     goods_management,
@@ -77,6 +73,7 @@ from bot.keyboards import (
     promo_codes_list,
     promo_manage_actions,
     catalog_editor_menu,
+    statistics_menu,
 )
 from bot.logger_mesh import logger
 from bot.misc import TgConfig, EnvKeys
@@ -669,12 +666,9 @@ async def _show_assign_menu(bot, chat_id: int, message_id: int, user_id: int, ca
     )
 
 
+@permission_required(Permission.SHOP_MANAGE, Permission.ASSIGN_PHOTOS)
 async def assign_photos_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE or role & Permission.ASSIGN_PHOTOS):
-        await call.answer('Nepakanka teisių')
-        return
     TgConfig.STATE[user_id] = None
     pending_paths = TgConfig.STATE.pop(f'{user_id}_stock_paths', [])
     for file_path in pending_paths:
@@ -685,32 +679,23 @@ async def assign_photos_callback_handler(call: CallbackQuery):
     await _show_assign_menu(bot, call.message.chat.id, call.message.message_id, user_id, None)
 
 
+@permission_required(Permission.SHOP_MANAGE, Permission.ASSIGN_PHOTOS)
 async def assign_photo_main_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE or role & Permission.ASSIGN_PHOTOS):
-        await call.answer('Nepakanka teisių')
-        return
     main = call.data[len('assign_photo_main_'):]
     await _show_assign_menu(bot, call.message.chat.id, call.message.message_id, user_id, main)
 
 
+@permission_required(Permission.SHOP_MANAGE, Permission.ASSIGN_PHOTOS)
 async def assign_photo_category_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE or role & Permission.ASSIGN_PHOTOS):
-        await call.answer('Nepakanka teisių')
-        return
     category = call.data[len('assign_photo_cat_'):]
     await _show_assign_menu(bot, call.message.chat.id, call.message.message_id, user_id, category)
 
 
+@permission_required(Permission.SHOP_MANAGE, Permission.ASSIGN_PHOTOS)
 async def assign_photo_subcategory_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE or role & Permission.ASSIGN_PHOTOS):
-        await call.answer('Nepakanka teisių')
-        return
     category = call.data[len('assign_photo_sub_'):]
     await _show_assign_menu(bot, call.message.chat.id, call.message.message_id, user_id, category)
 
@@ -721,12 +706,9 @@ async def assign_photo_empty_handler(call: CallbackQuery):
     await call.answer(t(lang, 'assign_empty_branch'), show_alert=True)
 
 
+@permission_required(Permission.SHOP_MANAGE, Permission.ASSIGN_PHOTOS)
 async def assign_photo_item_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE or role & Permission.ASSIGN_PHOTOS):
-        await call.answer('Nepakanka teisių')
-        return
     item = call.data[len('assign_photo_item_'):]
     info = get_item_info(item)
     category = info['category_name'] if info else None
@@ -788,12 +770,9 @@ async def assign_photo_receive_media(message: Message):
     )
 
 
+@permission_required(Permission.SHOP_MANAGE, Permission.ASSIGN_PHOTOS)
 async def assign_photo_done_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE or role & Permission.ASSIGN_PHOTOS):
-        await call.answer('Nepakanka teisių')
-        return
     item = TgConfig.STATE.get(f'{user_id}_item')
     stock_paths = TgConfig.STATE.get(f'{user_id}_stock_paths') or []
     lang = _get_lang(user_id)
@@ -813,12 +792,9 @@ async def assign_photo_done_handler(call: CallbackQuery):
     )
 
 
+@permission_required(Permission.SHOP_MANAGE, Permission.ASSIGN_PHOTOS)
 async def assign_photo_cancel_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE or role & Permission.ASSIGN_PHOTOS):
-        await call.answer('Nepakanka teisių')
-        return
     category = TgConfig.STATE.pop(f'{user_id}_assign_category', None)
     stock_paths = TgConfig.STATE.pop(f'{user_id}_stock_paths', [])
     TgConfig.STATE.pop(f'{user_id}_stock_folder', None)
@@ -843,7 +819,7 @@ async def assign_photo_receive_desc(message: Message):
     preview_folder = os.path.join('assets', 'product_photos', item)
     with open(os.path.join(preview_folder, 'description.txt'), 'w') as f:
         f.write(message.text)
-    was_empty = select_item_values_amount(item) == 0 and not check_value(item)
+    was_empty = is_stock_empty(item)
 
     # Keep the first uploaded media as the primary stock value but persist
     # every attachment in metadata so the purchaser receives the full bundle.
@@ -1000,28 +976,40 @@ async def statistics_callback_handler(call: CallbackQuery):
     role = check_role(user_id)
     if role & Permission.SHOP_MANAGE:
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        await bot.edit_message_text('Shop statistics:\n'
-                                    '➖➖➖➖➖➖➖➖➖➖➖➖➖\n'
-                                    '<b>◽USERS</b>\n'
-                                    f'◾️Users in last 24h: {select_today_users(today)}\n'
-                                    f'◾️Total administrators: {select_admins()}\n'
-                                    f'◾️Total users: {get_user_count()}\n'
-                                    '➖➖➖➖➖➖➖➖➖➖➖➖➖\n'
-                                    '◽<b>FUNDS</b>\n'
-                                    f'◾Sales in 24h: {select_today_orders(today)}€\n'
-                                    f'◾Items sold for: {select_all_orders()}€\n'
-                                    f'◾Top-ups in 24h: {select_today_operations(today)}€\n'
-                                    f'◾Funds in system: {select_users_balance()}€\n'
-                                    f'◾Total topped up: {select_all_operations()}€\n'
-                                    '➖➖➖➖➖➖➖➖➖➖➖➖➖\n'
-                                    '◽<b>OTHER</b>\n'
-                                    f'◾Items: {select_count_items()}pcs.\n'
-                                    f'◾Positions: {select_count_goods()}pcs.\n'
-                                    f'◾Categories: {select_count_categories()}pcs.\n'
-                                    f'◾Items sold: {select_count_bought_items()}pcs.',
+        period = int(call.data.split('_', 1)[1]) if '_' in call.data else None
+        stats = get_daily_stats(today, period)
+        day, total = stats['today'], stats['total']
+        text = ('Shop statistics:\n'
+                '➖➖➖➖➖➖➖➖➖➖➖➖➖\n'
+                '<b>◽USERS</b>\n'
+                f'◾️Users in last 24h: {day["new_users"]}\n'
+                f'◾️Total administrators: {select_admins()}\n'
+                f'◾️Total users: {total["new_users"]}\n'
+                '➖➖➖➖➖➖➖➖➖➖➖➖➖\n'
+                '◽<b>FUNDS</b>\n'
+                f'◾Sales in 24h: {day["sales"]}€\n'
+                f'◾Items sold for: {total["sales"]}€\n'
+                f'◾Top-ups in 24h: {day["topups"]}€\n'
+                f'◾Funds in system: {select_users_balance()}€\n'
+                f'◾Total topped up: {total["topups"]}€\n'
+                '➖➖➖➖➖➖➖➖➖➖➖➖➖\n'
+                '◽<b>OTHER</b>\n'
+                f'◾Items: {select_count_items()}pcs.\n'
+                f'◾Positions: {select_count_goods()}pcs.\n'
+                f'◾Categories: {select_count_categories()}pcs.\n'
+                f'◾Items sold: {total["orders"]}pcs.')
+        if period:
+            last = stats['period']
+            text += ('\n➖➖➖➖➖➖➖➖➖➖➖➖➖\n'
+                     f'◽<b>LAST {period} DAYS</b>\n'
+                     f'◾New users: {last["new_users"]}\n'
+                     f'◾Items sold: {last["orders"]}pcs.\n'
+                     f'◾Sales: {last["sales"]}€\n'
+                     f'◾Top-ups: {last["topups"]}€')
+        await bot.edit_message_text(text,
                                     chat_id=call.message.chat.id,
                                     message_id=call.message.message_id,
-                                    reply_markup=back('shop_management'),
+                                    reply_markup=statistics_menu(),
                                     parse_mode='HTML')
         return
     await call.answer('Nepakanka teisių')
@@ -1218,13 +1206,10 @@ async def process_subcategory_name(message: Message):
     TgConfig.STATE.pop(f'{user_id}_category_update_back', None)
 
 
+@permission_required(Permission.SHOP_MANAGE)
 async def delete_category_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE):
-        await call.answer('Nepakanka teisių')
-        return
     categories = get_all_category_names()
     markup = InlineKeyboardMarkup()
     for cat in categories:
@@ -1270,15 +1255,12 @@ def _clear_update_category_selection_state(user_id: int) -> None:
     TgConfig.STATE.pop(f'{user_id}_category_current', None)
 
 
+@permission_required(Permission.SHOP_MANAGE)
 async def update_category_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     if f'{user_id}_category_update_back' not in TgConfig.STATE:
         TgConfig.STATE[f'{user_id}_category_update_back'] = 'categories_management'
     TgConfig.STATE[f'{user_id}_message_id'] = call.message.message_id
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE):
-        await call.answer('Nepakanka teisių')
-        return
     lang = _get_lang(user_id)
     TgConfig.STATE[user_id] = 'update_category_select'
     TgConfig.STATE[f'{user_id}_category_nav'] = []
@@ -2606,10 +2588,11 @@ async def updating_item_amount(message: Message):
     item_name = TgConfig.STATE.get(f'{user_id}_name')
     await bot.delete_message(chat_id=message.chat.id,
                              message_id=message.message_id)
-    was_empty = select_item_values_amount(item_name) == 0 and not check_value(item_name)
-    for i in values_list:
-        add_values_to_item(item_name, i, False)
-    if was_empty:
+    was_empty = is_stock_empty(item_name)
+    started = time.perf_counter()
+    added = add_values_bulk(item_name, values_list)
+    elapsed = time.perf_counter() - started
+    if was_empty and added:
         await notify_restock(bot, item_name)
     group_id = TgConfig.GROUP_ID if TgConfig.GROUP_ID != -988765433 else None
     if group_id:
@@ -2623,22 +2606,20 @@ async def updating_item_amount(message: Message):
             pass
     await bot.edit_message_text(chat_id=message.chat.id,
                                 message_id=message_id,
-                                text='✅ Товар добавлен',
+                                text=f'✅ Товар добавлен: {added} шт за {elapsed:.2f} с '
+                                     f'({added / max(elapsed, 1e-6):.0f} шт/с)',
                                 reply_markup=back(_get_item_update_back(user_id)))
     admin_info = await bot.get_chat(user_id)
     logger.info(f"User {user_id} ({admin_info.first_name}) "
-                f'добавил товары к позиции "{item_name}" в количестве {len(values_list)} шт')
+                f'добавил товары к позиции "{item_name}" в количестве {added} шт')
 
 
+@permission_required(Permission.SHOP_MANAGE)
 async def update_item_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     if f'{user_id}_item_update_back' not in TgConfig.STATE:
         TgConfig.STATE[f'{user_id}_item_update_back'] = 'goods_management'
     TgConfig.STATE[f'{user_id}_message_id'] = call.message.message_id
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE):
-        await call.answer('Nepakanka teisių')
-        return
     lang = _get_lang(user_id)
     TgConfig.STATE[user_id] = 'update_item_select'
     TgConfig.STATE[f'{user_id}_update_nav'] = []
@@ -3047,7 +3028,7 @@ async def update_item_infinity(message: Message):
     price = TgConfig.STATE.get(f'{user_id}_price')
     await bot.delete_message(chat_id=message.chat.id,
                              message_id=message.message_id)
-    was_empty = select_item_values_amount(item_old_name) == 0 and not check_value(item_old_name)
+    was_empty = is_stock_empty(item_old_name)
     if change == 'make':
         delete_only_items(item_old_name)
         add_values_to_item(item_old_name, msg, False)
@@ -3059,9 +3040,8 @@ async def update_item_infinity(message: Message):
             values_list = [os.path.join(msg, f) for f in os.listdir(msg)]
         else:
             values_list = msg.split(';')
-        for i in values_list:
-            add_values_to_item(item_old_name, i, False)
-        if was_empty:
+        added = add_values_bulk(item_old_name, values_list)
+        if was_empty and added:
             await notify_restock(bot, item_old_name)
     TgConfig.STATE[user_id] = None
     await _finalize_item_update(
@@ -3077,13 +3057,10 @@ async def update_item_infinity(message: Message):
     )
 
 
+@permission_required(Permission.SHOP_MANAGE)
 async def delete_item_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    role = check_role(user_id)
-    if not (role & Permission.SHOP_MANAGE):
-        await call.answer('Nepakanka teisių')
-        return
     categories = get_all_category_names()
     markup = InlineKeyboardMarkup()
     for cat in categories:
@@ -3173,7 +3150,7 @@ async def process_item_show(message: Message):
 
 def register_shop_management(dp: Dispatcher) -> None:
     dp.register_callback_query_handler(statistics_callback_handler,
-                                       lambda c: c.data == 'statistics')
+                                       lambda c: c.data in ('statistics', 'statistics_7', 'statistics_30'))
     dp.register_callback_query_handler(goods_settings_menu_callback_handler,
                                        lambda c: c.data == 'item-management')
     dp.register_callback_query_handler(add_item_callback_handler,
@@ -6,8 +6,8 @@ from aiogram.utils.exceptions import BotBlocked
 
 from bot.keyboards import back, user_manage_check, user_management, user_items_list, close
 from bot.database.methods import check_role, check_user, check_user_by_username, select_user_operations, select_user_items, \
-    check_role_name_by_id, check_user_referrals, select_bought_items, set_role, create_operation, update_balance, \
-    bought_items_list
+    check_role_name_by_id, check_user_referrals, get_bought_items_page, set_role, create_operation, update_balance, \
+    BOUGHT_ITEMS_PAGE_SIZE
 from bot.misc import TgConfig
 from bot.database.models import Permission
 from bot.handlers.other import get_bot_user_ids
@@ -94,11 +94,8 @@ async def user_items_callback_handler(call: CallbackQuery):
     role = check_role(user_id)
     if role & Permission.ADMINS_MANAGE:
         TgConfig.STATE[f'{user_id}_back'] = f'user-items_{user_data}'
-        bought_goods = select_bought_items(user_data)
-        goods = bought_items_list(user_id)
-        max_index = len(goods) // 10
-        if len(goods) % 10 == 0:
-            max_index -= 1
+        bought_goods = get_bought_items_page(user_data)
+        max_index = max(select_user_items(user_data) - 1, 0) // BOUGHT_ITEMS_PAGE_SIZE
         keyboard = user_items_list(bought_goods, user_data, f'check-user_{user_data}',
                                    f'user-items_{user_data}', 0, max_index)
         await bot.edit_message_text(
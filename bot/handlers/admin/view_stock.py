@@ -11,11 +11,11 @@ from bot.database.methods import (
     get_item_values,
     get_item_value_by_id,
     buy_item,
-    select_item_values_amount,
-    get_item_info,
+    get_stock_levels,
+    get_items_info,
 )
 from bot.database.models import Permission
-from bot.handlers.other import get_bot_user_ids
+from bot.handlers.other import get_bot_user_ids, permission_required
 from bot.keyboards import (
     stock_categories_list,
     stock_goods_list,
@@ -36,19 +36,26 @@ async def view_stock_callback_handler(call: CallbackQuery):
         root_cb = 'information' if call.data == 'view_stock' else 'shop_management'
         TgConfig.STATE[f'{user_id}_stock_root'] = root_cb
         categories = get_all_category_names()
+        layout = [
+            (category,
+             [(sub, get_all_item_names(sub)) for sub in get_all_subcategories(category)],
+             get_all_item_names(category))
+            for category in categories
+        ]
+        names = [item for _, subs, items in layout for item in items + [i for _, sub_items in subs for i in sub_items]]
+        levels = get_stock_levels(names)
+        infos = get_items_info(names)
         lines = ['📋 Atsargų sąrašas']
-        for category in categories:
+        for category, subs, items in layout:
             lines.append(f"\n<b>{category}</b>")
-            for sub in get_all_subcategories(category):
+            for sub, sub_items in subs:
                 lines.append(f"  {sub}")
-                for item in get_all_item_names(sub):
-                    info = get_item_info(item)
-                    count = select_item_values_amount(item)
-                    lines.append(f"    • {display_name(item)} ({info['price']:.2f}€, {count})")
-            for item in get_all_item_names(category):
-                info = get_item_info(item)
-                count = select_item_values_amount(item)
-                lines.append(f"  • {display_name(item)} ({info['price']:.2f}€, {count})")
+                for item in sub_items:
+                    count = levels[item][0]
+                    lines.append(f"    • {display_name(item)} ({infos[item]['price']:.2f}€, {count})")
+            for item in items:
+                count = levels[item][0]
+                lines.append(f"  • {display_name(item)} ({infos[item]['price']:.2f}€, {count})")
         text = '\n'.join(lines)
         await bot.send_message(call.message.chat.id, text, parse_mode='HTML')
         await bot.edit_message_text(
@@ -61,12 +68,9 @@ async def view_stock_callback_handler(call: CallbackQuery):
     await call.answer('Nepakanka teisių')
 
 
+@permission_required(Permission.OWN)
 async def view_stock_category_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not role & Permission.OWN:
-        await call.answer('Nepakanka teisių')
-        return
     category = call.data.split(':', 1)[1]
     subs = get_all_subcategories(category)
     if subs:
@@ -92,12 +96,9 @@ async def view_stock_category_handler(call: CallbackQuery):
     await call.answer('Nėra prekių')
 
 
+@permission_required(Permission.OWN)
 async def view_stock_item_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not role & Permission.OWN:
-        await call.answer('Nepakanka teisių')
-        return
     _, item_name, category = call.data.split(':', 2)
     values = get_item_values(item_name)
     if values:
@@ -111,12 +112,9 @@ async def view_stock_item_handler(call: CallbackQuery):
     await call.answer('Nėra atsargų')
 
 
+@permission_required(Permission.OWN)
 async def view_stock_value_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not role & Permission.OWN:
-        await call.answer('Nepakanka teisių')
-        return
     _, value_id, item_name, category = call.data.split(':', 3)
     value_id = int(value_id)
     value = get_item_value_by_id(value_id)
@@ -154,12 +152,9 @@ async def view_stock_value_handler(call: CallbackQuery):
     )
 
 
+@permission_required(Permission.OWN)
 async def view_stock_delete_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    role = check_role(user_id)
-    if not role & Permission.OWN:
-        await call.answer('Nepakanka teisių')
-        return
     _, value_id, item_name, category = call.data.split(':', 3)
     value_id = int(value_id)
     value = get_item_value_by_id(value_id)
@@ -1,9 +1,10 @@
+import functools
 import time
 
 from aiogram import Dispatcher, Bot
 from aiogram.dispatcher.handler import CancelHandler
 
-from bot.database.methods import get_user_language
+from bot.database.methods import check_role, get_user_language
 from bot.localization import t
 from bot.misc import TgConfig
 
@@ -30,6 +31,20 @@ async def get_bot_user_ids(query):
     return bot, user_id
 
 
+def permission_required(*permissions: int):
+    """Only run the wrapped callback handler for users holding any of ``permissions``."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(call, *args, **kwargs):
+            role = check_role(call.from_user.id)
+            if not any(role & permission for permission in permissions):
+                await call.answer('Nepakanka teisių')
+                return
+            return await handler(call, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 async def check_sub_channel(chat_member):
     return str(chat_member.status) != 'left'
 
@@ -35,22 +35,25 @@ from aiogram.utils.exceptions import (
 )
 
 from bot.database.methods import (
-    get_role_id_by_name, create_user, check_role, check_user,
-    get_all_categories, get_all_items, select_bought_items, get_bought_item_info, get_item_info,
-    select_item_values_amount, get_user_balance, get_item_value, buy_item, add_bought_item, buy_item_for_balance,
+    get_role_id_by_name, create_user, check_role, check_user, get_user_context,
+    get_all_categories, get_all_items, get_bought_items_page, get_bought_item_info, get_item_info,
+    get_items_info, get_stock_levels, is_stock_empty, get_user_balance, get_item_value, claim_item_value, add_bought_item, buy_item_for_balance,
     select_user_operations, select_user_items, start_operation,
     select_unfinished_operations, get_user_referral, finish_operation, update_balance, create_operation,
-    bought_items_list, check_value, get_subcategories, get_category_parent, get_user_language, update_user_language,
+    BOUGHT_ITEMS_PAGE_SIZE, get_subcategories, get_category_parent, get_user_language, update_user_language,
     get_unfinished_operation, get_user_unfinished_operation, get_promocode, add_values_to_item, get_user_tickets, update_lottery_tickets,
     can_use_discount, can_get_referral_reward,
     get_category_title, get_category_titles,
     has_user_achievement, get_achievement_users, grant_achievement, get_user_count,
     get_out_of_stock_categories, get_out_of_stock_subcategories, get_out_of_stock_items,
-    has_stock_notification, add_stock_notification, check_user_by_username, check_user_referrals,
-    sum_referral_operations, add_item_to_cart, get_cart_items_with_prices,
+    has_stock_notification, add_stock_notification, check_user_by_username,
+    get_referral_stats, add_item_to_cart, get_cart_items_with_prices,
     remove_cart_item, clear_cart,
     is_category_locked, get_user_category_password, get_generated_password,
 )
+from bot.database import run_sync
+from bot.database.models import Permission
+from bot.database.methods import aio
 from bot.database.methods.update import (
     process_purchase_streak,
     set_cart_quantity,
@@ -60,6 +63,7 @@ from bot.database.methods.update import (
     set_role,
 )
 from bot.handlers.other import get_bot_user_ids, get_bot_info
+from bot.utils.scheduler import register_task_handler, schedule_task
 from bot.keyboards import (
     main_menu, categories_list, goods_list, subcategories_list, user_items_list, back, item_info,
     profile, rules, payment_menu, close, crypto_choice, crypto_invoice_menu, blackjack_controls,
@@ -75,7 +79,7 @@ from bot.localization import t
 from bot.logger_mesh import logger
 from bot.misc import TgConfig, EnvKeys
 from bot.misc.payment import quick_pay, check_payment_status
-from bot.misc.nowpayments import create_payment, check_payment
+from bot.misc.nowpayments import NowPaymentsError, create_payment, check_payment, minimum_amount
 from bot.utils import display_name
 from bot.utils.stock_notify import notify_restock
 from bot.utils.media import load_media_bundle, move_media_to_sold
@@ -160,13 +164,16 @@ async def request_feedback(bot, user_id: int, lang: str, item_name: str) -> None
     )
 
 
-async def schedule_feedback(bot, user_id: int, lang: str, item_name: str) -> None:
+FEEDBACK_DELAY = 3600  # s after a purchase
+
+
+async def schedule_feedback(user_id: int, lang: str, item_name: str) -> None:
     """Send feedback request after a 1-hour delay."""
-    try:
-        await asyncio.sleep(3600)  # 1 hour
-        await request_feedback(bot, user_id, lang, item_name)
-    except Exception as e:
-        logger.error(f"Feedback request failed for {user_id}: {e}")
+    await schedule_task('feedback', FEEDBACK_DELAY, user_id=user_id, lang=lang, item_name=item_name)
+
+
+async def _run_feedback_task(bot, payload: dict) -> None:
+    await request_feedback(bot, payload['user_id'], payload['lang'], payload['item_name'])
 
 
 def build_subcategory_description(parent: str, lang: str, user_id: int | None = None) -> str:
@@ -175,13 +182,13 @@ def build_subcategory_description(parent: str, lang: str, user_id: int | None =
     lines = [f" {parent_title}", ""]
     subs = get_subcategories(parent)
     titles = get_category_titles(subs)
+    goods = {sub: get_all_items(sub) for sub in subs}
+    infos = get_items_info([item for items in goods.values() for item in items], user_id)
     for sub in subs:
         sub_title = titles.get(sub, sub)
         lines.append(f"🏘️ {sub_title}:")
-        goods = get_all_items(sub)
-        for item in goods:
-            info = get_item_info(item, user_id)
-            lines.append(f"    • {display_name(item)} ({info['price']:.2f}€)")
+        for item in goods[sub]:
+            lines.append(f"    • {display_name(item)} ({infos[item]['price']:.2f}€)")
         lines.append("")
     lines.append(t(lang, 'choose_subcategory'))
     return "\n".join(lines)
@@ -206,17 +213,18 @@ def _clear_coinflip_state(user_id: int) -> None:
     TgConfig.STATE.pop(f'{user_id}_coinflip_bet', None)
 
 
-def schedule_message_deletion(bot, chat_id: int | None, message_id: int | None, delay: float = 0.0) -> None:
+async def schedule_message_deletion(bot, chat_id: int | None, message_id: int | None, delay: float = 0.0) -> None:
     if chat_id is None or message_id is None:
         return
+    if delay:
+        await schedule_task('delete_message', delay, chat_id=chat_id, message_id=message_id)
+    else:
+        asyncio.create_task(_run_delete_message_task(bot, {'chat_id': chat_id, 'message_id': message_id}))
 
-    async def _delete() -> None:
-        if delay:
-            await asyncio.sleep(delay)
-        with contextlib.suppress(Exception):
-            await bot.delete_message(chat_id, message_id)
 
-    asyncio.create_task(_delete())
+async def _run_delete_message_task(bot, payload: dict) -> None:
+    with contextlib.suppress(Exception):
+        await bot.delete_message(payload['chat_id'], payload['message_id'])
 
 
 def split_amount(amount: Decimal, quantity: int) -> list[Decimal]:
@@ -231,6 +239,7 @@ def split_amount(amount: Decimal, quantity: int) -> list[Decimal]:
 
 def compute_cart_state(user_id: int) -> dict:
     items_raw = get_cart_items_with_prices(user_id)
+    levels = get_stock_levels(cart_item.item_name for cart_item, _ in items_raw)
     details: list[dict] = []
     total = Decimal('0')
     category_total = Decimal('0')
@@ -240,8 +249,8 @@ def compute_cart_state(user_id: int) -> dict:
         line_total = _money(price * _to_decimal(quantity))
         total += line_total
         category_allows = can_use_discount(cart_item.item_name)
-        infinite = bool(check_value(cart_item.item_name))
-        available = None if infinite else select_item_values_amount(cart_item.item_name)
+        stock, infinite, _ = levels[cart_item.item_name]
+        available = None if infinite else stock
         if category_allows:
             category_total += line_total
         details.append(
@@ -326,24 +335,20 @@ async def _restore_reserved_units(bot, reserved_units: list[dict]) -> None:
         item_name = unit.get('item_name')
         if not value or item_name is None:
             continue
-        remove_reservation(item_name, unit.get('expires_at'))
+        await run_sync(remove_reservation, item_name, unit.get('expires_at'))
         if not value['is_infinity']:
-            was_empty = (
-                select_item_values_amount(item_name) == 0
-                and not check_value(item_name)
-            )
-            add_values_to_item(item_name, value['value'], value['is_infinity'])
+            was_empty = await aio.is_stock_empty(item_name)
+            await aio.add_values_to_item(item_name, value['value'], value['is_infinity'])
             if was_empty:
                 await notify_restock(bot, item_name)
 
 
-async def _expire_purchase(bot, payment_id: str, info: tuple[int, int, int | None], lang_hint: str,
+async def _expire_purchase(bot, payment_id: str, info: tuple[int, int, int | None], lang: str,
                            purchase_data_hint: dict | None = None,
                            reserved_fallback: list[dict] | None = None) -> None:
     user_id_db, _, message_id = info
-    lang = get_user_language(user_id_db) or lang_hint
 
-    finish_operation(payment_id)
+    await aio.finish_operation(payment_id)
     purchase_data = TgConfig.STATE.pop(f'purchase_{payment_id}', None) or purchase_data_hint
 
     if purchase_data:
@@ -355,13 +360,10 @@ async def _expire_purchase(bot, payment_id: str, info: tuple[int, int, int | Non
             await update_cart_view(bot, user_id_db, cart_msg_id, user_id_db, lang)
         elif purchase_data.get('reserved'):
             reserved = purchase_data['reserved']
-            remove_reservation(purchase_data['item'], reserved.get('expires_at'))
+            await run_sync(remove_reservation, purchase_data['item'], reserved.get('expires_at'))
             if reserved and not reserved['is_infinity']:
-                was_empty = (
-                    select_item_values_amount(purchase_data['item']) == 0
-                    and not check_value(purchase_data['item'])
-                )
-                add_values_to_item(purchase_data['item'], reserved['value'], reserved['is_infinity'])
+                was_empty = await aio.is_stock_empty(purchase_data['item'])
+                await aio.add_values_to_item(purchase_data['item'], reserved['value'], reserved['is_infinity'])
                 if was_empty:
                     await notify_restock(bot, purchase_data['item'])
 
@@ -381,6 +383,80 @@ async def _expire_purchase(bot, payment_id: str, info: tuple[int, int, int | Non
     await bot.send_message(user_id_db, t(lang, 'purchase_expired'), reply_markup=home_markup(lang))
 
 
+PAID_STATUSES = {
+    'nowpayments': ('finished', 'confirmed', 'sending'),
+    'yoomoney': ('paid', 'success'),
+}
+
+
+async def _provider_status(operation: dict) -> str | None:
+    if operation['provider'] == 'yoomoney':
+        return await check_payment_status(operation['operation_id'])
+    return await check_payment(operation['operation_id'])
+
+
+async def _expire_operation(bot, operation: dict) -> None:
+    payment_id = operation['operation_id']
+    try:
+        status = await _provider_status(operation)
+    except Exception as e:
+        logger.warning(f"Payment status check for {payment_id} failed, retrying later: {e}")
+        await aio.set_operation_expiry(
+            payment_id, datetime.datetime.now() + datetime.timedelta(seconds=float(EnvKeys.PAYMENT_SWEEP_INTERVAL)))
+        return
+    if status in PAID_STATUSES.get(operation['provider'], PAID_STATUSES['nowpayments']):
+        # Paid but not yet confirmed to us; the payment check or IPN finishes it.
+        await aio.set_operation_expiry(payment_id, None)
+        return
+
+    user_id = operation['user_id']
+    lang = await aio.get_user_language(user_id) or 'en'
+    purchase_data = operation['payload']
+    if purchase_data is None:
+        await aio.finish_operation(payment_id)
+        await bot.send_message(user_id, t(lang, 'invoice_cancelled'))
+        return
+    await _expire_purchase(
+        bot,
+        payment_id,
+        (user_id, operation['value'], operation['message_id']),
+        lang,
+        purchase_data,
+        purchase_data.get('reserved') if purchase_data.get('type') == 'cart' else None,
+    )
+
+
+async def sweep_expired_payments(bot) -> None:
+    """Expire every invoice past its deadline, a batch at a time."""
+    batch_size = int(EnvKeys.PAYMENT_SWEEP_BATCH_SIZE)
+    while True:
+        due = await aio.get_expired_operations(datetime.datetime.now(), batch_size)
+        for operation in due:
+            try:
+                await _expire_operation(bot, operation)
+            except Exception as e:
+                logger.error(f"Expiring payment {operation['operation_id']} failed: {e}")
+                with contextlib.suppress(Exception):
+                    await aio.set_operation_expiry(operation['operation_id'], None)
+        if len(due) < batch_size:
+            return
+
+
+async def payment_expiry_loop(bot, interval: float | None = None) -> None:
+    """Sweep expired invoices now and then periodically."""
+    interval = interval or float(EnvKeys.PAYMENT_SWEEP_INTERVAL)
+    while True:
+        try:
+            await sweep_expired_payments(bot)
+        except Exception as e:
+            logger.error(f"Payment expiry sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_payment_sweeper(bot) -> asyncio.Task:
+    return asyncio.create_task(payment_expiry_loop(bot))
+
+
 def build_cart_summary(user_id: int, lang: str) -> tuple[str, InlineKeyboardMarkup]:
     state = compute_cart_state(user_id)
     items = state['items']
@@ -472,16 +548,17 @@ async def sync_cart_with_stock(bot, user_id: int, lang: str) -> None:
     """Ensure cart contents reflect current stock levels."""
     removed: list[str] = []
     reduced: list[tuple[str, int]] = []
-    for cart_item, _ in get_cart_items_with_prices(user_id):
-        infinite = bool(check_value(cart_item.item_name))
+    cart_items = [cart_item for cart_item, _ in await aio.get_cart_items_with_prices(user_id)]
+    levels = await aio.get_stock_levels([cart_item.item_name for cart_item in cart_items])
+    for cart_item in cart_items:
+        available, infinite, _ = levels[cart_item.item_name]
         if infinite:
             continue
-        available = select_item_values_amount(cart_item.item_name)
         if available == 0:
-            remove_cart_item(user_id, cart_item.item_name)
+            await aio.remove_cart_item(user_id, cart_item.item_name)
             removed.append(cart_item.item_name)
         elif available < cart_item.quantity:
-            set_cart_quantity(user_id, cart_item.item_name, available)
+            await aio.set_cart_quantity(user_id, cart_item.item_name, available)
             reduced.append((cart_item.item_name, available))
 
     for name in removed:
@@ -802,11 +879,10 @@ async def pavogti_item_callback(call: CallbackQuery):
 
 async def back_to_menu_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    user = check_user(call.from_user.id)
-    user_lang = get_user_language(user_id) or 'en'
+    user = get_user_context(user_id)
+    user_lang = user.language or 'en'
     markup = main_menu(user.role_id, TgConfig.CHANNEL_URL, TgConfig.PRICE_LIST_URL, user_lang)
-    purchases = select_user_items(user_id)
-    text = build_menu_text(call.from_user, user.balance, purchases, user.purchase_streak, user_lang)
+    text = build_menu_text(call.from_user, user.balance, user.purchases, user.purchase_streak, user_lang)
     await bot.edit_message_text(text,
                                 chat_id=call.message.chat.id,
                                 message_id=call.message.message_id,
@@ -819,21 +895,32 @@ async def close_callback_handler(call: CallbackQuery):
                              message_id=call.message.message_id)
 
 
-async def price_list_callback_handler(call: CallbackQuery):
-    bot, user_id = await get_bot_user_ids(call)
-    TgConfig.STATE[user_id] = None
+def build_price_list(user_id: int) -> str:
+    """Return the price list text for all categories."""
+    layout = [
+        (category, [(sub, get_all_items(sub)) for sub in get_subcategories(category)], get_all_items(category))
+        for category in get_all_categories()
+    ]
+    infos = get_items_info(
+        [item for _, subs, items in layout for item in items + [i for _, sub_items in subs for i in sub_items]],
+        user_id,
+    )
     lines = ['📋 Price list']
-    for category in get_all_categories():
+    for category, subs, items in layout:
         lines.append(f"\n<b>{category}</b>")
-        for sub in get_subcategories(category):
+        for sub, sub_items in subs:
             lines.append(f"  {sub}")
-            for item in get_all_items(sub):
-                info = get_item_info(item, user_id)
-                lines.append(f"    • {display_name(item)} ({info['price']:.2f}€)")
-        for item in get_all_items(category):
-            info = get_item_info(item, user_id)
-            lines.append(f"  • {display_name(item)} ({info['price']:.2f}€)")
-    text = '\n'.join(lines)
+            for item in sub_items:
+                lines.append(f"    • {display_name(item)} ({infos[item]['price']:.2f}€)")
+        for item in items:
+            lines.append(f"  • {display_name(item)} ({infos[item]['price']:.2f}€)")
+    return '\n'.join(lines)
+
+
+async def price_list_callback_handler(call: CallbackQuery):
+    bot, user_id = await get_bot_user_ids(call)
+    TgConfig.STATE[user_id] = None
+    text = await run_sync(build_price_list, user_id)
     await call.answer()
     await bot.send_message(call.message.chat.id, text,
                            parse_mode='HTML', reply_markup=back('back_to_menu'))
@@ -1226,9 +1313,9 @@ async def coinflip_join_handler(call: CallbackQuery):
 async def shop_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    categories = get_all_categories()
-    lang = get_user_language(user_id) or 'en'
-    markup = categories_list(categories, lang, show_cart=True)
+    categories = await aio.get_all_categories()
+    lang = await aio.get_user_language(user_id) or 'en'
+    markup = await run_sync(categories_list, categories, lang, show_cart=True)
     await bot.edit_message_text(t(lang, 'shop_categories'),
                                 chat_id=call.message.chat.id,
                                 message_id=call.message.message_id,
@@ -1247,14 +1334,14 @@ async def render_category_view(
     lang: str,
     origin: dict,
 ) -> None:
-    subcategories = get_subcategories(category_name)
+    subcategories = await aio.get_subcategories(category_name)
     if subcategories:
-        markup = subcategories_list(subcategories, category_name, lang, show_cart=True)
-        text = build_subcategory_description(category_name, lang, user_id)
+        markup = await run_sync(subcategories_list, subcategories, category_name, lang, show_cart=True)
+        text = await run_sync(build_subcategory_description, category_name, lang, user_id)
     else:
-        goods = get_all_items(category_name)
-        parent = get_category_parent(category_name)
-        markup = goods_list(goods, category_name, lang, parent)
+        goods = await aio.get_all_items(category_name)
+        parent = await aio.get_category_parent(category_name)
+        markup = await run_sync(goods_list, goods, category_name, lang, parent)
         text = t(lang, 'select_product')
 
     chat_id = origin.get('chat_id')
@@ -1283,14 +1370,14 @@ async def items_list_callback_handler(call: CallbackQuery):
     category_name = call.data[9:]
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    lang = get_user_language(user_id) or 'en'
+    lang = await aio.get_user_language(user_id) or 'en'
     origin = {
         'chat_id': call.message.chat.id,
         'message_id': call.message.message_id,
         'has_media': bool(call.message.photo or call.message.video),
     }
-    if is_category_locked(category_name):
-        title = get_category_title(category_name)
+    if await aio.is_category_locked(category_name):
+        title = await aio.get_category_title(category_name)
         state = {
             'mode': 'category_password_prompt',
             'category': category_name,
@@ -1326,25 +1413,25 @@ async def category_password_input_handler(message: Message):
         await message.delete()
     if not password:
         warning = await message.answer(t(lang, 'passwords_invalid'))
-        schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
+        await schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
         return
     record = get_user_category_password(user_id, category)
     acknowledged = False
     if record:
         if record.password != password:
             warning = await message.answer(t(lang, 'passwords_invalid'))
-            schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
+            await schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
             return
         acknowledged = bool(getattr(record, 'acknowledged', False))
     else:
         generated = get_generated_password(password, user_id)
         if not generated:
             warning = await message.answer(t(lang, 'passwords_invalid'))
-            schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
+            await schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
             return
         if generated.used_for_category and generated.used_for_category != category:
             warning = await message.answer(t(lang, 'passwords_invalid'))
-            schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
+            await schedule_message_deletion(bot, warning.chat.id, warning.message_id, delay=8)
             return
         entry = upsert_user_category_password(
             user_id,
@@ -1360,7 +1447,7 @@ async def category_password_input_handler(message: Message):
         ):
             mark_generated_password_used(generated.id, user_id, category)
     title = get_category_title(category)
-    schedule_message_deletion(bot, prompt_chat_id, prompt_message_id)
+    await schedule_message_deletion(bot, prompt_chat_id, prompt_message_id)
     if acknowledged:
         TgConfig.STATE[user_id] = None
         await render_category_view(bot, user_id, category, lang, origin)
@@ -1438,11 +1525,11 @@ async def category_password_change_message_handler(message: Message):
     new_password = (message.text or '').strip()
     if not new_password:
         warning = await message.answer(t(lang, 'passwords_change_empty'))
-        schedule_message_deletion(message.bot, warning.chat.id, warning.message_id, delay=8)
+        await schedule_message_deletion(message.bot, warning.chat.id, warning.message_id, delay=8)
         return
     if len(new_password) > 64:
         warning = await message.answer(t(lang, 'passwords_change_too_long'))
-        schedule_message_deletion(message.bot, warning.chat.id, warning.message_id, delay=8)
+        await schedule_message_deletion(message.bot, warning.chat.id, warning.message_id, delay=8)
         return
     upsert_user_category_password(
         user_id,
@@ -1456,7 +1543,7 @@ async def category_password_change_message_handler(message: Message):
         await message.delete()
     change_prompt_chat_id = state.get('change_prompt_chat_id')
     change_prompt_message_id = state.get('change_prompt_message_id')
-    schedule_message_deletion(message.bot, change_prompt_chat_id, change_prompt_message_id)
+    await schedule_message_deletion(message.bot, change_prompt_chat_id, change_prompt_message_id)
     sent = await message.answer(
         t(lang, 'passwords_change_done', category=title, password=new_password),
         reply_markup=category_password_continue_keyboard(category, lang),
@@ -1497,9 +1584,9 @@ async def item_info_callback_handler(call: CallbackQuery):
     item_name = call.data[5:]
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    item_info_list = get_item_info(item_name, user_id)
+    item_info_list = await aio.get_item_info(item_name, user_id)
     category = item_info_list['category_name']
-    lang = get_user_language(user_id) or 'en'
+    lang = await aio.get_user_language(user_id) or 'en'
     price = item_info_list["price"]
     markup = item_info(item_name, category, lang)
     caption = (
@@ -1547,9 +1634,9 @@ async def update_cart_view(
     mode: str = 'overview',
 ) -> None:
     if mode == 'manage':
-        text, markup = build_cart_manage_view(user_id, lang)
+        text, markup = await run_sync(build_cart_manage_view, user_id, lang)
     else:
-        text, markup = build_cart_summary(user_id, lang)
+        text, markup = await run_sync(build_cart_summary, user_id, lang)
 
     TgConfig.STATE[f'{user_id}_cart_view'] = mode
 
@@ -1572,7 +1659,7 @@ async def update_cart_view(
 
 async def view_cart_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    lang = get_user_language(user_id) or 'en'
+    lang = await aio.get_user_language(user_id) or 'en'
     await sync_cart_with_stock(bot, user_id, lang)
     await update_cart_view(bot, call.message.chat.id, call.message.message_id, user_id, lang)
     await call.answer()
@@ -1580,7 +1667,7 @@ async def view_cart_callback_handler(call: CallbackQuery):
 
 async def cart_manage_view_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    lang = get_user_language(user_id) or 'en'
+    lang = await aio.get_user_language(user_id) or 'en'
     await sync_cart_with_stock(bot, user_id, lang)
     await update_cart_view(
         bot,
@@ -1596,19 +1683,19 @@ async def cart_manage_view_handler(call: CallbackQuery):
 async def add_to_cart_callback_handler(call: CallbackQuery):
     item_name = call.data[len('cart_add_'):]
     bot, user_id = await get_bot_user_ids(call)
-    info = get_item_info(item_name, user_id)
-    lang = get_user_language(user_id) or 'en'
+    info = await aio.get_item_info(item_name, user_id)
+    lang = await aio.get_user_language(user_id) or 'en'
     if not info:
         await call.answer(t(lang, 'cart_item_missing'), show_alert=True)
         return
-    add_item_to_cart(user_id, item_name)
+    await aio.add_item_to_cart(user_id, item_name)
     await call.answer(t(lang, 'cart_added', item=display_name(item_name)))
 
 
 async def clear_cart_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    lang = get_user_language(user_id) or 'en'
-    clear_cart(user_id)
+    lang = await aio.get_user_language(user_id) or 'en'
+    await aio.clear_cart(user_id)
     TgConfig.CART_PROMOS.pop(user_id, None)
     await call.answer(t(lang, 'cart_cleared'))
     mode = TgConfig.STATE.get(f'{user_id}_cart_view', 'overview')
@@ -1618,8 +1705,8 @@ async def clear_cart_callback_handler(call: CallbackQuery):
 async def remove_cart_item_callback_handler(call: CallbackQuery):
     item_name = call.data[len('cart_remove_'):]
     bot, user_id = await get_bot_user_ids(call)
-    lang = get_user_language(user_id) or 'en'
-    remove_cart_item(user_id, item_name)
+    lang = await aio.get_user_language(user_id) or 'en'
+    await aio.remove_cart_item(user_id, item_name)
     await call.answer(t(lang, 'cart_removed', item=display_name(item_name)))
     mode = TgConfig.STATE.get(f'{user_id}_cart_view', 'overview')
     await update_cart_view(bot, call.message.chat.id, call.message.message_id, user_id, lang, mode=mode)
@@ -1627,8 +1714,8 @@ async def remove_cart_item_callback_handler(call: CallbackQuery):
 
 async def cart_apply_promo_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    lang = get_user_language(user_id) or 'en'
-    state = compute_cart_state(user_id)
+    lang = await aio.get_user_language(user_id) or 'en'
+    state = await run_sync(compute_cart_state, user_id)
     if not state['items']:
         await call.answer(t(lang, 'cart_empty'), show_alert=True)
         return
@@ -1662,9 +1749,9 @@ async def cart_remove_promo_handler(call: CallbackQuery):
 
 async def cart_checkout_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    lang = get_user_language(user_id) or 'en'
+    lang = await aio.get_user_language(user_id) or 'en'
     await sync_cart_with_stock(bot, user_id, lang)
-    state = compute_cart_state(user_id)
+    state = await run_sync(compute_cart_state, user_id)
     if not state['items']:
         await call.answer(t(lang, 'cart_empty'), show_alert=True)
         await update_cart_view(bot, call.message.chat.id, call.message.message_id, user_id, lang)
@@ -1708,7 +1795,7 @@ async def cart_checkout_handler(call: CallbackQuery):
 
 async def cart_checkout_cancel(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    lang = get_user_language(user_id) or 'en'
+    lang = await aio.get_user_language(user_id) or 'en'
     message_id = TgConfig.STATE.get(f'{user_id}_cart_message')
     _clear_cart_checkout_state(user_id)
     TgConfig.STATE[user_id] = None
@@ -1721,7 +1808,7 @@ async def cart_payment_choice_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     if TgConfig.STATE.get(user_id) != 'cart_checkout_select_payment':
         return
-    lang = get_user_language(user_id) or 'en'
+    lang = await aio.get_user_language(user_id) or 'en'
     plan = TgConfig.STATE.get(f'{user_id}_cart_plan')
     if not plan or not plan.get('items'):
         TgConfig.STATE[user_id] = None
@@ -1730,17 +1817,23 @@ async def cart_payment_choice_handler(call: CallbackQuery):
         await update_cart_view(bot, call.message.chat.id, call.message.message_id, user_id, lang)
         return
     currency = call.data[len('cartpay_'):]
+    minimum = minimum_amount(currency)
+    if minimum:
+        balance = _to_decimal(await aio.get_user_balance(user_id) or 0)
+        due = _to_decimal(plan['total']) - balance
+        if Decimal('0') < due < Decimal(str(minimum)):
+            await call.answer(t(lang, 'payment_below_minimum', currency=currency, minimum=f'{minimum:.2f}'),
+                              show_alert=True)
+            return
     reserved_units: list[dict] = []
     try:
         for entry in plan['items']:
             item_name = entry['item_name']
             for amount_str in entry['unit_amounts']:
                 amount = _money(_to_decimal(amount_str))
-                value_data = get_item_value(item_name)
+                value_data = await aio.claim_item_value(item_name)
                 if not value_data:
                     raise RuntimeError('out_of_stock')
-                if not value_data['is_infinity']:
-                    buy_item(value_data['id'], value_data['is_infinity'])
                 reserved_units.append({
                     'item_name': item_name,
                     'value': value_data,
@@ -1760,7 +1853,7 @@ async def cart_payment_choice_handler(call: CallbackQuery):
         add_reservation(unit['item_name'], expires_ts)
 
     plan_total = _money(_to_decimal(plan['total']))
-    balance_available = _money(_to_decimal(get_user_balance(user_id) or 0))
+    balance_available = _money(_to_decimal(await aio.get_user_balance(user_id) or 0))
     balance_deduct = min(plan_total, balance_available)
     amount_due = _money(plan_total - balance_deduct)
 
@@ -1768,7 +1861,7 @@ async def cart_payment_choice_handler(call: CallbackQuery):
 
     if amount_due <= Decimal('0'):
         formatted_time = (datetime.datetime.utcnow() + datetime.timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S')
-        referral_id = get_user_referral(user_id)
+        referral_id = await aio.get_user_referral(user_id)
         purchase_data = {
             'type': 'cart',
             'reserved': reserved_units,
@@ -1797,11 +1890,17 @@ async def cart_payment_choice_handler(call: CallbackQuery):
         return
 
     amount_total = amount_due
-    payment_id, address, pay_amount = create_payment(float(amount_total), currency)
-    sleep_time = int(TgConfig.PAYMENT_TIME)
-    expires_at = (
-        datetime.datetime.now() + datetime.timedelta(seconds=sleep_time)
-    ).strftime('%H:%M')
+    try:
+        payment_id, address, pay_amount = await create_payment(float(amount_total), currency)
+    except NowPaymentsError as e:
+        logger.error(f"Creating cart invoice for {user_id} failed: {e}")
+        await _restore_reserved_units(bot, reserved_units)
+        TgConfig.STATE[user_id] = None
+        _clear_cart_checkout_state(user_id)
+        await call.answer(t(lang, 'payment_provider_unavailable'), show_alert=True)
+        await update_cart_view(bot, call.message.chat.id, call.message.message_id, user_id, lang)
+        return
+    expires_at = datetime.datetime.fromtimestamp(expires_ts).strftime('%H:%M')
     markup = crypto_invoice_menu(payment_id, lang)
     invoice_text = t(
         lang,
@@ -1811,7 +1910,7 @@ async def cart_payment_choice_handler(call: CallbackQuery):
         address=address,
         expires_at=expires_at,
     )
-    summary_text, _ = build_cart_summary(user_id, lang)
+    summary_text, _ = await run_sync(build_cart_summary, user_id, lang)
     extra_lines = []
     if balance_deduct > Decimal('0'):
         extra_lines.append(
@@ -1838,7 +1937,6 @@ async def cart_payment_choice_handler(call: CallbackQuery):
         reply_markup=markup,
     )
 
-    start_operation(user_id, float(amount_total), payment_id, sent.message_id)
     purchase_payload = {
         'type': 'cart',
         'user_id': user_id,
@@ -1850,29 +1948,14 @@ async def cart_payment_choice_handler(call: CallbackQuery):
         'invoice_message_id': sent.message_id,
         'cart_message_id': cart_message_id,
     }
+    await aio.start_operation(user_id, float(amount_total), payment_id, sent.message_id, provider='nowpayments',
+                              expires_at=datetime.datetime.fromtimestamp(expires_ts), payload=purchase_payload)
     TgConfig.STATE[f'purchase_{payment_id}'] = purchase_payload
     TgConfig.STATE[f'{user_id}_cart_invoice'] = payment_id
     TgConfig.STATE.pop(f'{user_id}_cart_plan', None)
     TgConfig.STATE[user_id] = None
     await call.answer()
 
-    await asyncio.sleep(sleep_time)
-    info = get_unfinished_operation(payment_id)
-    if info:
-        try:
-            status = await check_payment(payment_id)
-        except Exception:
-            status = None
-        if status not in ('finished', 'confirmed', 'sending'):
-            await _expire_purchase(
-                bot,
-                payment_id,
-                info,
-                lang,
-                purchase_payload,
-                reserved_units,
-            )
-
 
 async def _complete_cart_checkout(
     bot,
@@ -1897,7 +1980,7 @@ async def _complete_cart_checkout(
     _clear_cart_checkout_state(user_id)
     cart_message_id = purchase_data.get('cart_message_id')
     TgConfig.CART_PROMOS.pop(user_id, None)
-    purchases_count = select_user_items(user_id)
+    purchases_count = await aio.select_user_items(user_id)
     if call:
         actor_username = (
             f'@{call.from_user.username}'
@@ -1918,8 +2001,26 @@ async def _complete_cart_checkout(
     username = actor_username
     delivered_units: list[str] = []
     lottery_awards = 0
+    sale_time = (datetime.datetime.utcnow() + datetime.timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S")
+    # debits, sales, referral credits and the streak for the whole cart commit together
+    settlement = await aio.settle_cart_purchase(
+        user_id, reserved_units, sale_time,
+        referral_id=referral_id, referral_percent=TgConfig.REFERRAL_PERCENT,
+    )
+    if settlement['referral_rewards']:
+        ref_lang = await aio.get_user_language(referral_id) or 'en'
+        for _, reward in settlement['referral_rewards']:
+            await bot.send_message(
+                referral_id,
+                t(ref_lang, 'referral_reward', amount=f'{reward:.2f}', user=actor_first_name),
+                reply_markup=close(),
+            )
+
     total_charged = Decimal('0')
-    new_balance = float(get_user_balance(user_id) or 0)
+    cart_total = sum((unit.get('amount', Decimal('0')) for unit in reserved_units if unit.get('value')),
+                     Decimal('0'))
+    balance_before = float(settlement['balance'] or 0) + float(cart_total)
+    new_balance = float(settlement['balance'] or 0)
 
     for unit in reserved_units:
         value_data = unit.get('value')
@@ -1928,21 +2029,7 @@ async def _complete_cart_checkout(
             continue
         total_charged += amount
         price_float = float(amount)
-        current_time = datetime.datetime.utcnow() + datetime.timedelta(hours=3)
-        sale_time = current_time.strftime("%Y-%m-%d %H:%M:%S")
-
-        new_balance = buy_item_for_balance(user_id, price_float)
-        add_bought_item(value_data['item_name'], value_data['value'], price_float, user_id, sale_time)
-
-        if referral_id and TgConfig.REFERRAL_PERCENT and can_get_referral_reward(value_data['item_name']):
-            reward = round(price_float * TgConfig.REFERRAL_PERCENT / 100, 2)
-            update_balance(referral_id, reward)
-            ref_lang = get_user_language(referral_id) or 'en'
-            await bot.send_message(
-                referral_id,
-                t(ref_lang, 'referral_reward', amount=f'{reward:.2f}', user=actor_first_name),
-                reply_markup=close(),
-            )
+        new_balance = balance_before - float(total_charged)
 
         purchases_count += 1
         level_before, _, _ = get_level_info(purchases_count - 1, lang)
@@ -1950,8 +2037,8 @@ async def _complete_cart_checkout(
         if level_after != level_before:
             await bot.send_message(user_id, t(lang, 'level_up', level=level_after))
 
-        item_info = get_item_info(value_data['item_name'], user_id)
-        parent_cat = get_category_parent(item_info['category_name']) if item_info else None
+        item_info = await aio.get_item_info(value_data['item_name'], user_id)
+        parent_cat = await aio.get_category_parent(item_info['category_name']) if item_info else None
 
         attachments, photo_desc = load_media_bundle(value_data['value'])
         file_path = None
@@ -1982,8 +2069,7 @@ async def _complete_cart_checkout(
             photo_desc = value_data['value']
 
         lottery_awards += 1
-        process_purchase_streak(user_id)
-        asyncio.create_task(schedule_feedback(bot, user_id, lang, value_data['item_name']))
+        await schedule_feedback(user_id, lang, value_data['item_name'])
 
         try:
             await notify_owner_of_purchase(
@@ -2002,9 +2088,8 @@ async def _complete_cart_checkout(
 
         delivered_units.append(value_data['item_name'])
 
-        if not has_user_achievement(user_id, 'first_purchase'):
-            grant_achievement(user_id, 'first_purchase', formatted_time)
-            await bot.send_message(user_id, t(lang, 'achievement_unlocked', name=t(lang, 'achievement_first_purchase')))
+    if 'first_purchase' in settlement['achievements']:
+        await bot.send_message(user_id, t(lang, 'achievement_unlocked', name=t(lang, 'achievement_first_purchase')))
 
     if invoice_message_id:
         target_chat = call.message.chat.id if call else user_id
@@ -2012,10 +2097,9 @@ async def _complete_cart_checkout(
             await bot.delete_message(target_chat, invoice_message_id)
 
     if lottery_awards:
-        update_lottery_tickets(user_id, lottery_awards)
         await bot.send_message(user_id, t(lang, 'cart_lottery_awarded', count=lottery_awards))
 
-    clear_cart(user_id)
+    await aio.clear_cart(user_id)
     await update_cart_view(bot, user_id, cart_message_id, user_id, lang)
 
     summary_key = 'cart_checkout_success_balance' if balance_deduct > Decimal('0') else 'cart_checkout_success'
@@ -2219,35 +2303,31 @@ async def buy_item_callback_handler(call: CallbackQuery):
     item_name = call.data[4:]
     bot, user_id = await get_bot_user_ids(call)
     msg = call.message.message_id
-    item_info_list = get_item_info(item_name, user_id)
+    item_info_list = await aio.get_item_info(item_name, user_id)
     item_price = TgConfig.STATE.get(f'{user_id}_price', item_info_list["price"])
-    user_balance = get_user_balance(user_id)
-    lang = get_user_language(user_id) or 'en'
-    purchases_before = select_user_items(user_id)
+    user_balance = await aio.get_user_balance(user_id)
+    lang = await aio.get_user_language(user_id) or 'en'
+    purchases_before = await aio.select_user_items(user_id)
     gift_to = TgConfig.STATE.get(f'{user_id}_gift_to')
     gift_name = TgConfig.STATE.get(f'{user_id}_gift_name')
 
     if user_balance >= item_price:
-        value_data = get_item_value(item_name)
-
-        if value_data:
-            # remove from stock immediately
-            buy_item(value_data['id'], value_data['is_infinity'])
-
-            current_time = datetime.datetime.utcnow() + datetime.timedelta(hours=3)
-            formatted_time = current_time.strftime("%Y-%m-%d %H:%M:%S")
-            new_balance = buy_item_for_balance(user_id, item_price)
-            if gift_to:
-                add_bought_item(value_data['item_name'], value_data['value'], item_price, gift_to, formatted_time)
-                add_bought_item(value_data['item_name'], f'Gifted to @{gift_name}', item_price, user_id, formatted_time)
-            else:
-                add_bought_item(value_data['item_name'], value_data['value'], item_price, user_id, formatted_time)
+        current_time = datetime.datetime.utcnow() + datetime.timedelta(hours=3)
+        formatted_time = current_time.strftime("%Y-%m-%d %H:%M:%S")
+        referral_id = await aio.get_user_referral(user_id)
+        # stock claim, debit, sale, referral credit and streak commit together
+        purchase = await aio.purchase_with_balance(
+            user_id, item_name, item_price, formatted_time,
+            gift_to=gift_to, gift_name=gift_name,
+            referral_id=referral_id, referral_percent=TgConfig.REFERRAL_PERCENT,
+        )
 
-            referral_id = get_user_referral(user_id)
-            if referral_id and TgConfig.REFERRAL_PERCENT and can_get_referral_reward(value_data['item_name']):
-                reward = round(item_price * TgConfig.REFERRAL_PERCENT / 100, 2)
-                update_balance(referral_id, reward)
-                ref_lang = get_user_language(referral_id) or 'en'
+        if purchase:
+            value_data = purchase['value']
+            new_balance = purchase['balance']
+            reward = purchase['referral_reward']
+            if reward is not None:
+                ref_lang = await aio.get_user_language(referral_id) or 'en'
                 await bot.send_message(
                     referral_id,
                     t(ref_lang, 'referral_reward', amount=f'{reward:.2f}', user=call.from_user.first_name),
@@ -2267,7 +2347,7 @@ async def buy_item_callback_handler(call: CallbackQuery):
                 if call.from_user.username
                 else call.from_user.full_name
             )
-            parent_cat = get_category_parent(item_info_list['category_name'])
+            parent_cat = await aio.get_category_parent(item_info_list['category_name'])
 
             photo_desc = ''
             file_path = None
@@ -2284,7 +2364,7 @@ async def buy_item_callback_handler(call: CallbackQuery):
                     if photo_desc:
                         caption += f'\n\n{photo_desc}'
                     if gift_to:
-                        recipient_lang = get_user_language(gift_to) or 'en'
+                        recipient_lang = await aio.get_user_language(gift_to) or 'en'
                         recipient_caption = t(recipient_lang, 'gift_received', item=value_data['item_name'], user=username)
                         if value_data['value'].endswith('.mp4'):
                             await bot.send_video(gift_to, media, caption=recipient_caption, parse_mode='HTML')
@@ -2332,7 +2412,7 @@ async def buy_item_callback_handler(call: CallbackQuery):
                     f'📦 Purchases: {purchases}\n\n{value_data["value"]}'
                 )
                 if gift_to:
-                    recipient_lang = get_user_language(gift_to) or 'en'
+                    recipient_lang = await aio.get_user_language(gift_to) or 'en'
                     await bot.send_message(gift_to, t(recipient_lang, 'gift_received', item=value_data['item_name'], user=username))
                 else:
                     await bot.edit_message_text(
@@ -2340,13 +2420,11 @@ async def buy_item_callback_handler(call: CallbackQuery):
                         message_id=msg,
                         text=text,
                         parse_mode='HTML',
-                        reply_markup=home_markup(get_user_language(user_id) or 'en')
+                        reply_markup=home_markup(lang)
                     )
                 photo_desc = value_data['value']
 
-            update_lottery_tickets(user_id, 1)
             await bot.send_message(user_id, t(lang, 'lottery_ticket_awarded'))
-            process_purchase_streak(user_id)
             reserve_msg_id = TgConfig.STATE.pop(f'{user_id}_reserve_msg', None)
             if reserve_msg_id:
                 try:
@@ -2355,9 +2433,7 @@ async def buy_item_callback_handler(call: CallbackQuery):
                     pass
             if gift_to:
                 await bot.send_message(user_id, t(lang, 'gift_sent', user=f'@{gift_name}'), reply_markup=back('profile'))
-                if not has_user_achievement(user_id, 'gift_sent'):
-                    ts = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    grant_achievement(user_id, 'gift_sent', ts)
+                if 'gift_sent' in purchase['achievements']:
                     await bot.send_message(user_id, t(lang, 'achievement_unlocked', name=t(lang, 'achievement_gift_sent')))
                     logger.info(f"User {user_id} unlocked achievement gift_sent")
             else:
@@ -2372,14 +2448,13 @@ async def buy_item_callback_handler(call: CallbackQuery):
                     pass
             TgConfig.STATE.pop(f'{user_id}_gift_to', None)
             TgConfig.STATE.pop(f'{user_id}_gift_name', None)
-            if not has_user_achievement(user_id, 'first_purchase'):
-                grant_achievement(user_id, 'first_purchase', formatted_time)
+            if 'first_purchase' in purchase['achievements']:
                 await bot.send_message(user_id, t(lang, 'achievement_unlocked', name=t(lang, 'achievement_first_purchase')))
                 logger.info(f"User {user_id} unlocked achievement first_purchase")
 
             recipient = gift_to or user_id
-            recipient_lang = get_user_language(recipient) or lang
-            asyncio.create_task(schedule_feedback(bot, recipient, recipient_lang, value_data['item_name']))
+            recipient_lang = await aio.get_user_language(recipient) or lang
+            await schedule_feedback(recipient, recipient_lang, value_data['item_name'])
 
             try:
                 await notify_owner_of_purchase(
@@ -2418,9 +2493,8 @@ async def buy_item_callback_handler(call: CallbackQuery):
         TgConfig.STATE.pop(f'{user_id}_gift_name', None)
         return
 
-    lang = get_user_language(user_id) or 'en'
     # Ensure the item is available before prompting for payment method.
-    if not get_item_value(item_name):
+    if not await aio.get_item_value(item_name):
         notice = _reservation_or_stock_notice(item_name, lang)
         await bot.edit_message_text(
             chat_id=call.message.chat.id,
@@ -2440,7 +2514,7 @@ async def buy_item_callback_handler(call: CallbackQuery):
         t(lang, 'need_top_up', missing=f'{missing:.2f}'),
         chat_id=call.message.chat.id,
         message_id=msg,
-        reply_markup=crypto_choice_purchase(item_name, lang),
+        reply_markup=crypto_choice_purchase(item_name, lang, missing),
     )
     if gift_to:
         TgConfig.STATE[f'{user_id}_gift_to'] = gift_to
@@ -2458,7 +2532,16 @@ async def purchase_crypto_payment(call: CallbackQuery):
     gift_to = TgConfig.STATE.pop(f'{user_id}_gift_to', None)
     gift_name = TgConfig.STATE.pop(f'{user_id}_gift_name', None)
     lang = get_user_language(user_id) or 'en'
-    sleep_time = int(TgConfig.PAYMENT_TIME)
+    payment_time = int(TgConfig.PAYMENT_TIME)
+
+    minimum = minimum_amount(currency)
+    if minimum and price is not None and price - deduct < minimum:
+        if gift_to:
+            TgConfig.STATE[f'{user_id}_gift_to'] = gift_to
+            TgConfig.STATE[f'{user_id}_gift_name'] = gift_name
+        await call.answer(t(lang, 'payment_below_minimum', currency=currency, minimum=f'{minimum:.2f}'),
+                          show_alert=True)
+        return
 
     pending = get_user_unfinished_operation(user_id)
     if pending:
@@ -2480,10 +2563,7 @@ async def purchase_crypto_payment(call: CallbackQuery):
             elif purchase_data.get('reserved'):
                 reserved = purchase_data['reserved']
                 if reserved and not reserved['is_infinity']:
-                    was_empty = (
-                        select_item_values_amount(purchase_data['item']) == 0
-                        and not check_value(purchase_data['item'])
-                    )
+                    was_empty = is_stock_empty(purchase_data['item'])
                     add_values_to_item(purchase_data['item'], reserved['value'], reserved['is_infinity'])
                     if was_empty:
                         await notify_restock(bot, purchase_data['item'])
@@ -2499,7 +2579,7 @@ async def purchase_crypto_payment(call: CallbackQuery):
                 pass
         await bot.send_message(user_id, t(lang, 'payment_cancelled'))
 
-    value_data = get_item_value(item_name)
+    value_data = claim_item_value(item_name)
     if not value_data:
         notice = _reservation_or_stock_notice(item_name, lang)
         await call.answer(notice, show_alert=True)
@@ -2521,18 +2601,23 @@ async def purchase_crypto_payment(call: CallbackQuery):
         TgConfig.STATE.pop(f'{user_id}_promo_applied', None)
         TgConfig.STATE.pop(f'{user_id}_deduct', None)
         return
-    if not value_data['is_infinity']:
-        buy_item(value_data['id'], value_data['is_infinity'])
     reserved = value_data
-    expires_ts = time.time() + sleep_time
+    expires_ts = time.time() + payment_time
     reserved['expires_at'] = expires_ts
     add_reservation(item_name, expires_ts)
 
     amount = price - deduct
-    payment_id, address, pay_amount = create_payment(float(amount), currency)
-    expires_at = (
-        datetime.datetime.now() + datetime.timedelta(seconds=sleep_time)
-    ).strftime('%H:%M')
+    try:
+        payment_id, address, pay_amount = await create_payment(float(amount), currency)
+    except NowPaymentsError as e:
+        logger.error(f"Creating invoice for {user_id} failed: {e}")
+        await _restore_reserved_units(bot, [{'item_name': item_name, 'value': reserved, 'expires_at': expires_ts}])
+        if gift_to:
+            TgConfig.STATE[f'{user_id}_gift_to'] = gift_to
+            TgConfig.STATE[f'{user_id}_gift_name'] = gift_name
+        await call.answer(t(lang, 'payment_provider_unavailable'), show_alert=True)
+        return
+    expires_at = datetime.datetime.fromtimestamp(expires_ts).strftime('%H:%M')
     markup = crypto_invoice_menu(payment_id, lang)
     text = t(
         lang,
@@ -2559,7 +2644,6 @@ async def purchase_crypto_payment(call: CallbackQuery):
     reserve_msg = await bot.send_message(user_id, t(lang, 'item_reserved'))
     TgConfig.STATE[f'{user_id}_reserve_msg'] = reserve_msg.message_id
 
-    start_operation(user_id, amount, payment_id, sent.message_id)
     purchase_payload = {
         'type': 'item',
         'item': item_name,
@@ -2570,25 +2654,11 @@ async def purchase_crypto_payment(call: CallbackQuery):
         'gift_to': gift_to,
         'gift_name': gift_name,
     }
+    start_operation(user_id, amount, payment_id, sent.message_id, provider='nowpayments',
+                    expires_at=datetime.datetime.fromtimestamp(expires_ts), payload=purchase_payload)
     TgConfig.STATE[f'purchase_{payment_id}'] = purchase_payload
     TgConfig.STATE[user_id] = None
 
-    await asyncio.sleep(sleep_time)
-    info = get_unfinished_operation(payment_id)
-    if info:
-        try:
-            status = await check_payment(payment_id)
-        except Exception:
-            status = None
-        if status not in ('finished', 'confirmed', 'sending'):
-            await _expire_purchase(
-                bot,
-                payment_id,
-                info,
-                lang,
-                purchase_payload,
-            )
- 
 
 async def cancel_purchase(call: CallbackQuery):
     """Cancel purchase before choosing a payment method."""
@@ -2615,35 +2685,40 @@ async def cancel_purchase(call: CallbackQuery):
 async def process_home_menu(call: CallbackQuery):
     await call.message.delete()
     bot, user_id = await get_bot_user_ids(call)
-    user = check_user(user_id)
-    lang = get_user_language(user_id) or 'en'
+    user = get_user_context(user_id)
+    lang = user.language or 'en'
     markup = main_menu(user.role_id, TgConfig.CHANNEL_URL, TgConfig.PRICE_LIST_URL, lang)
-    purchases = select_user_items(user_id)
-    text = build_menu_text(call.from_user, user.balance, purchases, user.purchase_streak, lang)
+    text = build_menu_text(call.from_user, user.balance, user.purchases, user.purchase_streak, lang)
     await bot.send_message(user_id, text, reply_markup=markup)
 
 async def bought_items_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     TgConfig.STATE[user_id] = None
-    bought_goods = select_bought_items(user_id)
-    goods = bought_items_list(user_id)
-    max_index = len(goods) // 10
-    if len(goods) % 10 == 0:
-        max_index -= 1
+    bought_goods = get_bought_items_page(user_id)
+    max_index = _bought_items_max_index(user_id)
     markup = user_items_list(bought_goods, 'user', 'profile', 'bought_items', 0, max_index)
     await bot.edit_message_text('Your items:', chat_id=call.message.chat.id,
                                 message_id=call.message.message_id, reply_markup=markup)
 
 
+def _bought_items_max_index(buyer_id: int) -> int:
+    return max(select_user_items(buyer_id) - 1, 0) // BOUGHT_ITEMS_PAGE_SIZE
+
+
 async def navigate_bought_items(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
-    goods = bought_items_list(user_id)
-    bought_goods = select_bought_items(user_id)
-    current_index = int(call.data.split('_')[1])
-    data = call.data.split('_')[2]
-    max_index = len(goods) // 10
-    if len(goods) % 10 == 0:
-        max_index -= 1
+    parts = call.data.split('_')
+    current_index = int(parts[1])
+    data = parts[2]
+    cursor = parts[3] if len(parts) > 3 else ''
+    if data == 'user':
+        buyer_id = user_id
+    elif check_role(user_id) & Permission.ADMINS_MANAGE:
+        buyer_id = int(data)
+    else:
+        await call.answer('Not enough permissions')
+        return
+    max_index = _bought_items_max_index(buyer_id)
     if 0 <= current_index <= max_index:
         if data == 'user':
             back_data = 'profile'
@@ -2651,6 +2726,12 @@ async def navigate_bought_items(call: CallbackQuery):
         else:
             back_data = f'check-user_{data}'
             pre_back = f'user-items_{data}'
+        if cursor.startswith('a'):
+            bought_goods = get_bought_items_page(buyer_id, after_id=int(cursor[1:]))
+        elif cursor.startswith('b'):
+            bought_goods = get_bought_items_page(buyer_id, before_id=int(cursor[1:]))
+        else:
+            bought_goods = get_bought_items_page(buyer_id, offset=current_index * BOUGHT_ITEMS_PAGE_SIZE)
         markup = user_items_list(bought_goods, data, back_data, pre_back, current_index, max_index)
         await bot.edit_message_text(message_id=call.message.message_id,
                                     chat_id=call.message.chat.id,
@@ -2706,10 +2787,10 @@ async def profile_callback_handler(call: CallbackQuery):
     bot, user_id = await get_bot_user_ids(call)
     user = call.from_user
     TgConfig.STATE[user_id] = None
-    user_info = check_user(user_id)
+    user_info = get_user_context(user_id)
     user_lang = user_info.language or 'en'
     balance = user_info.balance
-    tickets = get_user_tickets(user_id)
+    tickets = user_info.lottery_tickets
     operations = select_user_operations(user_id)
     overall_balance = 0
 
@@ -2718,9 +2799,8 @@ async def profile_callback_handler(call: CallbackQuery):
         for i in operations:
             overall_balance += i
 
-    items = select_user_items(user_id)
-    ref_count = check_user_referrals(user_id)
-    ref_total = sum_referral_operations(user_id)
+    items = user_info.purchases
+    ref_count, ref_total = get_referral_stats(user_id)
     ref_earnings = round(ref_total * TgConfig.REFERRAL_PERCENT / 100, 2)
     bot_username = await get_bot_info(call)
     encoded_id = base64.urlsafe_b64encode(str(user_id).encode()).decode().rstrip('=')
@@ -2879,7 +2959,7 @@ async def process_replenish_balance(message: Message):
         return
 
     TgConfig.STATE[f'{user_id}_amount'] = text
-    markup = crypto_choice()
+    markup = crypto_choice(float(text))
     await bot.edit_message_text(chat_id=message.chat.id,
                                 message_id=message_id,
                                 text=f'💵 Top-up amount: {text}€. Choose payment method:',
@@ -2895,24 +2975,17 @@ async def pay_yoomoney(call: CallbackQuery):
 
     fake = type('Fake', (), {'text': amount, 'from_user': call.from_user})
     label, url = quick_pay(fake)
-    sleep_time = int(TgConfig.PAYMENT_TIME)
+    payment_time = int(TgConfig.PAYMENT_TIME)
     lang = get_user_language(user_id) or 'en'
     markup = payment_menu(url, label, lang)
     await bot.edit_message_text(chat_id=call.message.chat.id,
                                 message_id=call.message.message_id,
                                 text=f'💵 Top-up amount: {amount}€.\n'
-                                     f'⌛️ You have {int(sleep_time / 60)} minutes to pay.\n'
+                                     f'⌛️ You have {int(payment_time / 60)} minutes to pay.\n'
                                      f'<b>❗️ After payment press "Check payment"</b>',
                                 reply_markup=markup)
-    start_operation(user_id, amount, label, call.message.message_id)
-    await asyncio.sleep(sleep_time)
-    info = get_unfinished_operation(label)
-    if info:
-        _, _, _ = info
-        status = await check_payment_status(label)
-        if status not in ('paid', 'success'):
-            finish_operation(label)
-            await bot.send_message(user_id, t(lang, 'invoice_cancelled'))
+    start_operation(user_id, amount, label, call.message.message_id, provider='yoomoney',
+                    expires_at=datetime.datetime.now() + datetime.timedelta(seconds=payment_time))
 
 
 async def crypto_payment(call: CallbackQuery):
@@ -2923,13 +2996,23 @@ async def crypto_payment(call: CallbackQuery):
         await call.answer(text='❌ Invoice not found')
         return
 
-    payment_id, address, pay_amount = create_payment(float(amount), currency)
-
-    sleep_time = int(TgConfig.PAYMENT_TIME)
     lang = get_user_language(user_id) or 'en'
-    expires_at = (
-        datetime.datetime.now() + datetime.timedelta(seconds=sleep_time)
-    ).strftime('%H:%M')
+    minimum = minimum_amount(currency)
+    if minimum and float(amount) < minimum:
+        TgConfig.STATE[f'{user_id}_amount'] = amount
+        await call.answer(t(lang, 'payment_below_minimum', currency=currency, minimum=f'{minimum:.2f}'),
+                          show_alert=True)
+        return
+    try:
+        payment_id, address, pay_amount = await create_payment(float(amount), currency)
+    except NowPaymentsError as e:
+        logger.error(f"Creating top-up invoice for {user_id} failed: {e}")
+        TgConfig.STATE[f'{user_id}_amount'] = amount
+        await call.answer(t(lang, 'payment_provider_unavailable'), show_alert=True)
+        return
+
+    expires = datetime.datetime.now() + datetime.timedelta(seconds=int(TgConfig.PAYMENT_TIME))
+    expires_at = expires.strftime('%H:%M')
     markup = crypto_invoice_menu(payment_id, lang)
     text = t(
         lang,
@@ -2954,15 +3037,7 @@ async def crypto_payment(call: CallbackQuery):
         parse_mode='HTML',
         reply_markup=markup,
     )
-    start_operation(user_id, amount, payment_id, sent.message_id)
-    await asyncio.sleep(sleep_time)
-    info = get_unfinished_operation(payment_id)
-    if info:
-        _, _, _ = info
-        status = await check_payment(payment_id)
-        if status not in ('finished', 'confirmed', 'sending'):
-            finish_operation(payment_id)
-            await bot.send_message(user_id, t(lang, 'invoice_cancelled'))
+    start_operation(user_id, amount, payment_id, sent.message_id, provider='nowpayments', expires_at=expires)
 
 
 async def _complete_invoice_item_purchase(
@@ -3017,9 +3092,7 @@ async def _complete_invoice_item_purchase(
     if reserved:
         value_data = reserved
     else:
-        value_data = get_item_value(item_name)
-        if value_data:
-            buy_item(value_data['id'], value_data['is_infinity'])
+        value_data = claim_item_value(item_name)
 
     if not value_data:
         notice = _reservation_or_stock_notice(item_name, lang)
@@ -3126,7 +3199,7 @@ async def _complete_invoice_item_purchase(
 
     recipient = gift_to or user_id
     recipient_lang = get_user_language(recipient) or lang
-    asyncio.create_task(schedule_feedback(bot, recipient, recipient_lang, value_data['item_name']))
+    await schedule_feedback(recipient, recipient_lang, value_data['item_name'])
 
 
 async def checking_payment(call: CallbackQuery):
@@ -3142,7 +3215,12 @@ async def checking_payment(call: CallbackQuery):
     lang = get_user_language(user_id_db) or 'en'
     payment_status = await check_payment_status(label)
     if payment_status is None:
-        payment_status = await check_payment(label)
+        try:
+            payment_status = await check_payment(label)
+        except NowPaymentsError as e:
+            logger.warning(f"Checking payment {label} failed: {e}")
+            await call.answer(t(lang, 'payment_provider_unavailable'), show_alert=True)
+            return
     if payment_status not in ("success", "paid", "finished", "confirmed", "sending"):
         await call.answer(text='❌ Payment was not successful')
         return
@@ -3225,10 +3303,7 @@ async def cancel_payment(call: CallbackQuery):
                 reserved = purchase_data['reserved']
                 remove_reservation(purchase_data['item'], reserved.get('expires_at'))
                 if reserved and not reserved['is_infinity']:
-                    was_empty = (
-                        select_item_values_amount(purchase_data['item']) == 0
-                        and not check_value(purchase_data['item'])
-                    )
+                    was_empty = is_stock_empty(purchase_data['item'])
                     add_values_to_item(purchase_data['item'], reserved['value'], reserved['is_infinity'])
                     if was_empty:
                         await notify_restock(bot, purchase_data['item'])
@@ -3269,10 +3344,7 @@ async def check_sub_to_channel(call: CallbackQuery):
                 reserved = purchase_data['reserved']
                 remove_reservation(purchase_data['item'], reserved.get('expires_at'))
                 if reserved and not reserved['is_infinity']:
-                    was_empty = (
-                        select_item_values_amount(purchase_data['item']) == 0
-                        and not check_value(purchase_data['item'])
-                    )
+                    was_empty = is_stock_empty(purchase_data['item'])
                     add_values_to_item(purchase_data['item'], reserved['value'], reserved['is_infinity'])
                     if was_empty:
                         await notify_restock(bot, purchase_data['item'])
@@ -3345,6 +3417,8 @@ async def set_language(call: CallbackQuery):
 
 
 def register_user_handlers(dp: Dispatcher):
+    register_task_handler('feedback', _run_feedback_task)
+    register_task_handler('delete_message', _run_delete_message_task)
     dp.register_message_handler(start,
                                 commands=['start'])
     dp.register_message_handler(
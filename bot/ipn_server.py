@@ -28,6 +28,13 @@ from bot.handlers.user.main import (
 app = Flask(__name__)
 
 
+@app.teardown_appcontext
+def remove_db_session(exc=None):
+    # Each IPN request runs in its own worker thread; drop its session so
+    # connections go back to the pool and the identity map does not grow.
+    Database().remove_session()
+
+
 def verify_signature(data: bytes, signature: str | None) -> bool:
     if not EnvKeys.NOWPAYMENTS_IPN_SECRET:
         return True
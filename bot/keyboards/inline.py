@@ -2,7 +2,10 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from bot.database.models import Permission
 
 from bot.localization import t
-from bot.database.methods import get_category_parent, get_category_titles, select_item_values_amount
+from bot.database.methods import (
+    PURCHASE_DATES_PAGE_SIZE, PURCHASES_PAGE_SIZE, get_category_parent, get_category_titles, get_stock_levels,
+)
+from bot.misc.nowpayments import PAY_CURRENCIES, currency_available, estimate_payment
 from bot.utils import display_name
 
 
@@ -189,17 +192,19 @@ def notify_goods_list(list_items: list[str], category_name: str, lang: str) -> I
     return markup
 
 
-def user_items_list(list_items: list, data: str, back_data: str, pre_back: str, current_index: int, max_index: int)\
+def user_items_list(page_items: list, data: str, back_data: str, pre_back: str, current_index: int, max_index: int)\
         -> InlineKeyboardMarkup:
+    """Keyboard for one page of purchases; the arrows carry keyset cursors (``b<first id>``/``a<last id>``)."""
     markup = InlineKeyboardMarkup()
-    page_items = list_items[current_index * 10: (current_index + 1) * 10]
     for item in page_items:
         markup.add(InlineKeyboardButton(text=display_name(item.item_name), callback_data=f'bought-item:{item.id}:{pre_back}'))
-    if max_index > 0:
+    if max_index > 0 and page_items:
         buttons = [
-            InlineKeyboardButton(text='◀️', callback_data=f'bought-goods-page_{current_index - 1}_{data}'),
+            InlineKeyboardButton(text='◀️',
+                                 callback_data=f'bought-goods-page_{current_index - 1}_{data}_b{page_items[0].id}'),
             InlineKeyboardButton(text=f'{current_index + 1}/{max_index + 1}', callback_data='dummy_button'),
-            InlineKeyboardButton(text='▶️', callback_data=f'bought-goods-page_{current_index + 1}_{data}')
+            InlineKeyboardButton(text='▶️',
+                                 callback_data=f'bought-goods-page_{current_index + 1}_{data}_a{page_items[-1].id}')
         ]
         markup.row(*buttons)
     markup.add(InlineKeyboardButton('🔙 Go back', callback_data=back_data))
@@ -426,31 +431,48 @@ def user_management(admin_role: int, user_role: int, admin_manage: int, items: i
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
-def purchases_dates_list(dates: list[str]) -> InlineKeyboardMarkup:
+def _page_buttons(prefix: str, page: int, total: int, per_page: int) -> list[InlineKeyboardButton]:
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton('⬅️', callback_data=f'{prefix}_{page - 1}'))
+    if (page + 1) * per_page < total:
+        nav.append(InlineKeyboardButton('➡️', callback_data=f'{prefix}_{page + 1}'))
+    return nav
+
+
+def purchases_dates_list(dates: list[str], page: int = 0, total: int = 0,
+                         per_page: int = PURCHASE_DATES_PAGE_SIZE) -> InlineKeyboardMarkup:
     markup = InlineKeyboardMarkup()
     for d in dates:
         markup.add(InlineKeyboardButton(d, callback_data=f'purchases_date_{d}'))
+    nav = _page_buttons('pirkimai', page, total, per_page)
+    if nav:
+        markup.row(*nav)
     markup.add(InlineKeyboardButton('🔙 Grįžti atgal', callback_data='console'))
     return markup
 
 
-def purchases_list(purchases: list[dict], date: str) -> InlineKeyboardMarkup:
+def purchases_list(purchases: list[dict], date: str, page: int = 0, total: int = 0,
+                   per_page: int = PURCHASES_PAGE_SIZE) -> InlineKeyboardMarkup:
     markup = InlineKeyboardMarkup()
     for p in purchases:
         markup.add(
             InlineKeyboardButton(
                 f"{p['unique_id']} - {display_name(p['item_name'])}",
-                callback_data=f"purchase_{p['unique_id']}_{date}"
+                callback_data=f"purchase_{p['unique_id']}_{date}_{page}"
             )
         )
+    nav = _page_buttons(f'purchases_date_{date}', page, total, per_page)
+    if nav:
+        markup.row(*nav)
     markup.add(InlineKeyboardButton('🔙 Grįžti atgal', callback_data='pirkimai'))
     return markup
 
 
-def purchase_info_menu(purchase_id: int, date: str) -> InlineKeyboardMarkup:
+def purchase_info_menu(purchase_id: int, date: str, page: int = 0) -> InlineKeyboardMarkup:
     markup = InlineKeyboardMarkup()
     markup.add(InlineKeyboardButton('👁 Peržiūrėti failą', callback_data=f'view_purchase_{purchase_id}'))
-    markup.add(InlineKeyboardButton('🔙 Grįžti atgal', callback_data=f'purchases_date_{date}'))
+    markup.add(InlineKeyboardButton('🔙 Grįžti atgal', callback_data=f'purchases_date_{date}_{page}'))
     return markup
 
 
@@ -684,8 +706,9 @@ def stock_categories_list(list_items: list[str], parent: str | None, root_cb: st
 def stock_goods_list(list_items: list[str], category_name: str, root_cb: str = 'console') -> InlineKeyboardMarkup:
     """Show goods with stock counts for a category."""
     markup = InlineKeyboardMarkup()
+    levels = get_stock_levels(list_items)
     for name in list_items:
-        amount = select_item_values_amount(name)
+        amount = levels[name][0]
         markup.add(InlineKeyboardButton(
             text=f'{display_name(name)} ({amount})',
             callback_data=f'stock_item:{name}:{category_name}'
@@ -742,6 +765,16 @@ def check_sub(channel_username: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
+def statistics_menu() -> InlineKeyboardMarkup:
+    inline_keyboard = [
+        [InlineKeyboardButton('📅 Today', callback_data='statistics'),
+         InlineKeyboardButton('📅 7 days', callback_data='statistics_7'),
+         InlineKeyboardButton('📅 30 days', callback_data='statistics_30')],
+        [InlineKeyboardButton('🔙 Grįžti atgal', callback_data='shop_management')]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
 def back(callback: str) -> InlineKeyboardMarkup:
     inline_keyboard = [
         [InlineKeyboardButton('🔙 Grįžti atgal', callback_data=callback)]
@@ -777,32 +810,38 @@ def confirm_cancel(invoice_id: str, lang: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
-def crypto_choice() -> InlineKeyboardMarkup:
-    inline_keyboard = [
-        [InlineKeyboardButton('SOL', callback_data='crypto_SOL'),
-         InlineKeyboardButton('BTC', callback_data='crypto_BTC')],
-        [InlineKeyboardButton('TRX', callback_data='crypto_TRX'),
-         InlineKeyboardButton('TON', callback_data='crypto_TON')],
-        [InlineKeyboardButton('USDT (TRC20)', callback_data='crypto_USDTTRC20'),
-         InlineKeyboardButton('ETH', callback_data='crypto_ETH')],
-        [InlineKeyboardButton('LTC', callback_data='crypto_LTC')],
-        [InlineKeyboardButton('🔙 Go back', callback_data='replenish_balance')]
-    ]
+CRYPTO_LABELS = {'USDTTRC20': 'USDT (TRC20)'}
+
+
+def _format_estimate(amount: float) -> str:
+    """Fixed point to satoshi precision without trailing zeros: 0.0000105, not 1.05e-05."""
+    return f'{amount:.8f}'.rstrip('0').rstrip('.')
+
+
+def _crypto_rows(prefix: str, amount: float | None) -> list[list[InlineKeyboardButton]]:
+    """Two buttons per row for the offered currencies, with the cached estimate for ``amount``."""
+    buttons = []
+    for currency in PAY_CURRENCIES:
+        if not currency_available(currency):
+            continue
+        label = CRYPTO_LABELS.get(currency, currency)
+        estimate = estimate_payment(amount, currency) if amount else None
+        if estimate:
+            label = f'{label} ≈ {_format_estimate(estimate)}'
+        buttons.append(InlineKeyboardButton(label, callback_data=f'{prefix}_{currency}'))
+    return [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+
+
+def crypto_choice(amount: float | None = None) -> InlineKeyboardMarkup:
+    inline_keyboard = _crypto_rows('crypto', amount)
+    inline_keyboard.append([InlineKeyboardButton('🔙 Go back', callback_data='replenish_balance')])
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
-def crypto_choice_purchase(item_name: str, lang: str) -> InlineKeyboardMarkup:
+def crypto_choice_purchase(item_name: str, lang: str, amount: float | None = None) -> InlineKeyboardMarkup:
     """Return crypto choice markup for product purchase."""
-    inline_keyboard = [
-        [InlineKeyboardButton('SOL', callback_data='buycrypto_SOL'),
-         InlineKeyboardButton('BTC', callback_data='buycrypto_BTC')],
-        [InlineKeyboardButton('TRX', callback_data='buycrypto_TRX'),
-         InlineKeyboardButton('TON', callback_data='buycrypto_TON')],
-        [InlineKeyboardButton('USDT (TRC20)', callback_data='buycrypto_USDTTRC20'),
-         InlineKeyboardButton('ETH', callback_data='buycrypto_ETH')],
-        [InlineKeyboardButton('LTC', callback_data='buycrypto_LTC')],
-        [InlineKeyboardButton(t(lang, 'cancel'), callback_data='cancel_purchase')],
-    ]
+    inline_keyboard = _crypto_rows('buycrypto', amount)
+    inline_keyboard.append([InlineKeyboardButton(t(lang, 'cancel'), callback_data='cancel_purchase')])
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
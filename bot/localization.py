@@ -268,6 +268,8 @@ LANGUAGES = {
         'cart_checkout_success': '✅ Purchased {count} items for {total}€. Remaining balance: {balance}€.',
         'cart_checkout_success_balance': '✅ Purchased {count} items for {total}€. Balance used: {balance_used}€. Remaining balance: {balance}€.',
         'cart_checkout_failed': '❌ Checkout failed. Try again later.',
+        'payment_provider_unavailable': '❌ The payment service is not responding. Try again later.',
+        'payment_below_minimum': '❌ {currency} payments must be at least {minimum}€. Choose another currency.',
         'cart_checkout_partial': '⚠️ These items could not be purchased: {items}.',
         'cart_delivery_caption': '✅ {item}\n💰 Balance: {balance}€\n📦 Purchases: {purchases}',
         'cart_delivery_text': '✅ {item}\n💰 Balance: {balance}€\n📦 Purchases: {purchases}\n\n{value}',
@@ -590,6 +592,8 @@ LANGUAGES = {
         'cart_checkout_success': '✅ Куплено товаров: {count} на сумму {total}€. Остаток: {balance}€.',
         'cart_checkout_success_balance': '✅ Куплено товаров: {count} на сумму {total}€. Списано с баланса: {balance_used}€. Остаток: {balance}€.',
         'cart_checkout_failed': '❌ Не удалось оформить покупку. Попробуйте позже.',
+        'payment_provider_unavailable': '❌ Платёжный сервис не отвечает. Попробуйте позже.',
+        'payment_below_minimum': '❌ Минимальный платёж в {currency} — {minimum}€. Выберите другую валюту.',
         'cart_checkout_partial': '⚠️ Не удалось купить: {items}.',
         'cart_delivery_caption': '✅ {item}\n💰 Баланс: {balance}€\n📦 Покупок: {purchases}',
         'cart_delivery_text': '✅ {item}\n💰 Баланс: {balance}€\n📦 Покупок: {purchases}\n\n{value}',
@@ -910,6 +914,8 @@ LANGUAGES = {
         'cart_checkout_success': '✅ Įsigyta prekių: {count} už {total}€. Likutis: {balance}€.',
         'cart_checkout_success_balance': '✅ Įsigyta prekių: {count} už {total}€. Panaudota balanso: {balance_used}€. Likutis: {balance}€.',
         'cart_checkout_failed': '❌ Nepavyko atlikti apmokėjimo. Bandykite vėliau.',
+        'payment_provider_unavailable': '❌ Mokėjimų paslauga neatsako. Bandykite vėliau.',
+        'payment_below_minimum': '❌ Mažiausias {currency} mokėjimas — {minimum}€. Pasirinkite kitą valiutą.',
         'cart_checkout_partial': '⚠️ Nepavyko įsigyti: {items}.',
         'cart_delivery_caption': '✅ {item}\n💰 Likutis: {balance}€\n📦 Pirkinių: {purchases}',
         'cart_delivery_text': '✅ {item}\n💰 Likutis: {balance}€\n📦 Pirkinių: {purchases}\n\n{value}',
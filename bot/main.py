@@ -6,11 +6,18 @@ from aiogram import Bot, Dispatcher
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
 
 from bot.filters import register_all_filters
+from bot.middlewares import register_all_middlewares
 from bot.misc import EnvKeys
 from bot.handlers import register_all_handlers
+from bot.handlers.user.main import start_payment_sweeper
 from bot.database.models import register_models
+from bot.database.maintenance import start_maintenance
+from bot.utils.broadcast import resume_broadcasts
+from bot.utils.scheduler import start_scheduler
+from bot.utils.reservations import start_reservation_sweeper
+from bot.misc.nowpayments import close_session, start_rates_refresh
 from bot.database.methods import create_user, get_role_id_by_name
-from bot.database.methods.update import set_role
+from bot.database.methods.update import set_role, rebuild_stock_summary
 from bot.logger_mesh import logger, file_handler
 
 logger.addHandler(file_handler)
@@ -40,9 +47,17 @@ async def _ensure_owner_account(bot: Bot, owner_id: int) -> None:
 
 
 async def __on_start_up(dp: Dispatcher) -> None:
+    register_all_middlewares(dp)
     register_all_filters(dp)
     register_all_handlers(dp)
     register_models()
+    rebuild_stock_summary()
+    start_maintenance()
+    start_scheduler(dp.bot)
+    start_payment_sweeper(dp.bot)
+    start_rates_refresh()
+    start_reservation_sweeper()
+    await resume_broadcasts(dp.bot)
 
     try:
         owner_id = int(EnvKeys.OWNER_ID) if EnvKeys.OWNER_ID else None
@@ -62,7 +77,11 @@ async def __on_start_up(dp: Dispatcher) -> None:
         logger.warning("OWNER_ID is not set or invalid; cannot send startup ping.")
 
 
+async def __on_shutdown(dp: Dispatcher) -> None:
+    await close_session()
+
+
 def start_bot():
     bot = Bot(token=EnvKeys.TOKEN, parse_mode='HTML')
     dp = Dispatcher(bot, storage=MemoryStorage())
-    executor.start_polling(dp, skip_updates=True, on_startup=__on_start_up)
+    executor.start_polling(dp, skip_updates=True, on_startup=__on_start_up, on_shutdown=__on_shutdown)
@@ -0,0 +1,44 @@
+from aiogram import Dispatcher
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.types import Update
+
+from bot.database import open_session_scope, close_session_scope, run_sync
+from bot.database.user_context import bind_user_context, load_user_context, reset_user_context
+
+
+class DatabaseSessionMiddleware(BaseMiddleware):
+    """Open a database session for every update and close it once handled."""
+
+    async def on_pre_process_update(self, update: Update, data: dict):
+        data['_db_scope'] = open_session_scope()
+
+    async def on_post_process_update(self, update: Update, result, data: dict):
+        scope = data.pop('_db_scope', None)
+        if scope:
+            close_session_scope(*scope)
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """Load the sender's user context once so handlers can read it without queries."""
+
+    SOURCES = ('message', 'edited_message', 'callback_query', 'inline_query', 'chosen_inline_result',
+               'shipping_query', 'pre_checkout_query', 'my_chat_member', 'chat_member', 'chat_join_request')
+
+    async def on_pre_process_update(self, update: Update, data: dict):
+        for source in self.SOURCES:
+            event = getattr(update, source, None)
+            sender = getattr(event, 'from_user', None) if event else None
+            if sender:
+                context = await run_sync(load_user_context, sender.id)
+                data['_user_context'] = bind_user_context(context)
+                return
+
+    async def on_post_process_update(self, update: Update, result, data: dict):
+        token = data.pop('_user_context', None)
+        if token:
+            reset_user_context(token)
+
+
+def register_all_middlewares(dp: Dispatcher):
+    dp.middleware.setup(DatabaseSessionMiddleware())
+    dp.middleware.setup(UserContextMiddleware())
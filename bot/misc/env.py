@@ -20,4 +20,31 @@ class EnvKeys(ABC):
 
     NOWPAYMENTS_IPN_URL: Final = os.environ.get('NOWPAYMENTS_IPN_URL')
     NOWPAYMENTS_IPN_SECRET: Final = os.environ.get('NOWPAYMENTS_IPN_SECRET')
+    NOWPAYMENTS_TIMEOUT: Final = os.environ.get('NOWPAYMENTS_TIMEOUT', '10')  # s per attempt
+    NOWPAYMENTS_ATTEMPTS: Final = os.environ.get('NOWPAYMENTS_ATTEMPTS', '3')
+    NOWPAYMENTS_POOL_SIZE: Final = os.environ.get('NOWPAYMENTS_POOL_SIZE', '20')
+    NOWPAYMENTS_RATES_INTERVAL: Final = os.environ.get('NOWPAYMENTS_RATES_INTERVAL', '300')  # s between refreshes
 
+    DATABASE_URL: Final = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
+    DB_POOL_SIZE: Final = os.environ.get('DB_POOL_SIZE', '5')
+    DB_MAX_OVERFLOW: Final = os.environ.get('DB_MAX_OVERFLOW', '10')
+    DB_POOL_TIMEOUT: Final = os.environ.get('DB_POOL_TIMEOUT', '30')  # s
+    DB_POOL_RECYCLE: Final = os.environ.get('DB_POOL_RECYCLE', '1800')  # s
+    USER_CACHE_SIZE: Final = os.environ.get('USER_CACHE_SIZE', '10000')  # users per role/purchase cache
+    USER_CACHE_TTL: Final = os.environ.get('USER_CACHE_TTL', '600')  # s a cached role or count is trusted
+
+    SQLITE_JOURNAL_MODE: Final = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS: Final = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE: Final = os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE: Final = os.environ.get('SQLITE_CACHE_SIZE', '-65536')  # negative = KiB
+    SQLITE_TEMP_STORE: Final = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    SQLITE_BUSY_TIMEOUT: Final = os.environ.get('SQLITE_BUSY_TIMEOUT', '5000')  # ms
+    SQLITE_MAINTENANCE_INTERVAL: Final = os.environ.get('SQLITE_MAINTENANCE_INTERVAL', '300')  # s
+    DAILY_STATS_RECONCILE_INTERVAL: Final = os.environ.get('DAILY_STATS_RECONCILE_INTERVAL', '86400')  # s
+
+    BROADCAST_RATE: Final = os.environ.get('BROADCAST_RATE', '30')  # messages per second
+    BROADCAST_CHAT_INTERVAL: Final = os.environ.get('BROADCAST_CHAT_INTERVAL', '1')  # s between messages to one chat
+    BROADCAST_BATCH_SIZE: Final = os.environ.get('BROADCAST_BATCH_SIZE', '200')
+
+    PAYMENT_SWEEP_INTERVAL: Final = os.environ.get('PAYMENT_SWEEP_INTERVAL', '30')  # s between expiry sweeps
+    PAYMENT_SWEEP_BATCH_SIZE: Final = os.environ.get('PAYMENT_SWEEP_BATCH_SIZE', '100')
@@ -1,21 +1,137 @@
-import requests
+"""NOWPayments API client.
+
+Requests share one pooled aiohttp session, each attempt has a timeout and
+failed attempts are retried with jittered exponential backoff. After
+``BREAKER_THRESHOLD`` consecutive failed calls the circuit opens and calls
+fail at once for ``BREAKER_COOLDOWN`` seconds, so an unreachable API costs
+handlers no waiting.
+
+Available currencies, minimum amounts and EUR exchange estimates are kept
+in memory and refreshed in the background, so keyboards and amount checks
+read them without a remote call. The refresh runs its calls one at a time
+behind its own breaker, so an outage seen by the refresh never refuses a
+buyer's payment.
+"""
+import asyncio
+import random
+import time
 from typing import Tuple
 
+import aiohttp
+
 from .env import EnvKeys
+from bot.logger_mesh import logger
 
 API_BASE = "https://api.nowpayments.io/v1"
 API_KEY = EnvKeys.NOWPAYMENTS_API_KEY
 
 IPN_URL = EnvKeys.NOWPAYMENTS_IPN_URL
 
+TIMEOUT = aiohttp.ClientTimeout(total=float(EnvKeys.NOWPAYMENTS_TIMEOUT))
+ATTEMPTS = int(EnvKeys.NOWPAYMENTS_ATTEMPTS)
+BACKOFF = 0.5  # s before the first retry, doubled after each
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30  # s
 
+PAY_CURRENCIES = ('SOL', 'BTC', 'TRX', 'TON', 'USDTTRC20', 'ETH', 'LTC')
+RATES_INTERVAL = float(EnvKeys.NOWPAYMENTS_RATES_INTERVAL)
+RATES_TTL = 3 * RATES_INTERVAL  # s a cached value stays usable without a successful refresh
+ESTIMATE_BASE = 100  # EUR priced to derive a currency's rate
 
-def create_payment(amount_eur: float, pay_currency: str) -> Tuple[str, str, float]:
-    """Create a payment and return payment_id, pay_address and pay_amount."""
-    headers = {
-        "x-api-key": API_KEY,
-        "Content-Type": "application/json",
-    }
+
+class NowPaymentsError(Exception):
+    """The API could not be reached or answered with an error."""
+
+
+class CircuitOpenError(NowPaymentsError):
+    """Calls are refused while the API keeps failing."""
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; lets one trial call through after ``cooldown``."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self._failures < self.threshold:
+            return True
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            self._opened_at = time.monotonic()  # half-open: one trial per cooldown
+            return True
+        return False
+
+    def succeeded(self) -> None:
+        self._failures = 0
+
+    def failed(self) -> None:
+        self._failures += 1
+        if self._failures >= self.threshold:
+            self._opened_at = time.monotonic()
+
+
+_BREAKER = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+_REFRESH_BREAKER = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+_SESSION: aiohttp.ClientSession | None = None
+
+
+def _session() -> aiohttp.ClientSession:
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            headers={"x-api-key": API_KEY},
+            timeout=TIMEOUT,
+            connector=aiohttp.TCPConnector(limit=int(EnvKeys.NOWPAYMENTS_POOL_SIZE), ttl_dns_cache=300),
+        )
+    return _SESSION
+
+
+async def close_session() -> None:
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+
+
+async def _request(method: str, path: str, breaker: CircuitBreaker | None = None, **kwargs) -> dict | None:
+    """Return the decoded JSON answer, or None for 404; failures count against ``breaker``."""
+    breaker = breaker or _BREAKER
+    if not breaker.allow():
+        raise CircuitOpenError("NOWPayments circuit is open")
+    error: Exception | None = None
+    for attempt in range(ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        try:
+            async with _session().request(method, f"{API_BASE}{path}", **kwargs) as resp:
+                if resp.status == 404:
+                    breaker.succeeded()
+                    return None
+                if resp.status in RETRY_STATUSES:
+                    error = NowPaymentsError(f"{method} {path}: HTTP {resp.status}")
+                    continue
+                if resp.status >= 400:
+                    # The request itself is wrong; retrying will not help and the API is up.
+                    breaker.succeeded()
+                    raise NowPaymentsError(f"{method} {path}: HTTP {resp.status} {await resp.text()}")
+                data = await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+            continue
+        breaker.succeeded()
+        return data
+    breaker.failed()
+    raise NowPaymentsError(f"{method} {path} failed after {ATTEMPTS} attempts: {error!r}")
+
+
+async def create_payment(amount_eur: float, pay_currency: str) -> Tuple[str, str, float]:
+    """Create a payment and return payment_id, pay_address and pay_amount.
+
+    A retried attempt may leave an earlier invoice behind; it is never shown
+    to the buyer and simply expires unpaid.
+    """
     payload = {
         "price_amount": amount_eur,
         "price_currency": "eur",
@@ -25,18 +141,98 @@ def create_payment(amount_eur: float, pay_currency: str) -> Tuple[str, str, floa
     if IPN_URL:
         payload["ipn_callback_url"] = IPN_URL
 
-    resp = requests.post(f"{API_BASE}/payment", json=payload, headers=headers)
-    resp.raise_for_status()
-    data = resp.json()
+    data = await _request("POST", "/payment", json=payload)
+    if data is None:
+        raise NowPaymentsError("POST /payment: HTTP 404")
     return str(data["payment_id"]), data["pay_address"], float(data["pay_amount"])
 
 
-def check_payment(payment_id: str) -> str | None:
+async def check_payment(payment_id: str) -> str | None:
     """Return payment status string for given payment id."""
-    headers = {"x-api-key": API_KEY}
-    resp = requests.get(f"{API_BASE}/payment/{payment_id}", headers=headers)
-    if resp.status_code == 404:
-        return None
-    resp.raise_for_status()
-    data = resp.json()
-    return data.get("payment_status")
+    data = await _request("GET", f"/payment/{payment_id}")
+    return data.get("payment_status") if data else None
+
+
+class _Cached:
+    """A value and when it was fetched; stale ones read as None."""
+
+    def __init__(self):
+        self._values: dict[str, tuple[float, object]] = {}
+
+    def get(self, key: str):
+        entry = self._values.get(key)
+        if entry is None or time.monotonic() - entry[0] > RATES_TTL:
+            return None
+        return entry[1]
+
+    def set(self, key: str, value) -> None:
+        self._values[key] = (time.monotonic(), value)
+
+
+_CURRENCIES = _Cached()
+_MINIMUMS = _Cached()  # currency -> minimum payment in EUR
+_RATES = _Cached()  # currency -> units per EUR
+
+
+async def _fetch_currencies() -> None:
+    data = await _request("GET", "/currencies", breaker=_REFRESH_BREAKER)
+    if data:
+        _CURRENCIES.set("all", {code.upper() for code in data.get("currencies", [])})
+
+
+async def _fetch_minimum(currency: str) -> None:
+    code = currency.lower()
+    data = await _request("GET", "/min-amount", breaker=_REFRESH_BREAKER,
+                          params={"currency_from": code, "currency_to": code, "fiat_equivalent": "eur"})
+    if data and data.get("fiat_equivalent") is not None:
+        _MINIMUMS.set(currency, float(data["fiat_equivalent"]))
+
+
+async def _fetch_rate(currency: str) -> None:
+    data = await _request("GET", "/estimate", breaker=_REFRESH_BREAKER,
+                          params={"amount": ESTIMATE_BASE, "currency_from": "eur", "currency_to": currency.lower()})
+    if data and data.get("estimated_amount") is not None:
+        _RATES.set(currency, float(data["estimated_amount"]) / ESTIMATE_BASE)
+
+
+async def refresh_rates() -> None:
+    """Fetch the currency list, minimums and estimates for :data:`PAY_CURRENCIES`, one call at a time."""
+    calls = [(_fetch_currencies,)]
+    calls += [(fetch, currency) for currency in PAY_CURRENCIES for fetch in (_fetch_minimum, _fetch_rate)]
+    for fetch, *args in calls:
+        try:
+            await fetch(*args)
+        except CircuitOpenError:
+            logger.warning("Refreshing NOWPayments rates skipped: the API keeps failing")
+            return
+        except Exception as e:
+            logger.warning(f"Refreshing NOWPayments rates failed: {e}")
+
+
+async def rates_refresh_loop(interval: float | None = None) -> None:
+    """Refresh the cached currency data now and then periodically."""
+    interval = interval or RATES_INTERVAL
+    while True:
+        await refresh_rates()
+        await asyncio.sleep(interval)
+
+
+def start_rates_refresh() -> asyncio.Task:
+    return asyncio.create_task(rates_refresh_loop())
+
+
+def currency_available(currency: str) -> bool:
+    """False only when the cached currency list is known and lacks ``currency``."""
+    currencies = _CURRENCIES.get("all")
+    return currencies is None or currency.upper() in currencies
+
+
+def minimum_amount(currency: str) -> float | None:
+    """Smallest payment in EUR accepted for ``currency``, or None if not known."""
+    return _MINIMUMS.get(currency.upper())
+
+
+def estimate_payment(amount_eur: float, currency: str) -> float | None:
+    """Approximate ``currency`` amount for ``amount_eur``, or None if not known."""
+    rate = _RATES.get(currency.upper())
+    return amount_eur * rate if rate else None
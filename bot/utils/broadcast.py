@@ -0,0 +1,173 @@
+"""Background broadcasts.
+
+Every broadcast is a ``broadcast_jobs`` row. Its task streams recipients in
+id order, sends each batch concurrently under a process-wide rate limiter
+and stores the cursor and counters after the batch, so
+:func:`resume_broadcasts` continues running jobs after a restart. A batch
+cut short by a crash is sent again, so delivery is at least once.
+"""
+import asyncio
+import contextlib
+import time
+
+from aiogram import Bot
+from aiogram.utils.exceptions import (
+    BotBlocked, CantInitiateConversation, ChatNotFound, RetryAfter, TelegramAPIError, UserDeactivated,
+)
+
+from bot.database.methods import aio
+from bot.keyboards import back, close
+from bot.logger_mesh import logger
+from bot.misc import EnvKeys
+
+MAX_ATTEMPTS = 3
+REPORT_INTERVAL = 5  # s between progress edits of the admin's message
+UNREACHABLE = (BotBlocked, ChatNotFound, UserDeactivated, CantInitiateConversation)
+
+
+class RateLimiter:
+    """Token bucket of ``rate`` sends per second plus a minimum gap between sends to one chat."""
+
+    def __init__(self, rate: float, chat_interval: float):
+        self.rate = rate
+        self.chat_interval = chat_interval
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_sent: dict[int, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, chat_id: int) -> None:
+        while True:
+            # Only the bookkeeping holds the lock; waiting happens outside it
+            # so a sender stuck on one chat's gap does not stall the others.
+            async with self._lock:
+                now = time.monotonic()
+                wait = max(self._paused_until - now,
+                           self._last_sent.get(chat_id, 0.0) + self.chat_interval - now)
+                if wait <= 0:
+                    self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._remember(chat_id, now)
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def _remember(self, chat_id: int, now: float) -> None:
+        self._last_sent[chat_id] = now
+        if len(self._last_sent) > 10000:
+            self._last_sent = {
+                chat: sent for chat, sent in self._last_sent.items() if sent + self.chat_interval > now
+            }
+
+    def pause(self, seconds: float) -> None:
+        """Stop all sends for ``seconds``, as asked by a RetryAfter."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_LIMITER = RateLimiter(float(EnvKeys.BROADCAST_RATE), float(EnvKeys.BROADCAST_CHAT_INTERVAL))
+_TASKS: dict[int, asyncio.Task] = {}
+
+
+async def _deliver(bot: Bot, chat_id: int, text: str) -> str:
+    for _ in range(MAX_ATTEMPTS):
+        await _LIMITER.acquire(chat_id)
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, reply_markup=close())
+            return 'sent'
+        except RetryAfter as e:
+            _LIMITER.pause(e.timeout)
+        except UNREACHABLE:
+            return 'blocked'
+        except (TelegramAPIError, asyncio.TimeoutError) as e:
+            logger.warning(f"Broadcast to {chat_id} failed: {e!r}")
+            return 'failed'
+        except Exception as e:
+            # A network error or a bug must cost one recipient, not the whole job.
+            logger.exception(f"Broadcast to {chat_id} failed unexpectedly: {e!r}")
+            return 'failed'
+    return 'failed'
+
+
+def _progress_text(job: dict, counts: dict, finished: bool) -> str:
+    done = sum(counts.values())
+    title = 'Transliacija baigta' if finished else 'Transliacija vyksta'
+    return (
+        f'{title}: {done}/{job["total"]}\n'
+        f'✅ Išsiųsta: {counts["sent"]}\n'
+        f'🚫 Nepasiekiami: {counts["blocked"]}\n'
+        f'❌ Klaidos: {counts["failed"]}'
+    )
+
+
+async def _report(bot: Bot, job: dict, counts: dict, finished: bool = False) -> None:
+    if not job['status_message_id']:
+        return
+    await _LIMITER.acquire(job['admin_id'])
+    with contextlib.suppress(TelegramAPIError):
+        await bot.edit_message_text(chat_id=job['admin_id'],
+                                    message_id=job['status_message_id'],
+                                    text=_progress_text(job, counts, finished),
+                                    reply_markup=back('console'))
+
+
+async def _run(bot: Bot, job_id: int) -> None:
+    job = await aio.get_broadcast_job(job_id)
+    if not job or job['status'] != 'running':
+        return
+    counts = {'sent': job['sent'], 'blocked': job['blocked'], 'failed': job['failed']}
+    cursor = job['last_user_id']
+    batch_size = int(EnvKeys.BROADCAST_BATCH_SIZE)
+    reported = time.monotonic()
+    while True:
+        recipients = await aio.get_broadcast_recipients(cursor, batch_size)
+        if not recipients:
+            break
+        results = await asyncio.gather(*(_deliver(bot, chat_id, job['text']) for chat_id in recipients))
+        for result in results:
+            counts[result] += 1
+        cursor = recipients[-1]
+        await aio.save_broadcast_progress(job_id, cursor, **counts)
+        if time.monotonic() - reported >= REPORT_INTERVAL:
+            await _report(bot, job, counts)
+            reported = time.monotonic()
+    await aio.finish_broadcast_job(job_id)
+    await _report(bot, job, counts, finished=True)
+    logger.info(f"Broadcast #{job_id} by {job['admin_id']} finished: {counts['sent']} sent, "
+                f"{counts['blocked']} unreachable, {counts['failed']} failed")
+
+
+def _forget_task(job_id: int, task: asyncio.Task) -> None:
+    _TASKS.pop(job_id, None)
+    if task.cancelled():
+        return  # shutdown; the job stays 'running' and is resumed on the next start
+    if task.exception():
+        logger.error(f"Broadcast #{job_id} stopped: {task.exception()!r}")
+        # Hold the slot until the job is marked, so it cannot be started again meanwhile.
+        marker = asyncio.create_task(aio.finish_broadcast_job(job_id, 'failed'))
+        _TASKS[job_id] = marker
+        marker.add_done_callback(lambda t: _forget_marker(job_id, t))
+
+
+def _forget_marker(job_id: int, task: asyncio.Task) -> None:
+    _TASKS.pop(job_id, None)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Could not mark broadcast #{job_id} failed: {task.exception()!r}")
+
+
+def start_broadcast(bot: Bot, job_id: int) -> None:
+    """Deliver broadcast ``job_id`` in the background."""
+    if job_id in _TASKS:
+        return
+    task = asyncio.create_task(_run(bot, job_id))
+    _TASKS[job_id] = task
+    task.add_done_callback(lambda t: _forget_task(job_id, t))
+
+
+async def resume_broadcasts(bot: Bot) -> None:
+    """Restart the broadcasts that were still running when the bot stopped."""
+    for job_id in await aio.get_running_broadcast_jobs():
+        logger.info(f"Resuming broadcast #{job_id}")
+        start_broadcast(bot, job_id)
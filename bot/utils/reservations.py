@@ -1,62 +1,126 @@
+import asyncio
 import math
+import threading
 import time
 from collections import defaultdict
 from typing import DefaultDict, List
 
+from bot.database import Database, run_sync, session_scope
+from bot.database.methods.stock import adjust_stock
+from bot.logger_mesh import logger
+
 
 _RESERVED: DefaultDict[str, List[float]] = defaultdict(list)
+# Handlers and the sweep on the DB thread pool both touch _RESERVED; the lock
+# is reentrant because the public functions call _cleanup_and_commit.
+_LOCK = threading.RLock()
+
+SWEEP_INTERVAL = 60  # s between releases of expired reservations
+
+
+def _stage(item_name: str, delta: int) -> None:
+    # Staged on the current session; the public functions below commit it.
+    adjust_stock(Database().session, item_name, reserved=delta)
 
 
-def _cleanup(item_name: str | None = None) -> None:
+def _cleanup(item_name: str | None = None) -> bool:
+    """Drop expired entries and stage their release; returns True if any expired."""
     now = time.time()
     names = [item_name] if item_name else list(_RESERVED.keys())
+    changed = False
     for name in names:
-        entries = [ts for ts in _RESERVED.get(name, []) if ts > now]
+        current = _RESERVED.get(name, [])
+        entries = [ts for ts in current if ts > now]
+        if len(entries) != len(current):
+            _stage(name, len(entries) - len(current))
+            changed = True
         if entries:
             _RESERVED[name] = entries
         elif name in _RESERVED:
             _RESERVED.pop(name, None)
+    return changed
+
+
+def _cleanup_and_commit(item_name: str | None = None) -> None:
+    with _LOCK:
+        if _cleanup(item_name):
+            Database().session.commit()
 
 
 def add_reservation(item_name: str, expires_at: float) -> None:
-    _cleanup(item_name)
-    _RESERVED[item_name].append(expires_at)
+    with _LOCK:
+        _cleanup(item_name)
+        _RESERVED[item_name].append(expires_at)
+        _stage(item_name, 1)
+        Database().session.commit()
 
 
 def remove_reservation(item_name: str, expires_at: float | None = None) -> None:
-    if expires_at is None:
-        _RESERVED.pop(item_name, None)
-        return
-    entries = _RESERVED.get(item_name, [])
-    try:
-        entries.remove(expires_at)
-    except ValueError:
-        pass
-    if entries:
-        _RESERVED[item_name] = entries
-    else:
-        _RESERVED.pop(item_name, None)
+    with _LOCK:
+        if expires_at is None:
+            removed = _RESERVED.pop(item_name, None)
+            if removed:
+                _stage(item_name, -len(removed))
+                Database().session.commit()
+            return
+        entries = _RESERVED.get(item_name, [])
+        try:
+            entries.remove(expires_at)
+        except ValueError:
+            pass
+        else:
+            _stage(item_name, -1)
+            Database().session.commit()
+        if entries:
+            _RESERVED[item_name] = entries
+        else:
+            _RESERVED.pop(item_name, None)
 
 
 def has_active_reservation(item_name: str) -> bool:
-    _cleanup(item_name)
-    return bool(_RESERVED.get(item_name))
+    with _LOCK:
+        _cleanup_and_commit(item_name)
+        return bool(_RESERVED.get(item_name))
 
 
 def reservation_eta_minutes(item_name: str) -> int | None:
-    _cleanup(item_name)
-    entries = _RESERVED.get(item_name) or []
+    with _LOCK:
+        _cleanup_and_commit(item_name)
+        entries = list(_RESERVED.get(item_name) or [])
     if not entries:
         return None
     remaining = min(entries) - time.time()
     if remaining <= 0:
-        _cleanup(item_name)
+        _cleanup_and_commit(item_name)
         return None
     return max(1, int(math.ceil(remaining / 60)))
 
 
 def clear_all_reservations(item_name: str | None = None) -> None:
-    if item_name:
-        _RESERVED.pop(item_name, None)
-        return
-    _RESERVED.clear()
+    with _LOCK:
+        if item_name:
+            removed = _RESERVED.pop(item_name, None)
+            if removed:
+                _stage(item_name, -len(removed))
+                Database().session.commit()
+            return
+        for name, entries in list(_RESERVED.items()):
+            _stage(name, -len(entries))
+        _RESERVED.clear()
+        Database().session.commit()
+
+
+async def reservation_sweep_loop(interval: float = SWEEP_INTERVAL) -> None:
+    """Release abandoned reservations so their items stop showing as in stock."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # its own scope, so the sweep never shares a session with a handler
+            with session_scope():
+                await run_sync(_cleanup_and_commit)
+        except Exception as e:
+            logger.error(f"Releasing expired reservations failed: {e}")
+
+
+def start_reservation_sweeper() -> asyncio.Task:
+    return asyncio.create_task(reservation_sweep_loop())
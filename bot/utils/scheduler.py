@@ -0,0 +1,115 @@
+"""Durable delayed tasks.
+
+Tasks are ``scheduled_tasks`` rows. A single dispatcher loop keeps only the
+tasks due within ``HORIZON`` seconds in an in-memory heap, runs the handler
+registered for each task's kind when it falls due and then deletes the row.
+Later tasks wait in the database, so memory stays bounded however many are
+pending, and tasks scheduled before a restart still run after it. A task
+stays in ``_QUEUED`` until its row is gone, so a refill never runs it twice.
+"""
+import asyncio
+import contextlib
+import datetime
+import heapq
+import time
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+
+from bot.database.methods import aio
+from bot.logger_mesh import logger
+
+HORIZON = 600  # s of upcoming tasks held in memory
+DELETE_ATTEMPTS = 3
+DELETE_BACKOFF = 1  # s before the first retry of a failed delete, doubled after each
+
+TaskHandler = Callable[[Bot, dict], Awaitable[None]]
+
+_HANDLERS: dict[str, TaskHandler] = {}
+_HEAP: list[tuple[float, int, str, dict]] = []
+_QUEUED: set[int] = set()
+_RUNNING: set[asyncio.Task] = set()
+_WAKE: asyncio.Event | None = None
+
+
+def register_task_handler(kind: str, handler: TaskHandler) -> None:
+    """Run ``handler(bot, payload)`` for tasks of ``kind``."""
+    _HANDLERS[kind] = handler
+
+
+def _push(task_id: int, kind: str, run_at: datetime.datetime, payload: dict) -> None:
+    if task_id in _QUEUED:
+        return
+    heapq.heappush(_HEAP, (run_at.timestamp(), task_id, kind, payload))
+    _QUEUED.add(task_id)
+    if _WAKE is not None:
+        _WAKE.set()
+
+
+async def schedule_task(kind: str, delay: float, **payload) -> None:
+    """Persist a task of ``kind`` to run in ``delay`` seconds with ``payload``."""
+    run_at = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+    task_id = await aio.create_scheduled_task(kind, run_at, payload)
+    if delay < HORIZON:
+        _push(task_id, kind, run_at, payload)
+
+
+async def _refill() -> None:
+    until = datetime.datetime.now() + datetime.timedelta(seconds=HORIZON)
+    for task_id, kind, run_at, payload in await aio.get_scheduled_tasks_before(until):
+        _push(task_id, kind, run_at, payload)
+
+
+async def _execute(bot: Bot, task_id: int, kind: str, payload: dict) -> None:
+    handler = _HANDLERS.get(kind)
+    try:
+        if handler is None:
+            logger.warning(f"No handler for scheduled task #{task_id} of kind {kind!r}")
+        else:
+            await handler(bot, payload)
+    except Exception as e:
+        logger.error(f"Scheduled task #{task_id} ({kind}) failed: {e}")
+    finally:
+        await _delete(task_id)
+
+
+async def _delete(task_id: int) -> None:
+    for attempt in range(DELETE_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(DELETE_BACKOFF * 2 ** (attempt - 1))
+        try:
+            await aio.delete_scheduled_task(task_id)
+        except Exception as e:
+            logger.warning(f"Deleting scheduled task #{task_id} failed: {e}")
+            continue
+        _QUEUED.discard(task_id)
+        return
+    # Keeping the id queued stops refills from running the task again in this
+    # process; only a restart would pick the leftover row up.
+    logger.error(f"Scheduled task #{task_id} ran but its row could not be deleted")
+
+
+async def _dispatch_loop(bot: Bot) -> None:
+    refill_at = 0.0
+    while True:
+        if time.time() >= refill_at:
+            try:
+                await _refill()
+            except Exception as e:
+                logger.error(f"Loading scheduled tasks failed: {e}")
+            refill_at = time.time() + HORIZON / 2
+        while _HEAP and _HEAP[0][0] <= time.time():
+            _, task_id, kind, payload = heapq.heappop(_HEAP)
+            task = asyncio.create_task(_execute(bot, task_id, kind, payload))
+            _RUNNING.add(task)
+            task.add_done_callback(_RUNNING.discard)
+        wake_at = min(refill_at, _HEAP[0][0]) if _HEAP else refill_at
+        _WAKE.clear()
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(_WAKE.wait(), max(wake_at - time.time(), 0))
+
+
+def start_scheduler(bot: Bot) -> asyncio.Task:
+    global _WAKE
+    _WAKE = asyncio.Event()
+    return asyncio.create_task(_dispatch_loop(bot))
@@ -0,0 +1,108 @@
+"""Shared fixtures: a migrated scratch database and statement capture.
+
+The suite runs on SQLite by default. To run it on another backend, point
+``DATABASE_URL`` at a server, e.g.::
+
+    DATABASE_URL=postgresql://postgres@localhost/bot python -m pytest tests
+
+Tests never touch that database itself; they create scratch databases next
+to it and drop them afterwards. The database URL must be set before ``bot``
+is imported, since the engine is built from the environment on first use.
+"""
+import contextlib
+import os
+import tempfile
+import uuid
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+_DB_DIR = tempfile.mkdtemp(prefix='bot-tests-')
+_SERVER_URL = make_url(os.environ.get('DATABASE_URL') or 'sqlite://')
+_SCRATCH: list[str] = []
+
+
+def _server_engine():
+    return create_engine(_SERVER_URL, isolation_level='AUTOCOMMIT')
+
+
+def _create_scratch_database(label: str) -> str:
+    """Return the URL of a new empty database on the backend under test."""
+    if _SERVER_URL.get_backend_name() == 'sqlite':
+        return f'sqlite:///{_DB_DIR}/{label}-{uuid.uuid4().hex[:8]}.db'
+    name = f'{_SERVER_URL.database}_{label}_{uuid.uuid4().hex[:8]}'
+    engine = _server_engine()
+    with engine.connect() as connection:
+        connection.exec_driver_sql(f'CREATE DATABASE "{name}"')
+    engine.dispose()
+    _SCRATCH.append(name)
+    return _SERVER_URL.set(database=name).render_as_string(hide_password=False)
+
+
+def _drop_scratch_databases() -> None:
+    if not _SCRATCH:
+        return
+    force = ' WITH (FORCE)' if _SERVER_URL.get_backend_name() == 'postgresql' else ''
+    engine = _server_engine()
+    with engine.connect() as connection:
+        while _SCRATCH:
+            connection.exec_driver_sql(f'DROP DATABASE IF EXISTS "{_SCRATCH.pop()}"{force}')
+    engine.dispose()
+
+
+os.environ['DATABASE_URL'] = _create_scratch_database('tests')
+
+import pytest  # noqa: E402
+
+from bot.database import Database  # noqa: E402
+from bot.database.models import register_models  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database() -> Database:
+    register_models()
+    yield Database()
+    Database().remove_session()
+    Database().engine.dispose()
+    _drop_scratch_databases()
+
+
+@pytest.fixture
+def scratch_database() -> str:
+    """URL of a new empty database on the backend under test, dropped after the session."""
+    return _create_scratch_database('scratch')
+
+
+@pytest.fixture
+def sqlite_only():
+    if not Database().is_sqlite:
+        pytest.skip('SQLite-specific behaviour')
+
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    """Give every test a session free of the previous test's state."""
+    yield
+    Database().session.rollback()
+    Database().remove_session()
+
+
+@contextlib.contextmanager
+def _capture_statements():
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = Database().engine
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+@pytest.fixture
+def capture_statements():
+    """Context manager collecting ``(sql, parameters)`` for every statement run inside it."""
+    return _capture_statements
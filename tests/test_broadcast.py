@@ -0,0 +1,88 @@
+"""Failure handling of broadcast deliveries and the rate limiter's locking."""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('aiogram')
+
+from aiogram.utils.exceptions import BotBlocked  # noqa: E402
+
+from bot.utils import broadcast  # noqa: E402
+from bot.utils.broadcast import RateLimiter  # noqa: E402
+
+
+class FakeBot:
+    def __init__(self, error: BaseException | None = None):
+        self.error = error
+        self.sent: list[int] = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        if self.error:
+            raise self.error
+        self.sent.append(chat_id)
+
+
+@pytest.fixture(autouse=True)
+def limiter(monkeypatch):
+    monkeypatch.setattr(broadcast, '_LIMITER', RateLimiter(1000, 0))
+
+
+@pytest.mark.parametrize('error, result', [
+    (None, 'sent'),
+    (BotBlocked('Forbidden: bot was blocked by the user'), 'blocked'),
+    (asyncio.TimeoutError(), 'failed'),
+    (ConnectionResetError(), 'failed'),
+    (KeyError('bug'), 'failed'),
+])
+def test_deliver_classifies_every_outcome(error, result):
+    assert asyncio.run(broadcast._deliver(FakeBot(error), 1, 'hello')) == result
+
+
+def test_waiting_for_one_chat_does_not_hold_up_others():
+    limiter = RateLimiter(1000, chat_interval=1)
+
+    async def scenario():
+        await limiter.acquire(1)
+        waiting = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0.01)
+        began = time.monotonic()
+        await limiter.acquire(2)
+        elapsed = time.monotonic() - began
+        waiting.cancel()
+        return elapsed
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_chat_interval_is_kept():
+    limiter = RateLimiter(1000, chat_interval=0.2)
+
+    async def scenario():
+        began = time.monotonic()
+        await asyncio.gather(limiter.acquire(1), limiter.acquire(1))
+        return time.monotonic() - began
+
+    assert asyncio.run(scenario()) >= 0.2
+
+
+def test_crashed_job_is_marked_failed(monkeypatch):
+    marked = []
+
+    async def crash(bot, job_id):
+        raise RuntimeError('boom')
+
+    async def finish_broadcast_job(job_id, status='finished'):
+        marked.append((job_id, status))
+
+    monkeypatch.setattr(broadcast, '_run', crash)
+    monkeypatch.setattr(broadcast.aio, 'finish_broadcast_job', finish_broadcast_job)
+
+    async def scenario():
+        broadcast.start_broadcast(FakeBot(), 7)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert marked == [(7, 'failed')]
+    assert 7 not in broadcast._TASKS
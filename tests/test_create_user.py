@@ -0,0 +1,37 @@
+"""Registering a user keeps the referral and daily counters right without recounting on repeat /start."""
+from bot.database.methods import check_user, create_user, get_daily_stats, get_referral_stats
+
+DAY = '2025-04-02'
+REFERRER = 7100
+
+
+def _register(telegram_id: int, referral_id=None, username: str | None = None) -> None:
+    create_user(telegram_id, f'{DAY} 10:00:00', referral_id, username=username)
+
+
+def test_repeat_start_touches_no_counters(capture_statements):
+    _register(7101, REFERRER)
+
+    with capture_statements() as statements:
+        _register(7101, REFERRER)
+    touched = ' '.join(sql for sql, _ in statements)
+    assert 'referral_stats' not in touched
+    assert 'daily_stats' not in touched
+
+
+def test_counters_count_each_user_once():
+    before = get_daily_stats(DAY)['today']['new_users']
+    for telegram_id in (7201, 7202):
+        for _ in range(3):
+            _register(telegram_id, 7200)
+    _register(7203)
+
+    assert get_referral_stats(7200) == (2, 0)
+    assert get_daily_stats(DAY)['today']['new_users'] == before + 3
+
+
+def test_repeat_start_refreshes_username():
+    _register(7301, username='old')
+    _register(7301, username='new')
+
+    assert check_user(7301).username == 'new'
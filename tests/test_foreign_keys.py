@@ -0,0 +1,75 @@
+"""Renaming and deleting goods and categories cascade the same way on every backend."""
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from bot.database import Database
+from bot.database.methods import (
+    add_item_to_cart, add_stock_notification, add_values_to_item, create_category, create_category_passwords,
+    create_item, create_user, delete_category, delete_item, get_stock_levels, mark_generated_password_used,
+    set_reseller_price, update_item, upsert_user_category_password,
+)
+from bot.database.models import (
+    CartItem, CategoryPassword, ItemValues, ResellerPrice, StockNotification, StockSummary, UserCategoryPassword,
+)
+
+USER = 7700
+REFERENCES = (ItemValues, StockSummary, CartItem, StockNotification, ResellerPrice)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def user():
+    create_user(USER, '2025-04-05 10:00:00', None)
+
+
+def _stock_item(category: str, name: str) -> None:
+    create_item(name, 'description', 5, category)
+    add_values_to_item(name, f'{name}-1', False)
+    add_item_to_cart(USER, name)
+    add_stock_notification(USER, name)
+    set_reseller_price(None, name, 4)
+
+
+def _rows(item_name: str) -> dict[str, int]:
+    session = Database().session
+    return {model.__tablename__: session.query(model).filter(model.item_name == item_name).count()
+            for model in REFERENCES}
+
+
+def test_rename_moves_every_reference():
+    create_category('fk_rename')
+    _stock_item('fk_rename', 'fk_old')
+
+    update_item('fk_old', 'fk_new', 'description', 5, 'fk_rename', None)
+    assert set(_rows('fk_old').values()) == {0}
+    assert set(_rows('fk_new').values()) == {1}
+    assert get_stock_levels(['fk_new'])['fk_new'][0] == 1
+
+
+def test_delete_removes_every_reference():
+    create_category('fk_delete')
+    _stock_item('fk_delete', 'fk_gone')
+
+    delete_item('fk_gone')
+    assert set(_rows('fk_gone').values()) == {0}
+
+
+def test_deleting_a_category_cascades_to_goods_and_passwords():
+    create_category('fk_locked')
+    _stock_item('fk_locked', 'fk_locked_item')
+    generated, = create_category_passwords(['fk-secret'])
+    mark_generated_password_used(generated.id, USER, 'fk_locked')
+    upsert_user_category_password(USER, 'fk_locked', 'fk-secret', generated.id)
+
+    delete_category('fk_locked')
+    session = Database().session
+    assert set(_rows('fk_locked_item').values()) == {0}
+    assert session.query(UserCategoryPassword).filter(UserCategoryPassword.category_name == 'fk_locked').count() == 0
+    assert session.query(CategoryPassword.used_for_category).filter(CategoryPassword.id == generated.id).scalar() is None
+
+
+def test_stock_for_a_missing_item_is_rejected():
+    session = Database().session
+    session.add(ItemValues(name='fk_no_such_item', value='x', is_infinity=False))
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
@@ -0,0 +1,101 @@
+"""Handler latency with blocking database calls versus the awaitable ``aio`` layer.
+
+A burst of shop updates, each reading the buyer's balance, a page of items
+and their stock and then adding to the cart, arrives together with light
+updates that touch no database. Calling the methods directly blocks the
+event loop for the whole handler, so the light updates queue behind the
+database work. Awaiting them through ``aio`` frees the loop.
+
+Sessions keep their connection until the scope closes, so the database
+updates are admitted at most ``POOL_SIZE`` at a time, as the pool allows.
+Run with ``-s`` to see the percentiles.
+"""
+import asyncio
+import time
+
+import pytest
+
+from bot.database import Database, close_session_scope, open_session_scope
+from bot.database.methods import (
+    add_item_to_cart, add_values_bulk, aio, create_category, create_item, create_user, get_items_info,
+    get_stock_levels, get_user_balance,
+)
+
+USERS = range(9000, 9100)
+ITEMS = [f'latency_item_{n}' for n in range(40)]
+DB_UPDATES = 300
+LIGHT_UPDATES = 300
+
+
+@pytest.fixture(scope='module', autouse=True)
+def shop():
+    create_category('latency_category')
+    for name in ITEMS:
+        create_item(name, 'description', 5, 'latency_category')
+        add_values_bulk(name, [f'{name}-{n}' for n in range(5)])
+    for user_id in USERS:
+        create_user(user_id, '2025-03-01 12:00:00', None)
+
+
+async def _blocking_handler(user_id: int, page: list[str]) -> None:
+    get_user_balance(user_id)
+    get_items_info(page, user_id)
+    get_stock_levels(page)
+    add_item_to_cart(user_id, page[0])
+
+
+async def _awaitable_handler(user_id: int, page: list[str]) -> None:
+    await aio.get_user_balance(user_id)
+    await aio.get_items_info(page, user_id)
+    await aio.get_stock_levels(page)
+    await aio.add_item_to_cart(user_id, page[0])
+
+
+async def _update(arrived: float, slots: asyncio.Semaphore, handler, *args) -> float:
+    async with slots:
+        # what DatabaseSessionMiddleware does around every update
+        scope = open_session_scope()
+        try:
+            await handler(*args)
+        finally:
+            close_session_scope(*scope)
+    return time.perf_counter() - arrived
+
+
+async def _light_update(arrived: float) -> float:
+    await asyncio.sleep(0)
+    return time.perf_counter() - arrived
+
+
+async def _burst(handler) -> tuple[list[float], list[float]]:
+    slots = asyncio.Semaphore(Database.POOL_SIZE)
+    db_tasks, light_tasks = [], []
+    for n in range(max(DB_UPDATES, LIGHT_UPDATES)):
+        arrived = time.perf_counter()
+        if n < DB_UPDATES:
+            user_id = USERS[n % len(USERS)]
+            page = [ITEMS[(n + k) % len(ITEMS)] for k in range(10)]
+            db_tasks.append(asyncio.create_task(_update(arrived, slots, handler, user_id, page)))
+        if n < LIGHT_UPDATES:
+            light_tasks.append(asyncio.create_task(_light_update(arrived)))
+    return await asyncio.gather(*db_tasks), await asyncio.gather(*light_tasks)
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _report(label: str, db: list[float], light: list[float]) -> None:
+    print(f'{label:>10}: db handlers p50 {_percentile(db, 0.5) * 1000:7.1f} ms  p99 {_percentile(db, 0.99) * 1000:7.1f} ms'
+          f' | light handlers p50 {_percentile(light, 0.5) * 1000:7.1f} ms  p99 {_percentile(light, 0.99) * 1000:7.1f} ms')
+
+
+def test_awaitable_layer_keeps_light_updates_fast():
+    before_db, before_light = asyncio.run(_burst(_blocking_handler))
+    after_db, after_light = asyncio.run(_burst(_awaitable_handler))
+    print()
+    _report('blocking', before_db, before_light)
+    _report('aio', after_db, after_light)
+
+    assert _percentile(after_light, 0.99) < _percentile(before_light, 0.99)
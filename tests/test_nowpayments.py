@@ -0,0 +1,197 @@
+"""Retries and the circuit breaker of the NOWPayments client against a local aiohttp server."""
+import asyncio
+
+import pytest
+from aiohttp import ClientTimeout, web
+from aiohttp.test_utils import TestServer
+
+from bot.misc import nowpayments
+from bot.misc.nowpayments import (
+    ATTEMPTS, BREAKER_COOLDOWN, BREAKER_THRESHOLD, CircuitBreaker, CircuitOpenError, NowPaymentsError,
+)
+
+HANG = 'hang'  # answer slower than the client timeout
+
+
+class FakeApi:
+    """Answers every request with the next scripted reply, then with 200 and ``default``."""
+
+    def __init__(self):
+        self.replies: list[int | str] = []
+        self.default = {'payment_status': 'finished'}
+        self.requests = 0
+        self.in_flight = self.most_in_flight = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            reply = self.replies.pop(0) if self.replies else 200
+            if reply == HANG:
+                await asyncio.sleep(1)
+                reply = 200
+            await asyncio.sleep(0.001)
+            if reply != 200:
+                return web.Response(status=reply, text='error')
+            return web.json_response(self.default)
+        finally:
+            self.in_flight -= 1
+
+    def run(self, scenario):
+        """Run ``scenario()`` with the client pointed at this server."""
+        async def main():
+            app = web.Application()
+            app.router.add_route('*', '/{tail:.*}', self.handle)
+            server = TestServer(app)
+            await server.start_server()
+            nowpayments.API_BASE = str(server.make_url('')).rstrip('/')
+            try:
+                return await scenario()
+            finally:
+                await nowpayments.close_session()
+                await server.close()
+        return asyncio.run(main())
+
+
+@pytest.fixture
+def api(monkeypatch) -> FakeApi:
+    monkeypatch.setattr(nowpayments, 'API_BASE', nowpayments.API_BASE)
+    monkeypatch.setattr(nowpayments, 'BACKOFF', 0)
+    monkeypatch.setattr(nowpayments, 'TIMEOUT', ClientTimeout(total=0.2))
+    monkeypatch.setattr(nowpayments, '_SESSION', None)
+    monkeypatch.setattr(nowpayments, '_BREAKER', CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN))
+    monkeypatch.setattr(nowpayments, '_REFRESH_BREAKER', CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN))
+    for cache in ('_CURRENCIES', '_MINIMUMS', '_RATES'):
+        monkeypatch.setattr(nowpayments, cache, nowpayments._Cached())
+    return FakeApi()
+
+
+def _expire_cooldown() -> None:
+    nowpayments._BREAKER._opened_at -= BREAKER_COOLDOWN
+
+
+@pytest.mark.parametrize('status', sorted(nowpayments.RETRY_STATUSES))
+def test_retries_server_errors_and_rate_limits(api, status):
+    api.replies = [status] * (ATTEMPTS - 1)
+
+    assert api.run(lambda: nowpayments.check_payment('1')) == 'finished'
+    assert api.requests == ATTEMPTS
+
+
+def test_retries_timeouts(api):
+    api.replies = [HANG]
+
+    assert api.run(lambda: nowpayments.check_payment('1')) == 'finished'
+    assert api.requests == 2
+
+
+def test_gives_up_after_all_attempts(api):
+    api.replies = [503] * ATTEMPTS
+
+    with pytest.raises(NowPaymentsError, match=f'after {ATTEMPTS} attempts'):
+        api.run(lambda: nowpayments.check_payment('1'))
+    assert api.requests == ATTEMPTS
+
+
+def test_does_not_retry_bad_requests(api):
+    api.replies = [400]
+
+    with pytest.raises(NowPaymentsError, match='HTTP 400'):
+        api.run(lambda: nowpayments.create_payment(10, 'BTC'))
+    assert api.requests == 1
+    assert nowpayments._BREAKER.allow()
+
+
+def test_not_found_is_none(api):
+    api.replies = [404]
+
+    assert api.run(lambda: nowpayments.check_payment('1')) is None
+    assert api.requests == 1
+
+
+def test_breaker_opens_after_threshold_failures(api):
+    api.replies = [500] * (BREAKER_THRESHOLD * ATTEMPTS)
+
+    async def scenario():
+        for _ in range(BREAKER_THRESHOLD):
+            with pytest.raises(NowPaymentsError, match='attempts'):
+                await nowpayments.check_payment('1')
+        with pytest.raises(CircuitOpenError):
+            await nowpayments.check_payment('1')
+
+    api.run(scenario)
+    assert api.requests == BREAKER_THRESHOLD * ATTEMPTS
+
+
+def test_breaker_lets_one_trial_through_after_cooldown(api):
+    api.replies = [500] * (BREAKER_THRESHOLD * ATTEMPTS) + [HANG]
+
+    async def scenario():
+        for _ in range(BREAKER_THRESHOLD):
+            with pytest.raises(NowPaymentsError):
+                await nowpayments.check_payment('1')
+        _expire_cooldown()
+        # the trial is still in flight when the second call arrives
+        trial, second = await asyncio.gather(nowpayments.check_payment('1'), nowpayments.check_payment('2'),
+                                             return_exceptions=True)
+        assert trial == 'finished'
+        assert isinstance(second, CircuitOpenError)
+        # the successful trial closed the circuit
+        assert await nowpayments.check_payment('3') == 'finished'
+
+    api.run(scenario)
+    assert api.requests == BREAKER_THRESHOLD * ATTEMPTS + 3
+
+
+def test_failed_trial_keeps_breaker_open(api):
+    api.replies = [500] * ((BREAKER_THRESHOLD + 1) * ATTEMPTS)
+
+    async def scenario():
+        for _ in range(BREAKER_THRESHOLD):
+            with pytest.raises(NowPaymentsError):
+                await nowpayments.check_payment('1')
+        _expire_cooldown()
+        with pytest.raises(NowPaymentsError, match='attempts'):
+            await nowpayments.check_payment('1')
+        with pytest.raises(CircuitOpenError):
+            await nowpayments.check_payment('1')
+
+    api.run(scenario)
+    assert api.requests == (BREAKER_THRESHOLD + 1) * ATTEMPTS
+
+
+def test_refresh_runs_one_call_at_a_time(api):
+    api.default = {'currencies': ['btc', 'eth'], 'fiat_equivalent': 5, 'estimated_amount': 0.00105}
+
+    api.run(nowpayments.refresh_rates)
+    assert api.requests == 1 + 2 * len(nowpayments.PAY_CURRENCIES)
+    assert api.most_in_flight == 1
+    assert nowpayments.currency_available('BTC') and not nowpayments.currency_available('SOL')
+    assert nowpayments.estimate_payment(100, 'BTC') == pytest.approx(0.00105)
+
+
+def test_refresh_failures_do_not_open_the_payment_breaker(api):
+    api.replies = [500] * (BREAKER_THRESHOLD * ATTEMPTS)
+
+    async def scenario():
+        await nowpayments.refresh_rates()
+        return await nowpayments.check_payment('1')
+
+    assert api.run(scenario) == 'finished'
+    # the refresh gave up once its own breaker opened
+    assert api.requests == BREAKER_THRESHOLD * ATTEMPTS + 1
+
+
+@pytest.mark.parametrize('amount, label', [
+    (1.05e-05, '0.0000105'),
+    (0.001234567, '0.00123457'),
+    (350.5, '350.5'),
+    (12345678.9, '12345678.9'),
+    (2.0, '2'),
+])
+def test_estimates_are_fixed_point(amount, label):
+    pytest.importorskip('aiogram')
+    from bot.keyboards.inline import _format_estimate
+
+    assert _format_estimate(amount) == label
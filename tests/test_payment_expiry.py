@@ -0,0 +1,77 @@
+"""Expired invoices release their stock and tell the buyer in their own language."""
+import asyncio
+import datetime
+import time
+
+import pytest
+
+pytest.importorskip('aiogram')
+
+from bot.database.methods import (  # noqa: E402
+    add_stock_notification, create_category, create_item, create_user, get_expired_operations, get_unfinished_operation,
+    select_item_values_amount, start_operation,
+)
+from bot.handlers.user import main as handlers  # noqa: E402
+from bot.localization import t  # noqa: E402
+from bot.utils.reservations import add_reservation, has_active_reservation  # noqa: E402
+
+BUYER = 7800
+WATCHER = 7801
+PAST = datetime.datetime(2025, 3, 1, 12, 0)
+
+
+class _Bot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+    async def delete_message(self, chat_id, message_id):
+        pass
+
+
+@pytest.fixture(scope='module', autouse=True)
+def shop():
+    create_user(BUYER, PAST, None, language='ru')
+    create_user(WATCHER, PAST, None, language='ru')
+    create_category('expiry_category')
+    create_item('expiry_item', 'description', 10, 'expiry_category')
+
+
+@pytest.fixture(autouse=True)
+def unpaid(monkeypatch):
+    async def provider_status(operation):
+        return 'expired'
+
+    monkeypatch.setattr(handlers, '_provider_status', provider_status)
+
+
+def _expire(operation_id: str) -> _Bot:
+    bot = _Bot()
+    operation = next(op for op in get_expired_operations(datetime.datetime.now(), 10)
+                     if op['operation_id'] == operation_id)
+    asyncio.run(handlers._expire_operation(bot, operation))
+    return bot
+
+
+def test_cancelled_invoice_is_reported_in_the_buyers_language():
+    start_operation(BUYER, 10, 'expiry_plain', expires_at=PAST)
+    bot = _expire('expiry_plain')
+    assert bot.sent == [(BUYER, t('ru', 'invoice_cancelled'))]
+    assert get_unfinished_operation('expiry_plain') is None
+
+
+def test_expired_purchase_returns_the_reserved_unit():
+    expires = time.time() + 600
+    add_reservation('expiry_item', expires)
+    add_stock_notification(WATCHER, 'expiry_item')
+    reserved = {'value': 'unit', 'is_infinity': False, 'expires_at': expires}
+    start_operation(BUYER, 10, 'expiry_item_invoice', expires_at=PAST,
+                    payload={'type': 'item', 'item': 'expiry_item', 'reserved': reserved, 'user_id': BUYER})
+    bot = _expire('expiry_item_invoice')
+    assert select_item_values_amount('expiry_item') == 1
+    assert not has_active_reservation('expiry_item')
+    assert (BUYER, t('ru', 'purchase_expired')) in bot.sent
+    assert WATCHER in [chat_id for chat_id, _ in bot.sent]
+    assert get_unfinished_operation('expiry_item_invoice') is None
@@ -0,0 +1,173 @@
+"""Keyed read methods must be served by an index, never a full table scan.
+
+The plans are read with SQLite's ``EXPLAIN QUERY PLAN``, so these tests only
+run on SQLite; the indexes they check exist on every backend.
+"""
+import datetime
+import inspect
+import re
+
+import pytest
+from sqlalchemy import text
+
+from bot.database import Database
+from bot.database.methods import read
+from bot.database.methods import (
+    add_bought_item, add_item_to_cart, add_stock_notification, add_values_to_item, create_category,
+    create_item, create_operation, create_promocode, create_user, start_operation,
+)
+
+USER = 7001
+REFERRER = 7000
+DAY = '2025-03-01'
+NOW = datetime.datetime(2025, 3, 1, 12, 0)
+
+pytestmark = pytest.mark.usefixtures('sqlite_only')
+
+# ``SCAN t`` without an index is a full table scan; ``SCAN t USING [COVERING] INDEX``
+# walks an index and ``SEARCH`` seeks one.
+FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?!\w)')
+TABLES = set(Database.BASE.metadata.tables)
+
+# daily_stats holds one row per day; the all-time totals and the count of
+# days with sales read all of it by design.
+ALLOWED_SCANS = {
+    'get_daily_stats': {'daily_stats'},
+    'get_purchase_dates': {'daily_stats'},
+}
+
+
+@pytest.fixture(scope='module', autouse=True)
+def shop():
+    create_user(REFERRER, NOW, None, username='plan_referrer')
+    create_user(USER, NOW, REFERRER, username='plan_user')
+    create_category('plan_category')
+    create_item('plan_item', 'description', 10, 'plan_category')
+    for n in range(3):
+        add_values_to_item('plan_item', f'value-{n}', False)
+    add_bought_item('plan_item', 'sold', 10, USER, NOW)
+    create_operation(USER, 25, NOW)
+    start_operation(USER, 25, 'plan_operation', expires_at=NOW)
+    add_item_to_cart(USER, 'plan_item')
+    add_stock_notification(USER, 'plan_item')
+    create_promocode('PLANCODE', 10, None, ['plan_item'])
+    sold = Database().session.execute(text("SELECT unique_id FROM bought_goods LIMIT 1")).scalar()
+    return {'unique_id': sold}
+
+
+def _calls(shop):
+    return {
+        'check_user': (USER,),
+        'check_user_by_username': ('plan_user',),
+        'check_role': (USER,),
+        'is_reseller': (USER,),
+        'select_today_users': (DAY,),
+        'get_broadcast_recipients': (USER - 1, 10),
+        'get_running_broadcast_jobs': (),
+        'get_broadcast_job': (1,),
+        'get_scheduled_tasks_before': (NOW,),
+        'get_user_category_password': (USER, 'plan_category'),
+        'get_generated_password': ('missing-password',),
+        'get_user_category_passwords': (USER,),
+        'get_item_info': ('plan_item', USER),
+        'get_items_info': (['plan_item'], USER),
+        'get_user_balance': (USER,),
+        'get_user_language': (USER,),
+        'get_cart_items': (USER,),
+        'get_cart_items_with_prices': (USER,),
+        'get_cart_total': (USER,),
+        'get_user_tickets': (USER,),
+        'has_user_achievement': (USER, 'first_purchase'),
+        'get_achievement_users': ('first_purchase',),
+        'get_item_value': ('plan_item',),
+        'get_item_values': ('plan_item',),
+        'get_item_value_by_id': (1,),
+        'select_item_values_amount': ('plan_item',),
+        'check_value': ('plan_item',),
+        'get_stock_levels': (['plan_item'],),
+        'is_stock_empty': ('plan_item',),
+        'has_stock_notification': (USER, 'plan_item'),
+        'get_item_subscribers': ('plan_item',),
+        'select_user_items': (USER,),
+        'get_bought_items_page': (USER,),
+        'select_bought_item': (shop['unique_id'],),
+        'get_bought_item_info': (shop['unique_id'],),
+        'get_purchase_dates': (),
+        'get_purchases_by_date': (DAY,),
+        'select_today_orders': (DAY,),
+        'select_today_operations': (DAY,),
+        'get_daily_stats': (DAY, 7),
+        'select_user_operations': (USER,),
+        'select_unfinished_operations': ('plan_operation',),
+        'get_unfinished_operation': ('plan_operation',),
+        'get_user_unfinished_operation': (USER,),
+        'get_expired_operations': (NOW, 10),
+        'check_user_referrals': (REFERRER,),
+        'get_user_referral': (USER,),
+        'sum_referral_operations': (REFERRER,),
+        'get_referral_stats': (REFERRER,),
+        'get_promocode': ('PLANCODE',),
+        'get_promocode_items': ('PLANCODE',),
+        'get_user_context': (USER,),
+        'check_role_name_by_id': (1,),
+        'get_role_id_by_name': ('USER',),
+        'get_category_password_by_id': (1,),
+        'check_item': ('plan_item',),
+        'check_category': ('plan_category',),
+    }
+
+
+# Methods that read whole tables on purpose: admin listings and totals, and
+# the catalog snapshot, which loads categories and items once per change.
+WHOLE_TABLE = {
+    'get_user_count', 'select_admins', 'get_all_users', 'get_resellers', 'list_users_with_category_passwords',
+    'get_users_with_tickets', 'get_all_admins', 'select_all_users', 'select_count_items', 'select_count_goods',
+    'select_count_categories', 'select_count_bought_items', 'select_all_orders', 'select_all_operations',
+    'select_users_balance', 'get_all_promocodes',
+    'item_in_stock', 'get_all_categories', 'get_all_category_names', 'get_categories_with_lock_status',
+    'get_all_subcategories', 'get_subcategories', 'get_category_parent', 'is_category_locked',
+    'get_category_title', 'get_category_titles', 'get_all_items', 'get_all_item_names',
+    'get_out_of_stock_items', 'get_out_of_stock_categories', 'get_out_of_stock_subcategories',
+    'can_use_discount', 'can_get_referral_reward',
+}
+# Cache invalidation only; no queries.
+NOT_QUERIES = {'invalidate_role_cache', 'invalidate_purchase_count'}
+
+
+METHODS = sorted(_calls({'unique_id': None}))
+
+
+def _full_scans(statement: str, parameters) -> set[str]:
+    """Tables the statement reads without an index."""
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE')):
+        return set()
+    connection = Database().session.connection().connection.dbapi_connection
+    rows = connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    return {match.group(1) for row in rows for match in FULL_SCAN.finditer(row[-1])} & TABLES
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_read_method_uses_indexes(method, shop, capture_statements):
+    read.invalidate_role_cache(USER)
+    read.invalidate_purchase_count(USER)
+    with capture_statements() as statements:
+        getattr(read, method)(*_calls(shop)[method])
+    allowed = ALLOWED_SCANS.get(method, set())
+    scans = {table: sql for sql, parameters in statements
+             for table in _full_scans(sql, parameters) - allowed}
+    assert not scans, f'{method} scans a whole table: {scans}'
+
+
+def test_full_scan_pattern():
+    assert FULL_SCAN.search('SCAN users')
+    assert not FULL_SCAN.search('SCAN users USING COVERING INDEX ix_users_username')
+    assert not FULL_SCAN.search('SEARCH users USING INDEX ix_users_referral_id (referral_id=?)')
+
+
+def test_every_read_method_is_checked():
+    public = {
+        name for name, member in inspect.getmembers(read, inspect.isfunction)
+        if member.__module__ == read.__name__ and not name.startswith('_')
+    }
+    unchecked = public - set(METHODS) - WHOLE_TABLE - NOT_QUERIES
+    assert not unchecked, f'add these read methods to the query plan checks: {sorted(unchecked)}'
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bot.database import Database, session_scope
+from bot.database.methods import create_category, create_item
+from bot.database.models import StockSummary
+from bot.utils import reservations
+
+
+@pytest.fixture(scope='module', autouse=True)
+def item():
+    create_category('reservation_category')
+    create_item('reservation_item', 'description', 10, 'reservation_category')
+
+
+def _reserved() -> int:
+    Database().session.expire_all()
+    return Database().session.query(StockSummary.reserved).filter(
+        StockSummary.item_name == 'reservation_item').scalar()
+
+
+def test_sweep_runs_on_the_db_pool_in_its_own_scope(monkeypatch):
+    reservations.add_reservation('reservation_item', time.time() - 1)
+    assert _reserved() == 1
+    threads = []
+    cleanup = reservations._cleanup_and_commit
+
+    def tracked():
+        threads.append(threading.current_thread())
+        cleanup()
+
+    monkeypatch.setattr(reservations, '_cleanup_and_commit', tracked)
+
+    async def sweep_once():
+        task = asyncio.create_task(reservations.reservation_sweep_loop(interval=0))
+        while not threads:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(sweep_once())
+    assert threads[0] is not threading.main_thread()
+    assert _reserved() == 0
+    assert 'reservation_item' not in reservations._RESERVED
+
+
+def test_concurrent_reservations_keep_the_counter_in_step():
+    def reserve_and_release(n: int) -> None:
+        expires = time.time() + 600 + n
+        with session_scope():
+            reservations.add_reservation('reservation_item', expires)
+        with session_scope():
+            reservations.remove_reservation('reservation_item', expires)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(reserve_and_release, range(200)))
+    assert _reserved() == 0
+    assert 'reservation_item' not in reservations._RESERVED
@@ -0,0 +1,137 @@
+"""Scheduled tasks run once, and their rows are deleted before they leave the queue."""
+import asyncio
+import datetime
+import threading
+
+import pytest
+
+pytest.importorskip('aiogram')
+
+from bot.database.methods import create  # noqa: E402
+from bot.utils import scheduler  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_queue(monkeypatch):
+    monkeypatch.setattr(scheduler, 'DELETE_BACKOFF', 0)
+    monkeypatch.setattr(scheduler, '_HEAP', [])
+    monkeypatch.setattr(scheduler, '_QUEUED', set())
+    monkeypatch.setattr(scheduler, '_RUNNING', set())
+    monkeypatch.setattr(scheduler, '_HANDLERS', {})
+
+
+@pytest.fixture
+def runs() -> list[dict]:
+    runs = []
+
+    async def handler(bot, payload):
+        runs.append(payload)
+
+    scheduler.register_task_handler('test', handler)
+    return runs
+
+
+def _queue(task_id: int) -> None:
+    scheduler._push(task_id, 'test', datetime.datetime.now(), {'task': task_id})
+
+
+def _dispatch() -> int:
+    """Pop the next due task as the dispatcher loop would."""
+    return scheduler.heapq.heappop(scheduler._HEAP)[1]
+
+
+def test_row_is_deleted_before_the_task_leaves_the_queue(monkeypatch, runs):
+    queued_at_delete = []
+
+    async def delete_scheduled_task(task_id):
+        queued_at_delete.append(task_id in scheduler._QUEUED)
+
+    monkeypatch.setattr(scheduler.aio, 'delete_scheduled_task', delete_scheduled_task)
+    _queue(1)
+
+    asyncio.run(scheduler._execute(None, _dispatch(), 'test', {'task': 1}))
+    assert runs == [{'task': 1}]
+    assert queued_at_delete == [True]
+    assert 1 not in scheduler._QUEUED
+
+
+def test_failed_delete_is_retried_without_running_again(monkeypatch, runs):
+    failures = [RuntimeError('locked')]
+
+    async def delete_scheduled_task(task_id):
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setattr(scheduler.aio, 'delete_scheduled_task', delete_scheduled_task)
+    _queue(1)
+
+    asyncio.run(scheduler._execute(None, _dispatch(), 'test', {'task': 1}))
+    assert runs == [{'task': 1}]
+    assert 1 not in scheduler._QUEUED
+
+
+def test_undeletable_task_stays_queued(monkeypatch, runs):
+    async def delete_scheduled_task(task_id):
+        raise RuntimeError('locked')
+
+    monkeypatch.setattr(scheduler.aio, 'delete_scheduled_task', delete_scheduled_task)
+    _queue(1)
+
+    asyncio.run(scheduler._execute(None, _dispatch(), 'test', {'task': 1}))
+    assert 1 in scheduler._QUEUED
+    # a refill finding the leftover row does not queue it again
+    _queue(1)
+    assert scheduler._HEAP == []
+
+
+def test_dispatcher_keeps_running_tasks(monkeypatch):
+    release = None
+
+    async def handler(bot, payload):
+        await release.wait()
+
+    async def get_scheduled_tasks_before(until):
+        return [(1, 'test', datetime.datetime.now(), {})]
+
+    async def delete_scheduled_task(task_id):
+        pass
+
+    scheduler.register_task_handler('test', handler)
+    monkeypatch.setattr(scheduler.aio, 'get_scheduled_tasks_before', get_scheduled_tasks_before)
+    monkeypatch.setattr(scheduler.aio, 'delete_scheduled_task', delete_scheduled_task)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        loop = scheduler.start_scheduler(None)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        running = len(scheduler._RUNNING)
+        release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        loop.cancel()
+        return running, len(scheduler._RUNNING)
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+def test_schedule_task_persists_off_the_loop(monkeypatch):
+    monkeypatch.setattr(scheduler, '_WAKE', None)
+
+    async def scenario():
+        loop_thread = threading.current_thread()
+        await scheduler.schedule_task('test', 5, task='soon')
+        await scheduler.schedule_task('test', scheduler.HORIZON * 2, task='later')
+        return loop_thread
+
+    threads = []
+
+    def create_scheduled_task(*args):
+        threads.append(threading.current_thread())
+        return create.create_scheduled_task(*args)
+
+    monkeypatch.setattr(scheduler.aio, 'create_scheduled_task', scheduler.aio._awaitable(create_scheduled_task))
+    loop_thread = asyncio.run(scenario())
+    assert threads and all(thread is not loop_thread for thread in threads)
+    assert [entry[3] for entry in scheduler._HEAP] == [{'task': 'soon'}]
@@ -0,0 +1,113 @@
+"""Lock errors and throughput of the SQLite profile under concurrent readers and writers.
+
+Writer threads commit purchase-shaped transactions (debit a balance, record
+a sale) while reader threads keep querying, once with the WAL profile that
+``Database`` applies to every connection and once with SQLite's default
+rollback journal. Run with ``-s`` to see the numbers.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+from bot.database.main import _apply_sqlite_pragmas
+
+WRITERS = 4
+READERS = 8
+DURATION = 2.0  # s
+ACCOUNTS = 50
+
+
+def _engine(path, tuned: bool):
+    engine = create_engine(f'sqlite:///{path}', poolclass=QueuePool, pool_size=WRITERS + READERS,
+                           connect_args={'check_same_thread': False})
+    if tuned:
+        event.listen(engine, 'connect', _apply_sqlite_pragmas)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE accounts (id INTEGER PRIMARY KEY, balance INTEGER NOT NULL)'))
+        conn.execute(text('CREATE TABLE sales (id INTEGER PRIMARY KEY, account INTEGER NOT NULL, '
+                          'amount INTEGER NOT NULL)'))
+        conn.execute(text('CREATE INDEX ix_sales_account ON sales (account)'))
+        conn.execute(text('INSERT INTO accounts (id, balance) VALUES (:id, 1000000)'),
+                     [{'id': n} for n in range(ACCOUNTS)])
+    return engine
+
+
+def _stress(engine) -> dict:
+    counts = {'writes': 0, 'reads': 0, 'lock_errors': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(WRITERS + READERS)
+    deadline = [0.0]
+
+    def record(key):
+        with lock:
+            counts[key] += 1
+
+    def attempt(work):
+        try:
+            work()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            record('lock_errors')
+            return False
+        return True
+
+    def writer(n):
+        start.wait()
+        account = n
+        while time.perf_counter() < deadline[0]:
+            def purchase():
+                with engine.begin() as conn:
+                    conn.execute(text('UPDATE accounts SET balance = balance - 1 WHERE id = :id'), {'id': account})
+                    conn.execute(text('INSERT INTO sales (account, amount) VALUES (:id, 1)'), {'id': account})
+            if attempt(purchase):
+                record('writes')
+            account = (account + WRITERS) % ACCOUNTS
+
+    def reader(n):
+        start.wait()
+        account = n
+        while time.perf_counter() < deadline[0]:
+            def browse():
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT balance FROM accounts WHERE id = :id'), {'id': account}).scalar()
+                    conn.execute(text('SELECT count(*) FROM sales WHERE account = :id'), {'id': account}).scalar()
+            if attempt(browse):
+                record('reads')
+            account = (account + 1) % ACCOUNTS
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(WRITERS)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(READERS)]
+    deadline[0] = time.perf_counter() + DURATION
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as conn:
+        sold = conn.execute(text('SELECT count(*) FROM sales')).scalar()
+        debited = conn.execute(text('SELECT sum(1000000 - balance) FROM accounts')).scalar()
+    assert sold == debited == counts['writes']
+    return counts
+
+
+@pytest.mark.parametrize('tuned', [False, True], ids=['rollback-journal', 'wal'])
+def test_readers_and_writers_do_not_lock_each_other_out(tmp_path, tuned):
+    engine = _engine(tmp_path / 'stress.db', tuned)
+    try:
+        with engine.connect() as conn:
+            mode = conn.execute(text('PRAGMA journal_mode')).scalar()
+        counts = _stress(engine)
+    finally:
+        engine.dispose()
+
+    print(f'\n{mode:>6}: {counts["writes"] / DURATION:8.0f} writes/s  {counts["reads"] / DURATION:8.0f} reads/s'
+          f'  {counts["lock_errors"]} lock errors')
+    assert counts['writes'] > 0 and counts['reads'] > 0
+    if tuned:
+        assert mode == 'wal'
+        assert counts['lock_errors'] == 0
@@ -0,0 +1,69 @@
+"""Concurrent buyers never receive the same stock unit."""
+import threading
+import time
+
+import pytest
+
+from bot.database import Database, session_scope
+from bot.database.methods import add_values_bulk, claim_item_value, create_category, create_item, get_stock_levels
+from bot.database.models import ItemValues
+
+UNITS = 200
+BUYERS = 300
+
+
+@pytest.fixture(scope='module', autouse=True)
+def category():
+    create_category('claim_category')
+
+
+def _race(item_name: str) -> tuple[list[dict | None], float]:
+    """Let ``BUYERS`` threads claim ``item_name`` at the same moment."""
+    results: list[dict | None] = [None] * BUYERS
+    errors: list[BaseException] = []
+    start = threading.Barrier(BUYERS)
+
+    def buyer(index: int) -> None:
+        start.wait()
+        try:
+            with session_scope():
+                results[index] = claim_item_value(item_name)
+        except BaseException as e:  # reported by the test thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=buyer, args=(n,)) for n in range(BUYERS)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    return results, time.perf_counter() - began
+
+
+@pytest.mark.parametrize('delete_returning', [True, False], ids=['delete-returning', 'select-then-delete'])
+def test_concurrent_buyers_never_share_a_unit(delete_returning, monkeypatch):
+    monkeypatch.setattr(Database().engine.dialect, 'delete_returning', delete_returning)
+    item_name = f'claim_item_{delete_returning}'
+    create_item(item_name, 'description', 5, 'claim_category')
+    add_values_bulk(item_name, [f'{item_name}-{n}' for n in range(UNITS)])
+
+    results, elapsed = _race(item_name)
+
+    claimed = [result['value'] for result in results if result]
+    assert len(claimed) == UNITS, 'every unit must be sold while buyers remain'
+    assert len(set(claimed)) == UNITS, 'a unit was sold twice'
+    assert results.count(None) == BUYERS - UNITS
+    assert Database().session.query(ItemValues).filter(ItemValues.item_name == item_name).count() == 0
+    assert get_stock_levels([item_name])[item_name] == (0, False, 0)
+    print(f'{BUYERS} buyers claimed {UNITS} units in {elapsed:.2f}s ({UNITS / elapsed:.0f} claims/s)')
+
+
+def test_unlimited_unit_is_shared():
+    create_item('claim_unlimited', 'description', 5, 'claim_category')
+    add_values_bulk('claim_unlimited', ['forever'], is_infinity=True)
+
+    results, _ = _race('claim_unlimited')
+
+    assert all(result and result['value'] == 'forever' for result in results)
+    assert get_stock_levels(['claim_unlimited'])['claim_unlimited'][1] is True
@@ -0,0 +1,76 @@
+"""Stock availability for a whole category costs a constant number of queries."""
+import pytest
+
+from bot.database.methods import (
+    add_item_to_cart, add_values_to_item, create_category, create_item, create_user, get_items_info,
+    get_out_of_stock_items, get_stock_levels, is_stock_empty,
+)
+from bot.database.methods.read import get_all_items
+
+CATEGORY = 'bulk_category'
+ITEMS = [f'bulk_item_{n:03}' for n in range(500)]
+BUYER = 8001
+
+
+@pytest.fixture(scope='module', autouse=True)
+def category():
+    create_category(CATEGORY)
+    for n, name in enumerate(ITEMS):
+        create_item(name, 'description', 5, CATEGORY)
+        if n % 3 == 0:
+            add_values_to_item(name, f'{name}-unit', False)
+        elif n % 3 == 1:
+            add_values_to_item(name, f'{name}-unlimited', True)
+    create_user(BUYER, '2025-03-01 12:00:00', None)
+    for name in ITEMS:
+        add_item_to_cart(BUYER, name)
+
+
+def test_stock_levels_for_500_items_is_one_query(capture_statements):
+    with capture_statements() as statements:
+        levels = get_stock_levels(ITEMS)
+    assert len(statements) == 1
+    assert levels[ITEMS[0]] == (1, False, 0)
+    assert levels[ITEMS[1]][1] is True
+    assert levels[ITEMS[2]] == (0, False, 0)
+
+
+def test_stock_levels_reports_unknown_items():
+    assert get_stock_levels(['no_such_item']) == {'no_such_item': (0, False, 0)}
+
+
+def test_category_listing_does_not_query_per_item(capture_statements):
+    get_all_items(CATEGORY)  # build the catalog snapshot once
+    with capture_statements() as statements:
+        stocked = get_all_items(CATEGORY)
+        missing = get_out_of_stock_items(CATEGORY)
+        info = get_items_info(stocked)
+    assert len(stocked) == 334 and len(missing) == 166
+    assert len(info) == len(stocked)
+    assert len(statements) <= 2
+
+
+def test_is_stock_empty_is_one_query(capture_statements):
+    with capture_statements() as statements:
+        assert is_stock_empty(ITEMS[2])
+        assert not is_stock_empty(ITEMS[1])
+    assert len(statements) == 2
+
+
+def test_stock_goods_keyboard_is_one_stock_query(capture_statements):
+    pytest.importorskip('aiogram')
+    from bot.keyboards import stock_goods_list
+
+    with capture_statements() as statements:
+        stock_goods_list(ITEMS, CATEGORY)
+    assert sum('stock_summary' in sql for sql, _ in statements) == 1
+
+
+def test_cart_state_is_one_stock_query(capture_statements):
+    pytest.importorskip('aiogram')
+    from bot.handlers.user.main import compute_cart_state
+
+    with capture_statements() as statements:
+        state = compute_cart_state(BUYER)
+    assert len(state['items']) == len(ITEMS)
+    assert sum('stock_summary' in sql for sql, _ in statements) == 1
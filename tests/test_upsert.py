@@ -0,0 +1,40 @@
+"""``upsert`` inserts, updates only changed fields and reports whether it wrote a row."""
+from bot.database import Database, upsert
+from bot.database.models import ReferralStats
+
+
+def _stats(referrer_id: int) -> tuple[int, int]:
+    row = Database().session.query(ReferralStats).filter(ReferralStats.referrer_id == referrer_id).one()
+    return row.referrals, row.topped_up
+
+
+def _upsert(referrer_id: int, referrals: int, topped_up: int, update_fields=()) -> bool:
+    return upsert(Database().session, ReferralStats,
+                  {'referrer_id': referrer_id, 'referrals': referrals, 'topped_up': topped_up},
+                  conflict=('referrer_id',), update_fields=update_fields)
+
+
+def test_inserts_a_new_row():
+    assert _upsert(7600, 1, 10)
+    assert _stats(7600) == (1, 10)
+
+
+def test_existing_row_is_kept_without_update_fields():
+    _upsert(7601, 1, 10)
+
+    assert not _upsert(7601, 5, 50)
+    assert _stats(7601) == (1, 10)
+
+
+def test_only_update_fields_change():
+    _upsert(7602, 1, 10)
+
+    assert _upsert(7602, 2, 20, update_fields=('referrals',))
+    assert _stats(7602) == (2, 10)
+
+
+def test_unchanged_update_writes_nothing():
+    _upsert(7603, 1, 10)
+
+    assert not _upsert(7603, 1, 99, update_fields=('referrals',))
+    assert _stats(7603) == (1, 10)
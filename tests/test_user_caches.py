@@ -0,0 +1,55 @@
+"""The per-user role and purchase caches stay bounded in size and age."""
+import pytest
+
+from bot.database.methods import create_user, read, select_user_items
+from bot.database.methods.read import _UserCache
+
+
+def test_least_recently_used_user_is_evicted():
+    cache = _UserCache(maxsize=2, ttl=60)
+    cache.set(1, 'a')
+    cache.set(2, 'b')
+    cache.get(1)
+    cache.set(3, 'c')
+
+    assert (cache.get(1), cache.get(2), cache.get(3)) == ('a', None, 'c')
+    assert len(cache) == 2
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(read.time, 'monotonic', lambda: now[0])
+    cache = _UserCache(maxsize=10, ttl=60)
+    cache.set(1, 5)
+
+    now[0] += 59
+    assert cache.get(1) == 5
+    now[0] += 2
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_falsy_values_are_cached():
+    cache = _UserCache(maxsize=10, ttl=60)
+    cache.set(1, 0)
+    cache.set(2, False)
+
+    assert cache.get(1) == 0 and cache.get(2) is False
+
+
+@pytest.fixture
+def small_caches(monkeypatch):
+    for name in ('_PERMISSIONS', '_RESELLERS', '_PURCHASE_COUNTS'):
+        monkeypatch.setattr(read, name, _UserCache(maxsize=3, ttl=60))
+
+
+def test_lookups_for_many_users_stay_bounded(small_caches):
+    users = range(7400, 7410)
+    for telegram_id in users:
+        create_user(telegram_id, '2025-04-03 10:00:00', None)
+        read.check_role(telegram_id)
+        read.is_reseller(telegram_id)
+        select_user_items(telegram_id)
+
+    assert len(read._PERMISSIONS) == len(read._RESELLERS) == len(read._PURCHASE_COUNTS) == 3
+    assert read.check_role(users[0]) == read.check_role(users[-1])
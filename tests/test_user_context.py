@@ -0,0 +1,68 @@
+"""The per-update user context does not outlive its update in tasks spawned from it."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bot.database.methods import create_user, get_user_context
+from bot.database.user_context import (
+    bind_user_context, current_user_context, load_user_context, reset_user_context,
+)
+
+USER = 7500
+
+
+@pytest.fixture(autouse=True)
+def user():
+    create_user(USER, '2025-04-04 10:00:00', None)
+
+
+def test_spawned_task_stops_reading_the_context_after_the_update():
+    async def spawned(started: asyncio.Event, update_done: asyncio.Event):
+        during = current_user_context(USER)
+        started.set()
+        await update_done.wait()
+        return during, current_user_context(USER)
+
+    async def scenario():
+        started, update_done = asyncio.Event(), asyncio.Event()
+        token = bind_user_context(load_user_context(USER))
+        task = asyncio.create_task(spawned(started, update_done))
+        await started.wait()
+        reset_user_context(token)
+        update_done.set()
+        return await task
+
+    during, after = asyncio.run(scenario())
+    assert during is not None and during.telegram_id == USER
+    assert after is None
+
+
+def test_reads_after_reset_go_to_the_database(capture_statements):
+    token = bind_user_context(load_user_context(USER))
+    reset_user_context(token)
+
+    with capture_statements() as statements:
+        context = get_user_context(USER)
+    assert context.telegram_id == USER and not context.stale
+    assert len(statements) == 1
+
+
+def test_middleware_releases_the_context_in_post_process():
+    pytest.importorskip('aiogram')
+    from bot.middlewares.main import UserContextMiddleware
+
+    middleware = UserContextMiddleware()
+    update = SimpleNamespace(message=SimpleNamespace(from_user=SimpleNamespace(id=USER)))
+
+    async def scenario():
+        data = {}
+        await middleware.on_pre_process_update(update, data)
+        bound = current_user_context(USER)
+        await middleware.on_post_process_update(update, [], data)
+        return bound, current_user_context(USER), data
+
+    bound, after, data = asyncio.run(scenario())
+    assert bound is not None and bound.stale
+    assert after is None
+    assert '_user_context' not in data